@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile, CandidateProfile, LearningCourse, EmployeeDevelopmentPlan
+from .models import UserProfile, CandidateProfile, LearningCourse, EmployeeDevelopmentPlan, BackgroundJob, FeedbackRollup, AssessmentQuestionBank, CourseAssessment, AssessmentUpload
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -50,4 +50,38 @@ class EmployeeDevelopmentPlanAdmin(admin.ModelAdmin):
     list_display = ['employee_profile', 'course', 'status', 'priority_level', 'progress_percentage', 'created_at']
     list_filter = ['status', 'priority_level', 'current_skill_level', 'target_skill_level', 'created_at']
     search_fields = ['employee_profile__user_profile__user__username', 'course__title', 'skill_gap_identified']
-    readonly_fields = ['created_at', 'updated_at']
\ No newline at end of file
+    readonly_fields = ['created_at', 'updated_at']
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'dedupe_key', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status', 'created_at']
+    search_fields = ['dedupe_key', 'owner__username', 'error']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+
+@admin.register(FeedbackRollup)
+class FeedbackRollupAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'feedback_count', 'rating_sum', 'updated_at']
+    search_fields = ['employee__username']
+    readonly_fields = ['updated_at']
+
+@admin.register(AssessmentQuestionBank)
+class AssessmentQuestionBankAdmin(admin.ModelAdmin):
+    list_display = ['id', 'action', 'course', 'source', 'updated_at']
+    list_filter = ['source', 'updated_at']
+    search_fields = ['action__title', 'course__title']
+    readonly_fields = ['created_at', 'updated_at']
+
+@admin.register(CourseAssessment)
+class CourseAssessmentAdmin(admin.ModelAdmin):
+    list_display = ['id', 'employee', 'plan', 'status', 'ai_score', 'cheating_detected', 'started_at', 'completed_at']
+    list_filter = ['status', 'cheating_detected', 'started_at']
+    search_fields = ['employee__username', 'plan__course__title', 'grading_error']
+    readonly_fields = ['started_at', 'submitted_at', 'completed_at']
+
+@admin.register(AssessmentUpload)
+class AssessmentUploadAdmin(admin.ModelAdmin):
+    list_display = ['id', 'owner', 'filename', 'received_bytes', 'status', 'created_at', 'updated_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['owner__username', 'filename']
+    readonly_fields = ['created_at', 'updated_at']
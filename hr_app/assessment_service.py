@@ -0,0 +1,431 @@
+"""
+Assessment questions for feedback actions and courses
+Questions are generated once per FeedbackAction / LearningCourse into an AssessmentQuestionBank
+(in a background job when the action or course is created) and each assessment attempt samples
+from the stored bank, so starting or retrying an assessment needs no AI call.
+Submissions are stored and graded in a background job: a local PreGrader settles the clear-cut
+ones and only the ones it can't settle are graded by the AI.
+"""
+
+import json
+import logging
+import random
+import re
+import threading
+from django.conf import settings
+from django.utils import timezone
+from .models import AssessmentQuestionBank
+from .llm_gateway import get_gateway
+
+logger = logging.getLogger(__name__)
+
+
+def parse_questions(text):
+    """Extract questions from a numbered AI response (quoted question, else first sentence ending in '?')"""
+    questions = []
+
+    # Split text into sections by number pattern
+    sections = re.split(r'\n\s*[0-9]+\.\s*', '\n' + text)
+
+    for section in sections[1:]:  # Skip text before the first number
+        # Look for quoted question (text between quotes)
+        quote_match = re.search(r'"([^"]+)"', section)
+        if quote_match:
+            # Clean up any remaining markdown
+            question = re.sub(r'\*\*|\*', '', quote_match.group(1)).strip()
+            if question:
+                questions.append(question)
+        else:
+            # Fallback: take first sentence that ends with ?
+            for sentence in section.split('.'):
+                if '?' in sentence:
+                    question = re.sub(r'\*\*|\*|"', '', sentence.split('?')[0] + '?').strip()
+                    if question:
+                        questions.append(question)
+                        break
+
+    # Drop repeats while keeping the order
+    return list(dict.fromkeys(questions))
+
+
+class AssessmentService:
+    """Builds and samples assessment question banks"""
+
+    def __init__(self):
+        self.gateway = get_gateway()
+        self.bank_size = getattr(settings, 'ASSESSMENT_QUESTION_BANK_SIZE', 8)
+        self.questions_per_attempt = getattr(settings, 'ASSESSMENT_QUESTIONS_PER_ATTEMPT', 3)
+
+    # --- Prompts and fallbacks ---
+
+    def action_prompt(self, action):
+        return (
+            f"Generate {self.bank_size} interview-style questions to assess understanding and completion of "
+            f"the following action: {action.title}. Action details: {action.description}\n"
+            f"Number each question and put the question itself in double quotes."
+        )
+
+    def course_prompt(self, course):
+        return f"""
+        Generate {self.bank_size} detailed interview questions to assess if the user has completed and understood the course: "{course.title}"
+
+        Course Description: {course.description}
+        Course Skills: {getattr(course, 'skills_covered', 'General skills')}
+
+        The questions should:
+        1. Test practical understanding of course concepts
+        2. Ask for specific examples or applications
+        3. Verify genuine learning vs superficial completion
+
+        Number each question and put the question itself in double quotes. Make them specific to this course content.
+        """
+
+    def fallback_action_questions(self, action):
+        return [f"Describe how you completed the action '{action.title}'."]
+
+    def fallback_course_questions(self, course):
+        return [
+            f"How have you applied the key concepts from '{course.title}' in practical scenarios?",
+            f"What specific skills from this course will you use in your current role?",
+            f"Describe a project or task where you could implement what you learned from '{course.title}'."
+        ]
+
+    # --- Banks ---
+
+    def _generate(self, prompt, fallback):
+        """Return (questions, source) from the AI, or the fallback questions if it fails"""
+        try:
+            questions = parse_questions(self.gateway.generate(prompt).strip())
+        except Exception as e:
+            logger.error(f"Question bank generation failed, using fallback: {str(e)}")
+            questions = []
+        if questions:
+            return questions[:self.bank_size], 'ai'
+        return fallback, 'fallback'
+
+    def build_action_bank(self, action):
+        """Generate (or regenerate) the question bank for a FeedbackAction"""
+        questions, source = self._generate(self.action_prompt(action), self.fallback_action_questions(action))
+        bank, _ = AssessmentQuestionBank.objects.update_or_create(
+            action=action, defaults={'questions': questions, 'source': source}
+        )
+        return bank
+
+    def build_course_bank(self, course):
+        """Generate (or regenerate) the question bank for a LearningCourse"""
+        questions, source = self._generate(self.course_prompt(course), self.fallback_course_questions(course))
+        bank, _ = AssessmentQuestionBank.objects.update_or_create(
+            course=course, defaults={'questions': questions, 'source': source}
+        )
+        return bank
+
+    def sample(self, bank):
+        """Questions for one assessment attempt, drawn at random from the bank"""
+        questions = bank.questions
+        return random.sample(questions, min(self.questions_per_attempt, len(questions)))
+
+    def questions_for_action(self, action):
+        """Questions for an action assessment; builds the bank on first use if it doesn't exist yet"""
+        bank = AssessmentQuestionBank.objects.filter(action=action).first()
+        if bank is None or not bank.questions:
+            bank = self.build_action_bank(action)
+        return self.sample(bank)
+
+    def questions_for_course(self, course):
+        """Questions for a course assessment; builds the bank on first use if it doesn't exist yet"""
+        bank = AssessmentQuestionBank.objects.filter(course=course).first()
+        if bank is None or not bank.questions:
+            bank = self.build_course_bank(course)
+        return self.sample(bank)
+
+    # --- Grading ---
+
+    def action_grading_prompt(self, assessment):
+        return f"""
+            Analyze this employee assessment for action completion: "{assessment.action.title}"
+            
+            Questions asked: {assessment.questions_asked}
+            Answers provided: {assessment.answers}
+            Transcript: {assessment.transcript}
+            
+            Please provide:
+            1. A score from 1-10 on action completion
+            2. Brief feedback on the quality of responses
+            3. Whether the action appears to be genuinely completed
+            
+            Respond in JSON format: {{"score": X, "feedback": "...", "completed": true/false}}
+            """
+
+    def course_grading_prompt(self, assessment):
+        course = assessment.plan.course
+        return f"""
+            Analyze this course completion assessment for: "{course.title}"
+            
+            Course Description: {course.description}
+            Questions asked: {assessment.questions_asked}
+            Answers provided: {assessment.answers}
+            Transcript: {assessment.transcript}
+            
+            Please evaluate:
+            1. Understanding of course concepts (1-10)
+            2. Practical application knowledge (1-10) 
+            3. Genuine completion vs superficial (1-10)
+            4. Overall course mastery (1-10)
+            
+            Respond in JSON format: {{"understanding": X, "application": X, "completion": X, "overall": X, "feedback": "...", "course_completed": true/false}}
+            """
+
+    def grade_action_assessment(self, assessment):
+        """Grade a stored FeedbackActionAssessment, marking the action complete on a pass; returns the result dict"""
+        action = assessment.action
+        cheating_data = assessment.cheating_data or {}
+        cheating_detected, cheating_details = assess_cheating(cheating_data)
+
+        # Clear-cut submissions are settled locally; only ambiguous ones go to Gemini
+        pregrade = PreGrader().grade(
+            assessment.questions_asked, assessment.answers, assessment.transcript, action_key_terms(action), cheating_data
+        )
+        record_pregrade(pregrade['decision'])
+
+        if pregrade['decision'] != 'ambiguous':
+            ai_score = pregrade['score']
+            ai_feedback = pregrade['feedback']
+        else:
+            try:
+                ai_result = json.loads(self.gateway.generate(self.action_grading_prompt(assessment)).strip())
+                ai_score = ai_result.get('score', 5)
+                ai_feedback = ai_result.get('feedback', 'Assessment completed.')
+            except Exception:
+                ai_score = 7  # Default score if AI analysis fails
+                ai_feedback = 'Assessment completed successfully.'
+
+        # Apply cheating penalty
+        if cheating_detected:
+            ai_score = max(1, ai_score - 3)  # Reduce score by 3 points for cheating
+            ai_feedback += " Note: Assessment integrity concerns detected."
+
+        # Mark action as complete if score is good and no major cheating
+        marked_complete = ai_score >= 6 and not (cheating_data.get('tabSwitches', 0) > 2)
+        if marked_complete:
+            action.is_completed = True
+            action.save(update_fields=['is_completed'])
+
+        assessment.ai_score = ai_score
+        assessment.ai_feedback = ai_feedback
+        assessment.cheating_detected = cheating_detected
+        assessment.completed_at = timezone.now()
+        assessment.save(update_fields=['ai_score', 'ai_feedback', 'cheating_detected', 'completed_at'])
+
+        return {
+            'ai_score': ai_score,
+            'ai_feedback': ai_feedback,
+            'cheating_detected': cheating_detected,
+            'cheating_details': '; '.join(cheating_details),
+            'marked_complete': marked_complete,
+            'graded_locally': pregrade['decision'] != 'ambiguous',
+        }
+
+    def grade_course_assessment(self, assessment):
+        """Grade a stored CourseAssessment, completing the development plan on a pass; returns the result dict"""
+        plan = assessment.plan
+        course = plan.course
+        cheating_data = assessment.cheating_data or {}
+        cheating_detected, cheating_details = assess_cheating(cheating_data)
+
+        # Clear-cut submissions are settled locally; only ambiguous ones go to Gemini
+        pregrade = PreGrader().grade(
+            assessment.questions_asked, assessment.answers, assessment.transcript, course_key_terms(course), cheating_data
+        )
+        record_pregrade(pregrade['decision'])
+
+        if pregrade['decision'] != 'ambiguous':
+            understanding = application = completion = overall_score = pregrade['score']
+            ai_feedback = pregrade['feedback']
+        else:
+            try:
+                ai_result = json.loads(self.gateway.generate(self.course_grading_prompt(assessment)).strip())
+                understanding = ai_result.get('understanding', 7)
+                application = ai_result.get('application', 7)
+                completion = ai_result.get('completion', 7)
+                overall_score = ai_result.get('overall', 7)
+                ai_feedback = ai_result.get('feedback', 'Course assessment completed.')
+            except Exception:
+                understanding = application = completion = overall_score = 7
+                ai_feedback = 'Course assessment completed successfully.'
+
+        # Apply cheating penalty
+        if cheating_detected:
+            overall_score = max(1, overall_score - 3)
+            ai_feedback += " Note: Assessment integrity concerns detected."
+
+        # Mark course as complete if score is good and no major cheating
+        marked_complete = overall_score >= 6 and not (cheating_data.get('tabSwitches', 0) > 2)
+        if marked_complete:
+            plan.status = 'completed'
+            plan.progress_percentage = 100
+            plan.save()
+
+        assessment.ai_score = overall_score
+        assessment.ai_feedback = ai_feedback
+        assessment.cheating_detected = cheating_detected
+        assessment.completed_at = timezone.now()
+        assessment.save(update_fields=['ai_score', 'ai_feedback', 'cheating_detected', 'completed_at'])
+
+        return {
+            'ai_score': overall_score,
+            'understanding': understanding,
+            'application': application,
+            'completion': completion,
+            'ai_feedback': ai_feedback,
+            'cheating_detected': cheating_detected,
+            'cheating_details': '; '.join(cheating_details),
+            'marked_complete': marked_complete,
+            'graded_locally': pregrade['decision'] != 'ambiguous',
+            'course_title': course.title,
+        }
+
+
+def assess_cheating(cheating_data):
+    """Return (cheating_detected, details) from the browser's integrity signals"""
+    cheating_detected = False
+    cheating_details = []
+
+    if cheating_data.get('tabSwitches', 0) > 0:
+        cheating_detected = True
+        cheating_details.append(f"Tab switched {cheating_data['tabSwitches']} times")
+
+    if cheating_data.get('windowBlur', 0) > 2:
+        cheating_detected = True
+        cheating_details.append(f"Window lost focus {cheating_data['windowBlur']} times")
+
+    if len(cheating_data.get('suspicious_activity', [])) > 3:
+        cheating_detected = True
+        cheating_details.append(f"{len(cheating_data['suspicious_activity'])} suspicious activities detected")
+
+    return cheating_detected, cheating_details
+
+
+DEFAULT_PREGRADER_SETTINGS = {
+    'min_words': 8,            # an answer shorter than this doesn't count as an answer
+    'pass_words': 40,          # every answer at least this long for a local pass
+    'max_echo': 0.7,           # share of an answer's words copied from its question that counts as an echo
+    'pass_max_echo': 0.4,      # average echo allowed for a local pass
+    'pass_keyword_hits': 2,    # distinct course skills / action terms mentioned for a local pass
+    'fail_tab_switches': 3,    # tab switches that settle a fail (completion is blocked above 2 anyway)
+}
+
+STOPWORDS = frozenset(
+    'a an and are as at be been but by can could did do does for from had has have how i if in into is it its '
+    'me my of on or our so than that the their them then there these they this to was we were what when where '
+    'which while who why will with would you your about also just more most some such very'.split()
+)
+
+
+def content_words(text):
+    return [word for word in re.findall(r"[a-z][a-z0-9+#]*", (text or '').lower()) if word not in STOPWORDS]
+
+
+def action_key_terms(action):
+    """Topics an answer about a FeedbackAction should mention: the notable words of its title"""
+    return [word for word in dict.fromkeys(content_words(action.title)) if len(word) > 3 and word != 'improve']
+
+
+def course_key_terms(course):
+    """Topics an answer about a LearningCourse should mention: its skills_covered"""
+    return [skill for skill in (course.skills_covered or []) if isinstance(skill, str)]
+
+
+class PreGrader:
+    """
+    Scores assessment submissions locally and settles the clear-cut ones (empty, very short,
+    copied-question or heavily flagged answers fail; long, on-topic, clean answers pass).
+    Anything in between is left to the AI grader.
+    """
+
+    def __init__(self, config=None):
+        config = config if config is not None else getattr(settings, 'ASSESSMENT_PREGRADER', {})
+        self.config = {**DEFAULT_PREGRADER_SETTINGS, **config}
+
+    def grade(self, questions, answers, transcript='', key_terms=(), cheating_data=None):
+        """
+        Returns {'decision': 'pass' | 'fail' | 'ambiguous', 'score', 'feedback', 'reasons', 'metrics'}.
+        `key_terms` are the skills or topics a good answer should mention (phrases allowed).
+        """
+        config = self.config
+        cheating_data = cheating_data or {}
+        answers = [str(answer or '').strip() for answer in answers]
+        if not any(answers) and transcript.strip():
+            answers = [transcript.strip()]
+        questions = list(questions) + [''] * max(0, len(answers) - len(questions))
+
+        word_counts = [len(content_words(answer)) for answer in answers]
+        echoes = []
+        for question, answer in zip(questions, answers):
+            words = content_words(answer)
+            question_words = set(content_words(question))
+            echoes.append(sum(word in question_words for word in words) / len(words) if words else 1.0)
+
+        answer_text = ' '.join(answers).lower()
+        terms = {term.strip().lower(): term.strip() for term in key_terms if term and term.strip()}
+        keyword_hits = sorted(
+            original for term, original in terms.items() if re.search(r'\b' + re.escape(term) + r'\b', answer_text)
+        )
+
+        substantive = [count >= config['min_words'] for count in word_counts]
+        metrics = {
+            'answers': len(answers),
+            'word_counts': word_counts,
+            'echo': [round(echo, 2) for echo in echoes],
+            'keyword_hits': keyword_hits,
+            'tab_switches': cheating_data.get('tabSwitches', 0),
+        }
+
+        reasons = []
+        if not answers or not any(substantive):
+            reasons.append('No substantive answers were given')
+        elif all(echo >= config['max_echo'] for echo, ok in zip(echoes, substantive) if ok):
+            reasons.append('Answers repeat the questions instead of answering them')
+        if metrics['tab_switches'] >= config['fail_tab_switches']:
+            reasons.append(f"Left the assessment tab {metrics['tab_switches']} times")
+        if reasons:
+            return {'decision': 'fail', 'score': 2, 'reasons': reasons, 'metrics': metrics,
+                    'feedback': 'Assessment not passed: ' + '; '.join(reasons) + '.'}
+
+        cheating_detected, _ = assess_cheating(cheating_data)
+        average_echo = sum(echoes) / len(echoes)
+        asked = [question for question in questions if question]
+        # Without the issued questions or topics to check against, only the AI grader can judge relevance
+        if (
+            asked and terms
+            and not cheating_detected
+            and len(answers) >= len(asked)
+            and all(count >= config['pass_words'] for count in word_counts)
+            and average_echo <= config['pass_max_echo']
+            and len(keyword_hits) >= min(config['pass_keyword_hits'], len(terms))
+        ):
+            score = 8 if len(keyword_hits) > config['pass_keyword_hits'] else 7
+            return {'decision': 'pass', 'score': score, 'reasons': ['Detailed, on-topic answers'], 'metrics': metrics,
+                    'feedback': 'Detailed answers covering ' + (', '.join(keyword_hits) or 'the topic') + '.'}
+
+        return {'decision': 'ambiguous', 'score': None, 'reasons': [], 'metrics': metrics, 'feedback': ''}
+
+
+_pregrade_lock = threading.Lock()
+_pregrade_counters = {'submissions': 0, 'settled_pass': 0, 'settled_fail': 0, 'sent_to_llm': 0}
+
+
+def record_pregrade(decision):
+    """Count a pre-grader outcome for pregrade_stats()"""
+    key = {'pass': 'settled_pass', 'fail': 'settled_fail'}.get(decision, 'sent_to_llm')
+    with _pregrade_lock:
+        _pregrade_counters['submissions'] += 1
+        _pregrade_counters[key] += 1
+
+
+def pregrade_stats():
+    """Pre-grader outcomes in this process and the share of AI grading calls avoided"""
+    with _pregrade_lock:
+        stats = dict(_pregrade_counters)
+    settled = stats['settled_pass'] + stats['settled_fail']
+    stats['llm_calls_avoided_pct'] = round(100 * settled / stats['submissions'], 1) if stats['submissions'] else 0.0
+    return stats
@@ -0,0 +1,164 @@
+"""
+Packed attention time series
+An assessment's attention samples are stored as one AttentionSeries blob of fixed-size records
+instead of one AttentionTrackingData row per frame: the capture time as uint32 milliseconds after
+the series start, the three scores rounded to uint8 (0-100) and the expression and head position as
+uint8 codes. That is 9 bytes per sample, and a whole assessment loads in one query straight into a
+NumPy structured array. Assessments recorded before the series existed are read from their rows.
+Ingestion only accepts labels listed below and stores whole-number scores, so new samples pack
+exactly; legacy rows that don't (packs_exactly) are kept when their assessment is packed.
+"""
+
+import math
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from .models import AttentionSeries, AttentionTrackingData
+
+SERIES_FORMAT_VERSION = 1
+SAMPLE_DTYPE = np.dtype([
+    ('offset_ms', '<u4'),
+    ('attention_level', 'u1'),
+    ('eye_contact_score', 'u1'),
+    ('confidence_score', 'u1'),
+    ('facial_expression', 'u1'),
+    ('head_position', 'u1'),
+])
+MAX_OFFSET_MS = np.iinfo(np.uint32).max
+
+# Stored codes are indexes into these tuples: only ever append to them
+EXPRESSION_CODES = ('unknown', 'focused', 'engaged', 'confused', 'distracted', 'absent')
+HEAD_POSITION_CODES = ('unknown', 'center', 'looking_away', 'no_face')
+
+
+def store_rows():
+    """Whether AttentionTrackingData rows are still written alongside the series"""
+    return getattr(settings, 'ATTENTION_STORE_ROWS', False)
+
+
+def encode(codes, value):
+    return codes.index(value) if value in codes else 0
+
+
+def packs_exactly(row):
+    """Whether an AttentionTrackingData row reads back unchanged from its packed sample"""
+    scores = (row.attention_level, row.eye_contact_score, row.confidence_score)
+    return (
+        row.facial_expression in EXPRESSION_CODES
+        and row.head_position in HEAD_POSITION_CODES
+        and all(0 <= score <= 100 and score == int(score) for score in scores)
+    )
+
+
+def pack_samples(started_at, rows):
+    """SAMPLE_DTYPE bytes for AttentionTrackingData instances, offsets measured from started_at"""
+    samples = np.empty(len(rows), dtype=SAMPLE_DTYPE)
+    for index, row in enumerate(rows):
+        offset_ms = round((row.timestamp - started_at).total_seconds() * 1000)
+        if not 0 <= offset_ms <= MAX_OFFSET_MS:
+            raise ValueError(f'Sample at {row.timestamp} is outside the series starting at {started_at}')
+        samples[index] = (
+            offset_ms,
+            round(min(100, max(0, float(row.attention_level)))),
+            round(min(100, max(0, float(row.eye_contact_score)))),
+            round(min(100, max(0, float(row.confidence_score)))),
+            encode(EXPRESSION_CODES, row.facial_expression),
+            encode(HEAD_POSITION_CODES, row.head_position),
+        )
+    return samples.tobytes()
+
+
+def unpack_samples(data):
+    """Read-only structured array over packed sample bytes, without copying"""
+    return np.frombuffer(data, dtype=SAMPLE_DTYPE)
+
+
+def append_samples(assessment, rows):
+    """
+    Append AttentionTrackingData instances (saved or not) to the assessment's series.
+    A sample from before the series start (out-of-order batches, client clocks) moves the start
+    back and shifts the stored offsets, so no sample is ever clamped onto another's time.
+    """
+    if not rows:
+        return
+    earliest = min(row.timestamp for row in rows)
+    with transaction.atomic():
+        series, _ = AttentionSeries.objects.get_or_create(
+            assessment=assessment,
+            defaults={
+                'started_at': min(assessment.start_time, earliest) if assessment.start_time else earliest,
+                'format_version': SERIES_FORMAT_VERSION,
+            },
+        )
+        # Lock the row: concurrent batches for one assessment must not overwrite each other's samples
+        series = AttentionSeries.objects.select_for_update().get(pk=series.pk)
+        data = bytes(series.data)
+        if earliest < series.started_at:
+            shift_ms = math.ceil((series.started_at - earliest).total_seconds() * 1000)
+            samples = unpack_samples(data).copy()
+            offsets = samples['offset_ms'].astype(np.int64) + shift_ms
+            if len(offsets) and offsets.max() > MAX_OFFSET_MS:
+                raise ValueError(f'Sample at {earliest} is too far before the series starting at {series.started_at}')
+            samples['offset_ms'] = offsets
+            data = samples.tobytes()
+            series.started_at -= timedelta(milliseconds=shift_ms)
+        series.data = data + pack_samples(series.started_at, rows)
+        series.sample_count += len(rows)
+        series.save(update_fields=['started_at', 'data', 'sample_count', 'updated_at'])
+
+
+def load_attention_series(assessment):
+    """
+    (started_at, samples) for an assessment: a SAMPLE_DTYPE array sorted by offset_ms.
+    Falls back to AttentionTrackingData rows for assessments recorded before the series existed;
+    started_at is None when there is no data at all.
+    """
+    series = AttentionSeries.objects.filter(assessment=assessment).first()
+    if series is not None:
+        samples = unpack_samples(bytes(series.data))
+        started_at = series.started_at
+    else:
+        rows = list(AttentionTrackingData.objects.filter(assessment=assessment).order_by('timestamp'))
+        if not rows:
+            return None, np.empty(0, dtype=SAMPLE_DTYPE)
+        started_at = rows[0].timestamp
+        samples = unpack_samples(pack_samples(started_at, rows))
+    # Batches may arrive out of order; a stable sort keeps arrival order for equal times
+    return started_at, samples[np.argsort(samples['offset_ms'], kind='stable')]
+
+
+def sample_times(started_at, samples):
+    """Capture times of the samples as a datetime64[ms] array (UTC)"""
+    start = np.datetime64(round(started_at.timestamp() * 1000), 'ms')
+    return start + samples['offset_ms'].astype('timedelta64[ms]')
+
+
+def summarize_attention(samples):
+    """Averages and counts behind the assessment score and the details page"""
+    attention = samples['attention_level'].astype(np.float32)
+    return {
+        'samples': len(samples),
+        'avg_attention': float(attention.mean()) if len(samples) else 0.0,
+        'high': int(np.count_nonzero(attention >= 70)),
+        'medium': int(np.count_nonzero((attention >= 40) & (attention < 70))),
+        'low': int(np.count_nonzero(attention < 40)),
+        'screen_focus_ratio': (
+            float(np.mean(samples['head_position'] == HEAD_POSITION_CODES.index('center'))) if len(samples) else 0.0
+        ),
+    }
+
+
+def sample_points(started_at, samples):
+    """Samples as dicts with the AttentionTrackingData field names, for templates"""
+    return [
+        {
+            'timestamp': started_at + timedelta(milliseconds=int(sample['offset_ms'])),
+            'attention_level': int(sample['attention_level']),
+            'eye_contact_score': int(sample['eye_contact_score']),
+            'confidence_score': int(sample['confidence_score']),
+            'facial_expression': EXPRESSION_CODES[sample['facial_expression']],
+            'head_position': HEAD_POSITION_CODES[sample['head_position']],
+        }
+        for sample in samples
+    ]
@@ -0,0 +1,361 @@
+"""
+Attention tracking for video assessments
+Turns webcam frames captured during a VideoAssessment into attention samples. Frames (or results
+the browser already computed) can arrive one per request or in batches; each batch is appended to
+the assessment's packed AttentionSeries (see hr_app/attention_series.py) in a single write.
+Frames are analysed locally with OpenCV's Haar cascades (face, then eyes inside the face) on a
+downscaled grayscale copy. The cascades are loaded once per analysis thread, and analysis runs on a
+process-wide thread pool (OpenCV releases the GIL while decoding and detecting), so a batch is
+analysed in parallel and the WebSocket stream never blocks its event loop.
+Consecutive webcam frames are mostly near-identical, so each frame's 64-bit dHash is compared with
+the last analysed frame of the same assessment; frames within a few bits reuse that analysis instead
+of running the cascades again.
+"""
+
+import base64
+import binascii
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+import cv2
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .attention_series import EXPRESSION_CODES, HEAD_POSITION_CODES, append_samples, store_rows
+from .models import AttentionTrackingData, VideoAssessment
+
+FACIAL_EXPRESSIONS = ('focused', 'engaged', 'confused', 'distracted', 'absent')
+HEAD_POSITIONS = ('center', 'looking_away', 'no_face')
+
+FACE_CASCADE = 'haarcascade_frontalface_default.xml'
+EYE_CASCADE = 'haarcascade_eye.xml'
+ANALYSIS_WIDTH = 320    # frames are decoded at reduced size and scaled down to at most this width
+CENTER_TOLERANCE = 0.35  # face centre offset (fraction of half the frame) still counted as facing the screen
+
+DEFAULT_DEDUPE_SETTINGS = {
+    'enabled': True,
+    'max_distance': 5,      # frames whose dHash differs from the last analysed frame in at most this many bits reuse its analysis
+    'max_reuse': 10,        # re-analyse after this many reused frames even if the hash has not moved
+    'state_timeout': 60,    # seconds an assessment's last hash and analysis are kept between HTTP requests
+    'cache_alias': 'default',
+}
+
+
+class FrameError(ValueError):
+    pass
+
+
+def max_batch_frames():
+    return getattr(settings, 'ATTENTION_BATCH_MAX_FRAMES', 60)
+
+
+def analyzer_workers():
+    return getattr(settings, 'ATTENTION_ANALYZER_WORKERS', min(4, os.cpu_count() or 1))
+
+
+def dedupe_settings(config=None):
+    config = config if config is not None else getattr(settings, 'ATTENTION_FRAME_DEDUPE', {})
+    return {**DEFAULT_DEDUPE_SETTINGS, **config}
+
+
+def get_tracked_assessment(user, data):
+    """The caller's VideoAssessment named by `assessment_id` or `session_id` in the request data"""
+    assessments = VideoAssessment.objects.filter(assignment__employee=user)
+    if data.get('assessment_id'):
+        return assessments.get(id=data['assessment_id'])
+    return assessments.get(session_id=data.get('session_id'))
+
+
+def parse_timestamp(value):
+    """Aware datetime from an ISO 8601 string or epoch milliseconds; now if missing"""
+    if value in (None, ''):
+        return timezone.now()
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value / 1000.0, tz=dt_timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            # Out of the platform's range (e.g. 1e20), infinite or NaN
+            raise FrameError(f'Invalid timestamp: {value}')
+    parsed = parse_datetime(str(value).replace('Z', '+00:00'))
+    if parsed is None:
+        raise FrameError(f'Invalid timestamp: {value}')
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+def decode_frame(frame_data):
+    """JPEG bytes from a base64 string or data URL (data:image/jpeg;base64,...)"""
+    if not frame_data:
+        raise FrameError('Missing frame data')
+    _, _, encoded = frame_data.rpartition(',')
+    try:
+        return base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        raise FrameError('Frame data is not valid base64')
+
+
+_detectors = threading.local()
+_analysis_executor = None
+_analysis_executor_lock = threading.Lock()
+
+
+def get_detectors():
+    """
+    (face, eye) cascades of the calling thread, loaded on its first frame.
+    CascadeClassifier is not safe to share between threads, so each analysis thread keeps its own;
+    with the fixed-size pool below that is once per worker thread for the life of the process.
+    """
+    if not hasattr(_detectors, 'face'):
+        face = cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades, FACE_CASCADE))
+        eye = cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades, EYE_CASCADE))
+        if face.empty() or eye.empty():
+            raise RuntimeError(f"Cannot load Haar cascades from {cv2.data.haarcascades}")
+        _detectors.face, _detectors.eye = face, eye
+    return _detectors.face, _detectors.eye
+
+
+def get_analysis_executor():
+    """Return the process-wide frame analysis pool, creating it on first use"""
+    global _analysis_executor
+    if _analysis_executor is None:
+        with _analysis_executor_lock:
+            if _analysis_executor is None:
+                _analysis_executor = ThreadPoolExecutor(
+                    max_workers=analyzer_workers(),
+                    thread_name_prefix='hr-attention',
+                )
+    return _analysis_executor
+
+
+def grayscale_frame(frame_bytes):
+    """Equalised grayscale image at most ANALYSIS_WIDTH wide from JPEG (or PNG) bytes"""
+    # IMREAD_REDUCED_GRAYSCALE_2 lets libjpeg decode straight to half size without colour conversion
+    gray = cv2.imdecode(np.frombuffer(frame_bytes, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_2)
+    if gray is None:
+        raise FrameError('Frame is not a decodable image')
+    height, width = gray.shape
+    if width > ANALYSIS_WIDTH:
+        gray = cv2.resize(gray, (ANALYSIS_WIDTH, round(height * ANALYSIS_WIDTH / width)), interpolation=cv2.INTER_AREA)
+    return cv2.equalizeHist(gray)
+
+
+def dhash(gray):
+    """64-bit difference hash: whether each cell of a 9x8 thumbnail is brighter than its right neighbour"""
+    thumbnail = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    return int.from_bytes(np.packbits(thumbnail[:, 1:] > thumbnail[:, :-1]).tobytes(), 'big')
+
+
+def analyze_frame(frame_bytes):
+    """
+    Attention analysis of one JPEG frame, on the AttentionTrackingData scales (scores 0-100).
+    A frontal face near the middle of the frame with both eyes visible scores highest; no face
+    scores zero attention. `faces` is the number of faces found, for spotting a second person.
+    """
+    return analyze_gray(grayscale_frame(frame_bytes))
+
+
+def analyze_gray(gray):
+    """analyze_frame() of a frame already decoded by grayscale_frame()"""
+    face_detector, eye_detector = get_detectors()
+    height, width = gray.shape
+    faces = face_detector.detectMultiScale(
+        gray, scaleFactor=1.15, minNeighbors=5, minSize=(max(24, width // 8),) * 2
+    )
+    if len(faces) == 0:
+        return {
+            'attention_level': 0.0,
+            'eye_contact_score': 0.0,
+            'facial_expression': 'absent',
+            'head_position': 'no_face',
+            'confidence_score': 60.0,
+            'faces': 0,
+        }
+
+    x, y, face_width, face_height = max(faces, key=lambda face: face[2] * face[3])
+    offset_x = abs(x + face_width / 2 - width / 2) / (width / 2)
+    offset_y = abs(y + face_height / 2 - height / 2) / (height / 2)
+    offset = min(1.0, math.hypot(offset_x, offset_y))
+    centered = offset_x <= CENTER_TOLERANCE and offset_y <= CENTER_TOLERANCE
+
+    # Eyes sit in the upper part of the face; searching only there is faster and avoids nostril hits
+    eye_region = gray[y:y + int(face_height * 0.6), x:x + face_width]
+    eyes = eye_detector.detectMultiScale(
+        eye_region, scaleFactor=1.1, minNeighbors=5, minSize=(max(8, face_width // 8),) * 2
+    )
+    eyes_found = min(2, len(eyes))
+
+    if centered:
+        expression = 'focused' if eyes_found == 2 else 'engaged'
+    else:
+        expression = 'distracted'
+    face_scale = min(1.0, face_width / (width * 0.3))
+    return {
+        'attention_level': 40 + 30 * (1 - offset) + 15 * eyes_found,
+        'eye_contact_score': 50 * eyes_found * (1 - offset),
+        'facial_expression': expression,
+        'head_position': 'center' if centered else 'looking_away',
+        'confidence_score': min(100.0, 50 + 25 * face_scale + 12.5 * eyes_found),
+        'faces': len(faces),
+    }
+
+
+class FrameDeduplicator:
+    """
+    Last analysed frame of one assessment: its dHash, its analysis and how many frames have reused it.
+    `state` is plain data so it can be kept in the cache between HTTP requests.
+    """
+
+    def __init__(self, state=None, config=None):
+        self.config = dedupe_settings(config)
+        self.hash, self.analysis, self.reuses = state or (None, None, 0)
+        self.reused = 0
+
+    @property
+    def state(self):
+        return self.hash, self.analysis, self.reuses
+
+    def reset(self):
+        self.hash, self.analysis, self.reuses = None, None, 0
+
+    def is_repeat(self, frame_hash):
+        """Whether the frame can reuse the last analysis; if not it becomes the frame compared against"""
+        if (self.config['enabled'] and self.hash is not None and self.reuses < self.config['max_reuse']
+                and (frame_hash ^ self.hash).bit_count() <= self.config['max_distance']):
+            self.reuses += 1
+            self.reused += 1
+            return True
+        # Later frames are compared with this one rather than their predecessor, so slow drift still triggers analysis
+        self.hash, self.reuses = frame_hash, 0
+        return False
+
+
+def analyze_frames(frames, deduplicator=None):
+    """
+    Analyses of several JPEG frames, in order, run in parallel on the analysis pool.
+    With a deduplicator, frames that repeat the last analysed frame reuse its analysis.
+    """
+    executor = get_analysis_executor()
+    deduplicator = deduplicator or FrameDeduplicator(config={'enabled': False})
+    try:
+        grays = list(executor.map(grayscale_frame, frames))
+        repeats = [deduplicator.is_repeat(dhash(gray)) for gray in grays]
+        fresh = iter(executor.map(analyze_gray, [gray for gray, repeat in zip(grays, repeats) if not repeat]))
+        analyses = []
+        for repeat in repeats:
+            if not repeat:
+                deduplicator.analysis = next(fresh)
+            analyses.append(deduplicator.analysis)
+    except Exception:
+        # The hash may already point at a frame that was never analysed
+        deduplicator.reset()
+        raise
+    return analyses
+
+
+def deduplicator_cache_key(assessment):
+    return f'attention-dedupe:{assessment.id}'
+
+
+def load_deduplicator(assessment):
+    """FrameDeduplicator carrying on from the assessment's previous request"""
+    config = dedupe_settings()
+    return FrameDeduplicator(caches[config['cache_alias']].get(deduplicator_cache_key(assessment)), config)
+
+
+def store_deduplicator(assessment, deduplicator):
+    config = deduplicator.config
+    if config['enabled'] and deduplicator.hash is not None:
+        caches[config['cache_alias']].set(deduplicator_cache_key(assessment), deduplicator.state, config['state_timeout'])
+
+
+def clean_result(result):
+    """
+    Validate a browser-computed analysis into AttentionTrackingData values. Scores are rounded to
+    whole numbers and labels must be ones the packed series can store, so nothing is lost when packing.
+    """
+    def score(key):
+        try:
+            return round(min(100.0, max(0.0, float(result.get(key, 0)))))
+        except (TypeError, ValueError, OverflowError):
+            raise FrameError(f'{key} must be a number')
+
+    def label(key, codes):
+        value = result.get(key) or 'unknown'
+        if value not in codes:
+            raise FrameError(f'{key} must be one of: {", ".join(codes)}')
+        return value
+
+    return {
+        'attention_level': score('attention_level'),
+        'eye_contact_score': score('eye_contact_score'),
+        'facial_expression': label('facial_expression', EXPRESSION_CODES),
+        'head_position': label('head_position', HEAD_POSITION_CODES),
+        'confidence_score': score('confidence_score'),
+    }
+
+
+def tracking_row(assessment, timestamp, analysis):
+    return AttentionTrackingData(
+        assessment=assessment,
+        timestamp=timestamp,
+        # Whole numbers, as in the packed series
+        attention_level=round(analysis['attention_level']),
+        eye_contact_score=round(analysis['eye_contact_score']),
+        facial_expression=analysis['facial_expression'],
+        head_position=analysis['head_position'],
+        confidence_score=round(analysis['confidence_score']),
+    )
+
+
+def display_analysis(analysis):
+    """Analysis in the shape the assessment page's monitoring panel reads"""
+    return {
+        **analysis,
+        'attention_score': analysis['attention_level'],
+        'engagement_score': analysis['eye_contact_score'],
+        'facial_score': analysis['confidence_score'],
+        'expression': analysis['facial_expression'],
+    }
+
+
+def ingest_frames(assessment, frames=(), results=()):
+    """
+    Analyze `frames` ({'timestamp', 'frame_data'}) and validate `results` ({'timestamp', scores...}),
+    then save all of them in one transaction. Returns the analyses in the order received.
+    """
+    if len(frames) + len(results) > max_batch_frames():
+        raise FrameError(f'At most {max_batch_frames()} frames per batch')
+
+    timestamps = [parse_timestamp(frame.get('timestamp')) for frame in frames]
+    analyses = []
+    if frames:
+        deduplicator = load_deduplicator(assessment)
+        analyses = analyze_frames([decode_frame(frame.get('frame_data')) for frame in frames], deduplicator)
+        store_deduplicator(assessment, deduplicator)
+    rows = [tracking_row(assessment, timestamp, analysis) for timestamp, analysis in zip(timestamps, analyses)]
+    for result in results:
+        analysis = clean_result(result)
+        rows.append(tracking_row(assessment, parse_timestamp(result.get('timestamp')), analysis))
+        analyses.append(analysis)
+
+    save_tracking_rows(rows)
+    return analyses
+
+
+def save_tracking_rows(rows):
+    """
+    Append unsaved AttentionTrackingData instances to their assessments' packed series, and also
+    insert them as rows with a single bulk_create when ATTENTION_STORE_ROWS is set
+    """
+    by_assessment = {}
+    for row in rows:
+        by_assessment.setdefault(row.assessment_id, (row.assessment, []))[1].append(row)
+    with transaction.atomic():
+        for assessment, assessment_rows in by_assessment.values():
+            append_samples(assessment, assessment_rows)
+        if store_rows():
+            AttentionTrackingData.objects.bulk_create(rows)
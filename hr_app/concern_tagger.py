@@ -0,0 +1,159 @@
+"""
+Local areas-of-concern tagger for manager feedback
+Matches feedback text against a curated vocabulary of concern phrases compiled into a
+single regular expression, so suggestions are available while the admin types without
+an AI call. Each area's phrases become one named group; the matched group names the area.
+Feedback praises as often as it criticises, so each match is checked against the few words
+before it in the same sentence: concern phrases ("missed deadlines") are dropped when negated
+("never missed deadlines", "fixed the bugs"), and topic words that are neutral on their own
+("teamwork", "attitude") only count when a criticism cue ("poor teamwork") precedes them.
+"""
+
+import re
+
+# Area of concern -> phrases that signal it (regex fragments, matched case-insensitively on word boundaries)
+CONCERN_LEXICON = {
+    'Communication': [
+        r'poor(?:ly)? communicat\w*', r'communication (?:issues?|gaps?)', r'unclear', r'vague',
+        r'(?:does not|doesn\'t|did not|didn\'t) communicate', r'unresponsive', r'not responsive',
+        r'hard to reach', r'slow to respond', r'(?:doesn\'t|does not) (?:update|inform)', r'miscommunicat\w*',
+    ],
+    'Time Management': [
+        r'missed (?:the )?deadlines?', r'miss(?:es|ing)? deadlines?', r'late (?:delivery|submissions?)',
+        r'behind schedule', r'delay(?:s|ed)?', r'overdue', r'procrastinat\w*',
+        r'(?:often|always|frequently) late', r'slipp(?:ed|ing) (?:dates|timelines?)',
+    ],
+    'Code Quality': [
+        r'bugs?', r'buggy', r'defects?', r'messy code', r'code smells?', r'regressions?',
+        r'technical debt', r'hard to maintain', r'unreadable', r'not (?:well )?tested', r'lack of tests',
+    ],
+    'Attention to Detail': [
+        r'careless(?:ness)?', r'sloppy', r'(?:small|minor|silly) mistakes',
+        r'overlook(?:s|ed)?', r'typos?', r'errors? in (?:reports?|documentation|work)',
+    ],
+    'Teamwork': [
+        r'(?:does not|doesn\'t) collaborate', r'poor collaboration',
+        r'works? in isolation', r'conflicts? with', r'(?:not|isn\'t) supportive', r'siloed',
+    ],
+    'Ownership': [
+        r'lack of ownership', r'blames? others', r'needs? (?:constant|close) supervision',
+        r'(?:does not|doesn\'t) take initiative', r'lack of initiative',
+    ],
+    'Technical Skills': [
+        r'skill gaps?', r'lacks? (?:technical )?(?:knowledge|skills|depth)',
+        r'needs? to learn', r'unfamiliar with', r'struggl(?:es|ed|ing) with', r'knowledge gaps?',
+    ],
+    'Problem Solving': [
+        r'gets? stuck', r'needs? help (?:often|frequently)',
+    ],
+    'Documentation': [
+        r'undocumented', r'(?:no|missing|outdated) docs', r'(?:does not|doesn\'t) document',
+    ],
+    'Leadership': [],
+    'Professionalism': [
+        r'unprofessional', r'rude', r'disrespectful', r'absent\w*',
+    ],
+    'Productivity': [
+        r'low output', r'slow (?:progress|delivery|pace)', r'underperform\w*',
+        r'(?:not|isn\'t) meeting (?:targets|expectations|goals)', r'below expectations',
+    ],
+}
+
+# Area -> topic words that name the area without judging it; they only count after a criticism cue
+TOPIC_LEXICON = {
+    'Communication': [r'communication(?: skills)?'],
+    'Time Management': [r'time management', r'punctual\w*'],
+    'Code Quality': [r'code quality', r'tests', r'testing'],
+    'Attention to Detail': [r'attention to detail'],
+    'Teamwork': [r'teamwork', r'team player', r'collaborat\w*'],
+    'Ownership': [r'ownership', r'accountab\w*', r'follow[- ]?through', r'initiative', r'proactiv\w*'],
+    'Technical Skills': [r'technical (?:skills|knowledge|depth)'],
+    'Problem Solving': [r'problem[- ]solving', r'root cause analysis', r'debugging', r'troubleshoot\w*',
+                        r'analytical skills'],
+    'Documentation': [r'documentation', r'docs', r'comments? in code', r'readme'],
+    'Leadership': [r'leadership', r'mentor(?:ing|ship)?', r'delegat\w*', r'decision[- ]making'],
+    'Professionalism': [r'attitude', r'tone', r'attendance', r'conduct'],
+    'Productivity': [r'productivity', r'output', r'velocity'],
+}
+
+# Words looked at before a match, within its sentence (a "but"/"however" starts a new one)
+CONTEXT_WORDS = 4
+CLAUSE_BREAK = re.compile(r"[.;:!?]|\b(?:but|however|although|though|whereas)\b", re.IGNORECASE)
+NEGATORS = {
+    'no', 'not', 'never', 'without', 'zero', 'rarely', 'hardly', 'barely', 'longer',
+    "isn't", "doesn't", "don't", "didn't", "wasn't", "hasn't", "haven't", "won't",
+}
+# Before a concern phrase these mean the problem was dealt with ("fixed the bugs")
+RESOLVED = {'fixed', 'fixes', 'fixing', 'resolved', 'resolves', 'reduced', 'reduces', 'eliminated', 'addressed',
+            'avoided', 'avoids', 'prevented', 'prevents', 'cleared', 'free'}
+CRITICISM = NEGATORS | {
+    'poor', 'poorly', 'lack', 'lacks', 'lacking', 'lacked', 'weak', 'bad', 'low', 'limited', 'insufficient',
+    'inadequate', 'little', 'minimal', 'inconsistent', 'questionable', 'unsatisfactory', 'worse', 'worst',
+    'need', 'needs', 'needed', 'improve', 'improving', 'more', 'concern', 'concerns', 'issue', 'issues',
+    'problem', 'problems', 'negative', 'unacceptable',
+}
+PRAISE = {
+    'excellent', 'great', 'good', 'strong', 'outstanding', 'impressive', 'solid', 'positive', 'exceptional',
+    'exemplary', 'fantastic', 'amazing', 'superb', 'brilliant', 'improved', 'commendable', 'admirable',
+}
+WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+def _compile(*lexicons):
+    groups = []
+    group_areas = {}
+    for kind, lexicon in lexicons:
+        for index, (area, phrases) in enumerate(lexicon.items()):
+            if not phrases:
+                continue
+            group = f'{kind}{index}'
+            group_areas[group] = (area, kind)
+            groups.append(f"(?P<{group}>{'|'.join(phrases)})")
+    return re.compile(r'\b(?:' + '|'.join(groups) + r')\b', re.IGNORECASE), group_areas
+
+
+CONCERN_PATTERN, GROUP_AREAS = _compile(('concern', CONCERN_LEXICON), ('topic', TOPIC_LEXICON))
+
+
+def _preceding_words(text, position):
+    """Up to CONTEXT_WORDS lowercase words before position, nearest last, without crossing a clause break"""
+    before = text[max(0, position - 120):position]
+    breaks = list(CLAUSE_BREAK.finditer(before))
+    if breaks:
+        before = before[breaks[-1].end():]
+    return WORD.findall(before.lower())[-CONTEXT_WORDS:]
+
+
+def _is_concern(kind, words):
+    """Whether a match of this kind, preceded by these words, criticises rather than praises"""
+    if kind == 'concern':
+        return not any(word in NEGATORS or word in RESOLVED for word in words)
+    criticised = praised = False
+    for index, word in enumerate(words):
+        negated = index > 0 and words[index - 1] in NEGATORS
+        if word in PRAISE:
+            # "not good teamwork" criticises, "good teamwork" praises
+            criticised, praised = (True, praised) if negated else (criticised, True)
+        elif word in CRITICISM:
+            criticised = True
+    return criticised and not praised
+
+
+def tag_concerns(text, limit=5):
+    """
+    Suggest areas of concern for feedback text.
+    Returns up to `limit` dicts of {'area', 'hits', 'evidence'}, most mentioned (then earliest) first.
+    """
+    found = {}
+    text = text or ''
+    for match in CONCERN_PATTERN.finditer(text):
+        area, kind = GROUP_AREAS[match.lastgroup]
+        if not _is_concern(kind, _preceding_words(text, match.start())):
+            continue
+        tag = found.setdefault(area, {'area': area, 'hits': 0, 'evidence': [], 'first': match.start()})
+        tag['hits'] += 1
+        phrase = match.group(0).lower()
+        if phrase not in tag['evidence']:
+            tag['evidence'].append(phrase)
+    ranked = sorted(found.values(), key=lambda tag: (-tag['hits'], tag['first']))
+    return [{key: tag[key] for key in ('area', 'hits', 'evidence')} for tag in ranked[:limit]]
@@ -1,11 +1,18 @@
 import json
 import logging
-from typing import List, Dict, Any
+import re
+from typing import List, Dict, Any, Tuple
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.utils import timezone
 from datetime import timedelta
-from .models import CandidateProfile, LearningCourse, EmployeeDevelopmentPlan
-from .gemini_client import get_gemini_client
+from .models import (
+    CandidateProfile, LearningCourse, EmployeeDevelopmentPlan,
+    ManagerFeedback, FeedbackAction, FeedbackCourseRecommendation,
+)
+from .llm_gateway import get_gateway
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +20,8 @@ class EmployeeDevelopmentService:
     """Service for AI-powered employee development and course recommendations"""
     
     def __init__(self):
-        self.client = get_gemini_client()
+        # All AI calls go through the shared, rate-limited gateway
+        self.gateway = get_gateway()
     
     def analyze_skill_gaps(self, employee_profile: CandidateProfile) -> Dict[str, Any]:
         """
@@ -64,8 +72,7 @@ class EmployeeDevelopmentService:
                 "career_progression_path": "suggested next steps"
             }}
             """
-            gemini_response = self.client.generate_content(prompt)
-            analysis_text = gemini_response.text.strip()
+            analysis_text = self.gateway.generate(prompt).strip()
             print("[AI RAW SKILL GAP RESPONSE]", analysis_text)
             try:
                 analysis_json = json.loads(analysis_text)
@@ -77,6 +84,110 @@ class EmployeeDevelopmentService:
             logger.error(f"Error in skill gap analysis: {str(e)}")
             return self._fallback_skill_gap_analysis(employee_profile)
     
+    def _compact_profile(self, employee_profile: CandidateProfile) -> Dict[str, Any]:
+        """Trimmed-down profile used when several employees share one prompt"""
+        domain_experience = employee_profile.domain_experience or []
+        if isinstance(domain_experience, dict):
+            domain_experience = list(domain_experience.keys())
+        return {
+            "employee_id": employee_profile.id,
+            "role": employee_profile.current_role or "Not specified",
+            "level": employee_profile.experience_level or "entry",
+            "skills": (employee_profile.primary_skills or [])[:10],
+            "secondary": (employee_profile.secondary_skills or [])[:5],
+            "domains": domain_experience[:5],
+            "improve": (employee_profile.areas_for_improvement or [])[:5]
+        }
+    
+    def analyze_skill_gaps_batch(self, employee_profiles: List[CandidateProfile], batch_size: int = 8) -> Dict[int, Dict[str, Any]]:
+        """
+        Analyze skill gaps for several employees, packing up to `batch_size` compact
+        profiles into each AI prompt. Returns a mapping of profile id -> analysis in the
+        same shape as analyze_skill_gaps. Employees missing from (or malformed in) a batch
+        response fall back to an individual analyze_skill_gaps call.
+        """
+        results = {}
+        batch_size = max(1, batch_size)
+        for start in range(0, len(employee_profiles), batch_size):
+            chunk = employee_profiles[start:start + batch_size]
+            if len(chunk) > 1:
+                results.update(self._analyze_skill_gap_chunk(chunk))
+            
+            for employee_profile in chunk:
+                if employee_profile.id not in results:
+                    results[employee_profile.id] = self.analyze_skill_gaps(employee_profile)
+        return results
+    
+    def _analyze_skill_gap_chunk(self, employee_profiles: List[CandidateProfile]) -> Dict[int, Dict[str, Any]]:
+        """Run one AI call for a chunk of employees, returning only the analyses that parsed"""
+        try:
+            compact_profiles = [self._compact_profile(profile) for profile in employee_profiles]
+            prompt = f"""
+            Analyze each of the following employee profiles and identify skill gaps for career growth.
+            Each profile has: employee_id, role, level (experience), skills (primary), secondary (skills),
+            domains (domain experience) and improve (areas for improvement).
+            Employees:
+            {json.dumps(compact_profiles)}
+            For EVERY employee, based on current industry trends and role requirements, provide:
+            1. Top 5 skill gaps that need immediate attention
+            2. Recommended skill category, priority (critical, high, medium, low), current vs target level
+               and specific learning outcomes for each gap
+            Return only JSON in this format, with one entry per employee_id:
+            {{
+                "employees": [
+                    {{
+                        "employee_id": 1,
+                        "skill_gaps": [
+                            {{
+                                "skill_name": "skill name",
+                                "category": "category (frontend/backend/etc)",
+                                "priority": "critical/high/medium/low",
+                                "current_level": "novice/beginner/intermediate/advanced/expert",
+                                "target_level": "novice/beginner/intermediate/advanced/expert",
+                                "learning_outcomes": ["outcome1", "outcome2"],
+                                "reason": "detailed explanation"
+                            }}
+                        ],
+                        "overall_development_focus": "main area to focus on",
+                        "career_progression_path": "suggested next steps"
+                    }}
+                ]
+            }}
+            """
+            analysis_json = json.loads(self._strip_code_fence(self.gateway.generate(prompt).strip()))
+        except Exception as e:
+            logger.error(f"Error in batched skill gap analysis for {len(employee_profiles)} employees: {str(e)}")
+            return {}
+        
+        expected_ids = {profile.id for profile in employee_profiles}
+        results = {}
+        for entry in analysis_json.get('employees', []) if isinstance(analysis_json, dict) else []:
+            try:
+                employee_id = int(entry.get('employee_id'))
+            except (AttributeError, TypeError, ValueError):
+                continue
+            if employee_id not in expected_ids or not isinstance(entry.get('skill_gaps'), list):
+                continue
+            results[employee_id] = {
+                "skill_gaps": entry['skill_gaps'],
+                "overall_development_focus": entry.get('overall_development_focus', 'Technical Skills Enhancement'),
+                "career_progression_path": entry.get('career_progression_path', 'Focus on core technical competencies')
+            }
+        print(f"[AI BATCH SKILL GAP] {len(results)}/{len(employee_profiles)} employees parsed")
+        return results
+    
+    @staticmethod
+    def _strip_code_fence(text: str) -> str:
+        """Remove a surrounding markdown code block (```json ... ```) if present"""
+        if text.startswith('```'):
+            text = text.lstrip('`')
+            if text.lower().startswith('json'):
+                text = text[4:]
+            text = text.strip()
+            if text.endswith('```'):
+                text = text[:-3].strip()
+        return text
+    
     def _fallback_skill_gap_analysis(self, employee_profile: CandidateProfile) -> Dict[str, Any]:
         """Fallback skill gap analysis without AI"""
         current_skills = set(employee_profile.primary_skills or [])
@@ -150,18 +261,10 @@ class EmployeeDevelopmentService:
                 ]
             }}
             """
-            gemini_response = self.client.generate_content(prompt)
-            recommendations_text = gemini_response.text.strip()
+            recommendations_text = self.gateway.generate(prompt).strip()
             print("[AI RAW RESPONSE]", recommendations_text)
             # --- Strip markdown code block if present ---
-            if recommendations_text.startswith('```'):
-                # Remove triple backticks and optional 'json' after them
-                recommendations_text = recommendations_text.lstrip('`')
-                if recommendations_text.lower().startswith('json'):
-                    recommendations_text = recommendations_text[4:]
-                recommendations_text = recommendations_text.strip()
-                if recommendations_text.endswith('```'):
-                    recommendations_text = recommendations_text[:-3].strip()
+            recommendations_text = self._strip_code_fence(recommendations_text)
             try:
                 recommendations_json = json.loads(recommendations_text)
                 return recommendations_json.get('course_recommendations', [])
@@ -176,20 +279,117 @@ class EmployeeDevelopmentService:
             logger.error(f"Error in course recommendations: {str(e)}")
             return []  # No fallback, just return empty
 
-    def create_development_plan(self, employee_profile: CandidateProfile, manager_user=None) -> Dict[str, Any]:
+    def recommend_courses_batch(self, skill_analyses: Dict[int, Dict[str, Any]], employee_profiles: List[CandidateProfile], batch_size: int = 8) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Recommend courses for several employees, packing up to `batch_size` employees' skill gaps
+        into each AI prompt. Returns a mapping of profile id -> course recommendations in the same
+        shape as recommend_courses. Employees missing from (or malformed in) a batch response fall
+        back to an individual recommend_courses call.
+        """
+        results = {}
+        batch_size = max(1, batch_size)
+        profiles = [profile for profile in employee_profiles if (skill_analyses.get(profile.id) or {}).get('skill_gaps')]
+        for start in range(0, len(profiles), batch_size):
+            chunk = profiles[start:start + batch_size]
+            if len(chunk) > 1:
+                results.update(self._recommend_course_chunk(chunk, skill_analyses))
+            
+            for employee_profile in chunk:
+                if employee_profile.id not in results:
+                    results[employee_profile.id] = self.recommend_courses(
+                        skill_analyses[employee_profile.id]['skill_gaps'], employee_profile
+                    )
+        # Employees without skill gaps get no courses, as in create_development_plan
+        for employee_profile in employee_profiles:
+            results.setdefault(employee_profile.id, [])
+        return results
+    
+    def _recommend_course_chunk(self, employee_profiles: List[CandidateProfile], skill_analyses: Dict[int, Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+        """Run one AI call recommending courses for a chunk of employees, returning only the lists that parsed"""
+        try:
+            employees = [
+                {
+                    "employee_id": profile.id,
+                    "role": profile.current_role or "Software Developer",
+                    "level": profile.experience_level or "intermediate",
+                    "gaps": [f"{gap.get('skill_name')} ({gap.get('priority', 'medium')} priority)"
+                             for gap in skill_analyses[profile.id]['skill_gaps']],
+                }
+                for profile in employee_profiles
+            ]
+            prompt = f"""
+            Based on the following skill gaps for each employee, recommend specific online courses.
+            Each employee has: employee_id, role, level (experience) and gaps (skill gaps with priority).
+            Employees:
+            {json.dumps(employees)}
+            For EVERY employee, recommend 3-5 courses covering their highest-priority gaps. Focus on:
+            1. Udemy courses (preferred)
+            2. Practical, hands-on learning
+            3. Courses that build from current level to target level
+            Return only JSON in this format, with one entry per employee_id:
+            {{
+                "employees": [
+                    {{
+                        "employee_id": 1,
+                        "course_recommendations": [
+                            {{
+                                "title": "Complete Course Title",
+                                "provider": "udemy",
+                                "skill_category": "category",
+                                "difficulty_level": "beginner/intermediate/advanced",
+                                "description": "course description",
+                                "skills_covered": ["skill1", "skill2"],
+                                "estimated_duration_hours": 20,
+                                "target_skill_gap": "matching skill gap name",
+                                "course_url": "https://www.udemy.com/course/...",
+                                "estimated_rating": 4.5,
+                                "estimated_price": 49.99,
+                                "why_recommended": "explanation"
+                            }}
+                        ]
+                    }}
+                ]
+            }}
+            """
+            recommendations_json = json.loads(self._strip_code_fence(self.gateway.generate(prompt).strip()))
+        except Exception as e:
+            logger.error(f"Error in batched course recommendations for {len(employee_profiles)} employees: {str(e)}")
+            return {}
+        
+        expected_ids = {profile.id for profile in employee_profiles}
+        results = {}
+        for entry in recommendations_json.get('employees', []) if isinstance(recommendations_json, dict) else []:
+            try:
+                employee_id = int(entry.get('employee_id'))
+            except (AttributeError, TypeError, ValueError):
+                continue
+            courses = entry.get('course_recommendations')
+            if employee_id not in expected_ids or not isinstance(courses, list):
+                continue
+            results[employee_id] = [course for course in courses if isinstance(course, dict)]
+        print(f"[AI BATCH COURSES] {len(results)}/{len(employee_profiles)} employees parsed")
+        return results
+
+    def create_development_plan(self, employee_profile: CandidateProfile, manager_user=None, skill_analysis: Dict[str, Any] = None, course_recommendations: List[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
-        Create a comprehensive development plan for an employee
+        Create a comprehensive development plan for an employee.
+        A precomputed skill_analysis (e.g. from analyze_skill_gaps_batch) skips step 1, and
+        precomputed course_recommendations (e.g. from recommend_courses_batch) skip step 2.
         """
         try:
             # Step 1: Analyze skill gaps
             print(f"Step 1: Analyzing skill gaps for {employee_profile.user_profile.user.username}")
-            skill_analysis = self.analyze_skill_gaps(employee_profile)
-            skill_gaps = skill_analysis.get('skill_gaps', [])
-            print(f"Found {len(skill_gaps)} skill gaps: {[gap.get('skill_name') for gap in skill_gaps]}")
+            if skill_analysis is None:
+                skill_analysis = self.analyze_skill_gaps(employee_profile)
+            skill_gaps = self.clean_skill_gaps(skill_analysis.get('skill_gaps', []))
+            print(f"Found {len(skill_gaps)} skill gaps: {[gap['skill_name'] for gap in skill_gaps]}")
             
             # Step 2: Get course recommendations
             print(f"Step 2: Getting course recommendations")
-            course_recommendations = self.recommend_courses(skill_gaps, employee_profile)
+            if course_recommendations is None:
+                course_recommendations = self.recommend_courses(skill_gaps, employee_profile)
+            # One malformed AI item is skipped rather than failing the whole plan
+            course_recommendations = self.clean_course_recommendations(course_recommendations)
             print(f"Found {len(course_recommendations)} course recommendations")
             
             # If no recommendations from AI, do not use fallback
@@ -197,67 +397,54 @@ class EmployeeDevelopmentService:
                 print("No AI recommendations returned.")
                 # Just return empty recommendations, do not call fallback
 
-            # Step 3: Create or update courses in database
-            created_plans = []
-            
-            for course_rec in course_recommendations:
-                print(f"Processing course: {course_rec.get('title', 'Unknown')}")
+            # Step 3: Resolve courses and create development plans in bulk
+            with transaction.atomic():
+                courses = self.upsert_courses(course_recommendations)
                 
-                # Create or get course
-                try:
-                    course, course_created = LearningCourse.objects.get_or_create(
-                        title=course_rec.get('title', 'Unknown Course'),
-                        provider=course_rec.get('provider', 'udemy'),
-                        defaults={
-                            'description': course_rec.get('description', ''),
-                            'course_url': course_rec.get('course_url', ''),
-                            'skill_category': course_rec.get('skill_category', 'technical'),
-                            'difficulty_level': course_rec.get('difficulty_level', 'intermediate'),
-                            'duration_hours': course_rec.get('estimated_duration_hours', 0),
-                            'rating': course_rec.get('estimated_rating', 0.0),
-                            'price': course_rec.get('estimated_price', 0.00),
-                            'skills_covered': course_rec.get('skills_covered', [])
-                        }
-                    )
-                    print(f"Course {'created' if course_created else 'found'}: {course.title}")
-                except Exception as e:
-                    print(f"Error creating course: {e}")
-                    continue
-                
-                # Find matching skill gap
-                target_gap = next((gap for gap in skill_gaps if gap['skill_name'].lower() in course_rec.get('target_skill_gap', '').lower()), {})
+                existing_course_ids = set(
+                    EmployeeDevelopmentPlan.objects.filter(
+                        employee_profile=employee_profile,
+                        course__in=list(courses.values())
+                    ).values_list('course_id', flat=True)
+                )
                 
-                # Create development plan
-                try:
-                    plan, plan_created = EmployeeDevelopmentPlan.objects.get_or_create(
+                new_plans = []
+                planned_course_ids = set(existing_course_ids)
+                for course_rec in course_recommendations:
+                    course = courses.get(self._course_key(course_rec))
+                    if course is None or course.id in planned_course_ids:
+                        continue
+                    planned_course_ids.add(course.id)
+                    
+                    # Find matching skill gap
+                    target_gap = next((gap for gap in skill_gaps if gap['skill_name'].lower() in course_rec['target_skill_gap'].lower()), {})
+                    
+                    new_plans.append(EmployeeDevelopmentPlan(
                         employee_profile=employee_profile,
                         course=course,
-                        defaults={
-                            'assigned_by': manager_user,
-                            'skill_gap_identified': course_rec.get('target_skill_gap', 'General Development'),
-                            'current_skill_level': target_gap.get('current_level', 'beginner'),
-                            'target_skill_level': target_gap.get('target_level', 'intermediate'),
-                            'assignment_reason': course_rec.get('why_recommended', 'AI recommended for skill development'),
-                            'priority_level': target_gap.get('priority', 'medium'),
-                            'status': 'recommended',
-                            'estimated_completion_date': timezone.now().date() + timedelta(days=course.duration_hours * 2)  # 2 days per hour estimate
-                        }
-                    )
-                    
-                    if plan_created:
-                        created_plans.append(plan)
-                        print(f"Development plan created for: {course.title}")
-                    else:
-                        print(f"Development plan already exists for: {course.title}")
-                        
-                except Exception as e:
-                    print(f"Error creating development plan: {e}")
-                    continue
+                        assigned_by=manager_user,
+                        skill_gap_identified=course_rec['target_skill_gap'] or 'General Development',
+                        current_skill_level=target_gap.get('current_level', 'beginner'),
+                        target_skill_level=target_gap.get('target_level', 'intermediate'),
+                        assignment_reason=course_rec.get('why_recommended', 'AI recommended for skill development'),
+                        priority_level=target_gap.get('priority', 'medium'),
+                        status='recommended',
+                        estimated_completion_date=timezone.now().date() + timedelta(days=course.duration_hours * 2)  # 2 days per hour estimate
+                    ))
+                
+                # unique_together on (employee_profile, course) absorbs plans created concurrently,
+                # so count what the insert actually added instead of trusting len(new_plans)
+                employee_plans = EmployeeDevelopmentPlan.objects.filter(employee_profile=employee_profile)
+                plans_before = employee_plans.count()
+                EmployeeDevelopmentPlan.objects.bulk_create(new_plans, ignore_conflicts=True)
+                created_count = employee_plans.count() - plans_before
+            
+            print(f"Created {created_count} development plans ({len(existing_course_ids)} already existed)")
             
             return {
                 'success': True,
                 'skill_analysis': skill_analysis,
-                'created_plans': len(created_plans),
+                'created_plans': created_count,
                 'total_recommendations': len(course_recommendations),
                 'development_focus': skill_analysis.get('overall_development_focus', 'Technical Skills'),
                 'career_path': skill_analysis.get('career_progression_path', 'Skill Enhancement')
@@ -270,6 +457,224 @@ class EmployeeDevelopmentService:
                 'error': str(e)
             }
     
+    def create_development_plans_batch(self, employee_profiles: List[CandidateProfile], manager_user=None, batch_size: int = 8) -> Dict[int, Dict[str, Any]]:
+        """
+        Create development plans for several employees, sharing both the skill gap and the course
+        recommendation prompts between up to `batch_size` employees (about 2 / batch_size AI calls
+        per employee instead of 2). Returns profile id -> create_development_plan result.
+        """
+        skill_analyses = self.analyze_skill_gaps_batch(employee_profiles, batch_size=batch_size)
+        course_recommendations = self.recommend_courses_batch(skill_analyses, employee_profiles, batch_size=batch_size)
+        return {
+            employee_profile.id: self.create_development_plan(
+                employee_profile,
+                manager_user=manager_user,
+                skill_analysis=skill_analyses.get(employee_profile.id),
+                course_recommendations=course_recommendations.get(employee_profile.id)
+            )
+            for employee_profile in employee_profiles
+        }
+    
+    def create_feedback_recommendations(self, feedback: ManagerFeedback) -> Dict[str, Any]:
+        """
+        Generate FeedbackActions and FeedbackCourseRecommendations for the feedback's employee
+        from the areas of concern across all their feedback. Either set is only generated when
+        the employee has none yet; new rows are linked to `feedback`.
+        """
+        employee = feedback.employee
+        has_actions = FeedbackAction.objects.filter(employee=employee).exists()
+        has_courses = FeedbackCourseRecommendation.objects.filter(employee=employee).exists()
+        if has_actions and has_courses:
+            return {'created_actions': 0, 'created_courses': 0, 'skipped': True}
+        
+        candidate_profile = CandidateProfile.objects.get(user_profile__user=employee)
+        
+        # Areas of concern from every feedback feed the skill gap analysis as "areas_for_improvement"
+        areas = set()
+        for areas_of_concern in ManagerFeedback.objects.filter(employee=employee).values_list('areas_of_concern', flat=True):
+            areas.update(areas_of_concern or [])
+        candidate_profile.areas_for_improvement = list(areas)
+        candidate_profile.save(update_fields=["areas_for_improvement"])
+        
+        skill_gaps = self.clean_skill_gaps(self.analyze_skill_gaps(candidate_profile).get("skill_gaps", []))
+        created_actions = created_courses = 0
+        
+        if not has_actions and skill_gaps:
+            actions = [
+                FeedbackAction(
+                    feedback=feedback,
+                    employee=employee,
+                    title=f"Improve {gap['skill_name']}",
+                    description=gap.get('reason', 'Focus on this area for improvement.'),
+                    priority=gap.get('priority', 'medium'),
+                    estimated_time_hours=8
+                )
+                for gap in skill_gaps
+            ]
+            FeedbackAction.objects.bulk_create(actions)
+            created_actions = len(actions)
+            # bulk_create skips post_save, so queue the new actions' question banks here
+            from .tasks import queue_question_banks
+            queue_question_banks(actions=[action for action in actions if action.pk])
+        
+        if not has_courses and skill_gaps:
+            course_recs = self.clean_course_recommendations(self.recommend_courses(skill_gaps, candidate_profile))
+            with transaction.atomic():
+                courses = self.upsert_courses(course_recs, defaults={
+                    'skill_category': 'soft_skills',
+                    'difficulty_level': 'beginner',
+                    'estimated_duration_hours': 8,
+                    'estimated_rating': 4.0,
+                })
+                linked = set(FeedbackCourseRecommendation.objects.filter(
+                    feedback=feedback, employee=employee
+                ).values_list('course_id', 'feedback_area_addressed'))
+                recommendations = []
+                for course_rec in course_recs:
+                    course = courses[self._course_key(course_rec)]
+                    area = course_rec.get('target_skill_gap', 'General')
+                    if (course.id, area) in linked:
+                        continue
+                    linked.add((course.id, area))
+                    recommendations.append(FeedbackCourseRecommendation(
+                        feedback=feedback,
+                        employee=employee,
+                        course=course,
+                        feedback_area_addressed=area
+                    ))
+                FeedbackCourseRecommendation.objects.bulk_create(recommendations)
+            created_courses = len(recommendations)
+        
+        return {'created_actions': created_actions, 'created_courses': created_courses, 'skipped': False}
+    
+    @staticmethod
+    def _number(value, default, cast=float):
+        """A number from an AI-provided value ("12", 12.5 or "48.5 hours"), or `default`"""
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return cast(value)
+        match = re.match(r'\s*(\d+(?:\.\d+)?)', str(value or ''))
+        return cast(float(match.group(1))) if match else default
+    
+    def clean_skill_gaps(self, skill_gaps) -> List[Dict[str, Any]]:
+        """Skill gaps from an AI response that name a skill; others are logged and dropped"""
+        cleaned = []
+        for gap in skill_gaps or []:
+            if isinstance(gap, dict) and isinstance(gap.get('skill_name'), str) and gap['skill_name'].strip():
+                cleaned.append(gap)
+            else:
+                logger.warning(f"Skipping malformed skill gap: {gap!r}")
+        return cleaned
+    
+    def clean_course_recommendations(self, course_recommendations) -> List[Dict[str, Any]]:
+        """
+        Course recommendations from an AI response with the numeric fields coerced (unparseable
+        values fall back to defaults) and target_skill_gap a string; non-objects are logged and dropped
+        """
+        cleaned = []
+        for course_rec in course_recommendations or []:
+            if not isinstance(course_rec, dict):
+                logger.warning(f"Skipping malformed course recommendation: {course_rec!r}")
+                continue
+            target = course_rec.get('target_skill_gap')
+            cleaned.append({
+                **course_rec,
+                'target_skill_gap': target if isinstance(target, str) else '',
+                'estimated_duration_hours': self._number(course_rec.get('estimated_duration_hours'), 0, int),
+                'estimated_rating': self._number(course_rec.get('estimated_rating'), 0.0),
+                'estimated_price': self._number(course_rec.get('estimated_price'), 0.0),
+                'skills_covered': [
+                    skill for skill in course_rec.get('skills_covered') or [] if isinstance(skill, str)
+                ] if isinstance(course_rec.get('skills_covered'), list) else [],
+            })
+        return cleaned
+    
+    @staticmethod
+    def normalize_course_title(title: str) -> str:
+        """Normalize a course title for lookups (trimmed and case-folded, including non-ASCII letters)"""
+        return (title or '').strip().casefold()
+    
+    @staticmethod
+    def _course_title(course_rec: Dict[str, Any]) -> str:
+        """Title a recommended course is stored under; missing or empty titles become 'Unknown Course'"""
+        return (course_rec.get('title') or '').strip() or 'Unknown Course'
+    
+    @staticmethod
+    def _course_provider(course_rec: Dict[str, Any]) -> str:
+        return course_rec.get('provider') or 'udemy'
+    
+    def _course_key(self, course_rec: Dict[str, Any]) -> Tuple[str, str]:
+        return (
+            self.normalize_course_title(self._course_title(course_rec)),
+            self._course_provider(course_rec),
+        )
+    
+    def _find_courses(self, titles) -> List[LearningCourse]:
+        """
+        Candidate LearningCourse rows for the given titles; callers compare normalized keys in Python.
+        SQL LOWER() only folds ASCII on some backends (SQLite), so non-ASCII titles are matched with a
+        case-insensitive regex instead of the Lower('title') index.
+        """
+        ascii_titles = {title.lower() for title in titles if title.isascii()}
+        query = Q(title_lower__in=ascii_titles)
+        for title in titles:
+            if not title.isascii():
+                query |= Q(title__iregex=f'^{re.escape(title)}$')
+        return list(LearningCourse.objects.annotate(title_lower=Lower('title')).filter(query).order_by('id'))
+    
+    def upsert_courses(self, course_recommendations: List[Dict], defaults: Dict[str, Any] = None) -> Dict[Tuple[str, str], LearningCourse]:
+        """
+        Resolve AI course recommendations to LearningCourse rows.
+        Existing courses are found with a single lookup on the normalized title and
+        missing ones are inserted with one bulk_create. `defaults` fills in recommendation
+        keys the AI left out. Returns a mapping of (normalized title, provider) -> LearningCourse.
+        """
+        if defaults:
+            course_recommendations = [{**defaults, **course_rec} for course_rec in course_recommendations]
+        keys = {self._course_key(course_rec) for course_rec in course_recommendations}
+        if not keys:
+            return {}
+        
+        courses = {}
+        for course in self._find_courses({self._course_title(course_rec) for course_rec in course_recommendations}):
+            key = (self.normalize_course_title(course.title), course.provider)
+            if key in keys:
+                courses.setdefault(key, course)
+        
+        new_courses = {}
+        for course_rec in course_recommendations:
+            key = self._course_key(course_rec)
+            if key in courses or key in new_courses:
+                continue
+            new_courses[key] = LearningCourse(
+                title=self._course_title(course_rec),
+                provider=self._course_provider(course_rec),
+                description=course_rec.get('description', ''),
+                course_url=course_rec.get('course_url', ''),
+                skill_category=course_rec.get('skill_category', 'technical'),
+                difficulty_level=course_rec.get('difficulty_level', 'intermediate'),
+                duration_hours=course_rec.get('estimated_duration_hours', 0),
+                rating=course_rec.get('estimated_rating', 0.0),
+                price=course_rec.get('estimated_price', 0.00),
+                skills_covered=course_rec.get('skills_covered', [])
+            )
+        
+        if new_courses:
+            LearningCourse.objects.bulk_create(new_courses.values())
+            if any(course.pk is None for course in new_courses.values()):
+                # Backend could not return primary keys from the insert; read them back
+                for course in self._find_courses({course.title for course in new_courses.values()}):
+                    key = (self.normalize_course_title(course.title), course.provider)
+                    if key in new_courses and new_courses[key].pk is None:
+                        new_courses[key] = course
+            courses.update(new_courses)
+            
+            # bulk_create skips post_save, so queue the new courses' question banks here
+            from .tasks import queue_question_banks
+            queue_question_banks(courses=[course for course in new_courses.values() if course.pk])
+        
+        print(f"Courses resolved: {len(courses) - len(new_courses)} found, {len(new_courses)} created")
+        return courses
+    
     def get_udemy_courses(self, search_query: str) -> List[Dict]:
         """
         Fetch real courses from Udemy API (if configured)
@@ -0,0 +1,137 @@
+"""
+Binary WebSocket stream of live assessment frames
+A plain ASGI application (mounted in hr_solution/asgi.py) at /ws/assessment-frames/<session_id>/.
+Each binary message is an 8-byte big-endian capture time in epoch milliseconds followed by the JPEG
+bytes, so frames travel without base64 or a new HTTP request. The message is sliced with memoryviews,
+so the JPEG is never copied before it is decoded. Each frame's analysis is sent back as a JSON text
+message, and the tracking rows are saved in batches.
+"""
+
+import json
+import logging
+import re
+from http.cookies import SimpleCookie
+from types import SimpleNamespace
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.utils.module_loading import import_string
+from .attention_service import (
+    FrameDeduplicator, FrameError, analyze_frames, display_analysis, parse_timestamp, save_tracking_rows,
+    tracking_row,
+)
+from .models import VideoAssessment
+
+logger = logging.getLogger(__name__)
+
+FRAME_SOCKET_PATH = re.compile(r'^/ws/assessment-frames/(?P<session_id>[\w-]+)/$')
+HEADER_SIZE = 8
+JPEG_MAGIC = b'\xff\xd8'
+
+
+def parse_frame_message(data):
+    """(capture time in epoch ms, JPEG memoryview) from a binary frame message, without copying"""
+    view = memoryview(data)
+    if len(view) <= HEADER_SIZE + len(JPEG_MAGIC):
+        raise ValueError('Frame message too short')
+    jpeg = view[HEADER_SIZE:]
+    if jpeg[:len(JPEG_MAGIC)] != JPEG_MAGIC:
+        raise ValueError('Frame is not a JPEG image')
+    return int.from_bytes(view[:HEADER_SIZE], 'big'), jpeg
+
+
+def scope_headers(scope):
+    return {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+
+def same_origin(headers):
+    """Browsers always send Origin on WebSocket handshakes; refuse other sites (cross-site WebSocket hijacking)"""
+    origin = headers.get('origin', '')
+    return bool(origin) and origin.split('://', 1)[-1] == headers.get('host')
+
+
+def load_user(headers):
+    """The logged-in user from the Django session cookie (AnonymousUser if none)"""
+    cookies = SimpleCookie()
+    cookies.load(headers.get('cookie', ''))
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    session_store = import_string(f'{settings.SESSION_ENGINE}.SessionStore')
+    return get_user(SimpleNamespace(session=session_store(morsel.value if morsel else None)))
+
+
+def load_assessment(user, session_id):
+    if not user.is_authenticated:
+        return None
+    return VideoAssessment.objects.filter(session_id=session_id, assignment__employee=user).first()
+
+
+class FrameStream:
+    """State of one connected assessment page"""
+
+    def __init__(self, assessment):
+        self.assessment = assessment
+        self.pending_rows = []
+        self.deduplicator = FrameDeduplicator()
+        self.batch_size = getattr(settings, 'ATTENTION_STREAM_BATCH_SIZE', 10)
+        self.max_frame_bytes = getattr(settings, 'ATTENTION_STREAM_MAX_FRAME_BYTES', 512 * 1024)
+
+    async def handle_frame(self, data):
+        if len(data) > self.max_frame_bytes:
+            return {'type': 'error', 'error': 'Frame too large'}
+        try:
+            captured_ms, jpeg = parse_frame_message(data)
+            captured_at = parse_timestamp(captured_ms)
+        except ValueError as e:
+            return {'type': 'error', 'error': str(e)}
+
+        # Analysis is CPU work; analyze_frames() runs it on the analysis pool, off the event loop.
+        # The connection keeps its own deduplicator, so a still webcam mostly reuses the last analysis.
+        try:
+            analysis = (await sync_to_async(analyze_frames, thread_sensitive=False)([jpeg], self.deduplicator))[0]
+        except FrameError as e:
+            return {'type': 'error', 'error': str(e)}
+        self.pending_rows.append(tracking_row(self.assessment, captured_at, analysis))
+        if len(self.pending_rows) >= self.batch_size:
+            await self.flush()
+        return {'type': 'analysis', 'timestamp': captured_ms, 'analysis': display_analysis(analysis)}
+
+    async def flush(self):
+        rows, self.pending_rows = self.pending_rows, []
+        if rows:
+            await sync_to_async(save_tracking_rows)(rows)
+
+
+async def frame_stream_application(scope, receive, send):
+    """ASGI application for the frame WebSocket; closes with 4003/4004 if unauthorised or unknown"""
+    match = FRAME_SOCKET_PATH.match(scope['path'])
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    headers = scope_headers(scope)
+    if match is None or not same_origin(headers):
+        await send({'type': 'websocket.close', 'code': 4003})
+        return
+    user = await sync_to_async(load_user)(headers)
+    assessment = await sync_to_async(load_assessment)(user, match.group('session_id'))
+    if assessment is None:
+        await send({'type': 'websocket.close', 'code': 4004 if user.is_authenticated else 4003})
+        return
+
+    await send({'type': 'websocket.accept'})
+    stream = FrameStream(assessment)
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message.get('bytes') is not None:
+                reply = await stream.handle_frame(message['bytes'])
+            else:
+                reply = {'type': 'error', 'error': 'Send frames as binary messages'}
+            await send({'type': 'websocket.send', 'text': json.dumps(reply)})
+    except Exception as e:
+        logger.error(f"Frame stream for assessment {assessment.id} failed: {str(e)}")
+        await send({'type': 'websocket.close', 'code': 1011})
+    finally:
+        await stream.flush()
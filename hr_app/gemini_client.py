@@ -1,6 +1,5 @@
-import google.generativeai as genai
-from django.conf import settings
+from .llm_clients import get_gemini_model
 
 def get_gemini_client():
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-    return genai.GenerativeModel('models/gemini-2.5-flash')
+    # Shared, lazily configured model from the process-wide client registry
+    return get_gemini_model('models/gemini-2.5-flash')
@@ -0,0 +1,159 @@
+"""
+Background jobs
+Slow work is recorded as a BackgroundJob row and handed to a process-wide thread pool once the
+surrounding transaction commits. Only one queued or running job can exist per (kind, dedupe_key),
+so repeated triggers for the same object reuse the active job instead of duplicating the work.
+Jobs left queued by a restarted process are picked up by the run_jobs management command. Jobs
+left 'running' by a crashed worker are only re-queued by an explicit `run_jobs --requeue-stale`:
+a 'running' row may belong to another live process (a long transcode or AI batch), so a new worker
+pool never takes them over on its own.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def register(kind):
+    """Decorator registering `func(job)` as the handler for jobs of `kind`; its return value is stored as the result"""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide worker pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'BACKGROUND_JOB_WORKERS', 4),
+                    thread_name_prefix='hr-job',
+                )
+    return _executor
+
+
+def requeue_stale_jobs(minutes=None, kind=None):
+    """
+    Re-queue jobs stuck in 'running' for longer than `minutes` (BACKGROUND_JOB_STALE_MINUTES by
+    default; 0 disables), so their dedupe keys stop blocking new work. Returns the re-queued job ids.
+    """
+    if minutes is None:
+        minutes = getattr(settings, 'BACKGROUND_JOB_STALE_MINUTES', 30)
+    if not minutes:
+        return []
+    stale = BackgroundJob.objects.filter(status='running', started_at__lt=timezone.now() - timezone.timedelta(minutes=minutes))
+    if kind:
+        stale = stale.filter(kind=kind)
+    job_ids = list(stale.values_list('id', flat=True))
+    if not job_ids:
+        return []
+    BackgroundJob.objects.filter(id__in=job_ids, status='running').update(status='queued')
+    logger.warning(f"Re-queued {len(job_ids)} background jobs left running by a stopped worker: {job_ids}")
+    return job_ids
+
+
+def enqueue(kind, dedupe_key, payload=None, owner=None):
+    """
+    Queue a job unless one is already queued or running for (kind, dedupe_key).
+    Returns the new or existing active job. The job starts once the current transaction commits.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"No background job handler registered for '{kind}'")
+
+    try:
+        with transaction.atomic():
+            job = BackgroundJob.objects.create(kind=kind, dedupe_key=dedupe_key, payload=payload or {}, owner=owner)
+    except IntegrityError:
+        # The partial unique constraint rejected a second active job for this key
+        existing = BackgroundJob.objects.filter(
+            kind=kind, dedupe_key=dedupe_key, status__in=BackgroundJob.ACTIVE_STATUSES
+        ).first()
+        if existing is not None:
+            logger.info(f"Job {kind} [{dedupe_key}] already active as #{existing.id}")
+            return existing
+        # It finished between the insert and the lookup; queue a fresh one
+        job = BackgroundJob.objects.create(kind=kind, dedupe_key=dedupe_key, payload=payload or {}, owner=owner)
+
+    transaction.on_commit(lambda: dispatch(job.id))
+    return job
+
+
+def dispatch(job_id):
+    """Start a queued job on the worker pool (or inline when BACKGROUND_JOBS_EAGER is set)"""
+    if getattr(settings, 'BACKGROUND_JOBS_EAGER', False):
+        run_job(job_id)
+    else:
+        get_executor().submit(_run_in_worker, job_id)
+
+
+def _run_in_worker(job_id):
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        # Worker threads open their own connections; don't leak them
+        close_old_connections()
+
+
+def run_job(job_id):
+    """
+    Claim and run a queued job. Returns False if another worker already claimed it.
+    Handler exceptions mark the job failed rather than propagating.
+    """
+    claimed = BackgroundJob.objects.filter(id=job_id, status='queued').update(
+        status='running', started_at=timezone.now(), attempts=F('attempts') + 1
+    )
+    if not claimed:
+        return False
+
+    job = BackgroundJob.objects.get(id=job_id)
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"No background job handler registered for '{job.kind}'")
+        result = handler(job)
+        job.status = 'succeeded'
+        job.result = result if isinstance(result, dict) else {'value': result}
+        job.error = ''
+    except Exception as e:
+        logger.exception(f"Background job #{job.id} ({job.kind}) failed")
+        job.status = 'failed'
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    return True
+
+
+def latest_job(kind, dedupe_key):
+    """Most recent job for (kind, dedupe_key), or None"""
+    return BackgroundJob.objects.filter(kind=kind, dedupe_key=dedupe_key).order_by('-created_at').first()
+
+
+def describe_job(job):
+    """JSON-friendly summary of a job for status endpoints and templates"""
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'result': job.result,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
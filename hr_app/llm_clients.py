@@ -0,0 +1,78 @@
+"""
+Process-wide registry of LLM provider clients
+Clients are created lazily on first use and shared across requests and threads,
+so provider configuration happens once and HTTP/gRPC connections are kept alive and reused
+"""
+
+import logging
+import os
+import threading
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GEMINI_MODEL = 'models/gemini-2.5-flash'
+
+_lock = threading.Lock()
+_gemini_configured = False
+_gemini_models = {}
+_openai_client = None
+
+
+def get_gemini_model(model_name=DEFAULT_GEMINI_MODEL):
+    """Return the shared GenerativeModel for `model_name`, configuring the SDK on first use"""
+    global _gemini_configured
+    model = _gemini_models.get(model_name)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _gemini_models.get(model_name)
+        if model is None:
+            import google.generativeai as genai
+            if not _gemini_configured:
+                # configure() rebuilds the SDK's default transport, so only call it once per process
+                genai.configure(api_key=settings.GEMINI_API_KEY)
+                _gemini_configured = True
+            model = genai.GenerativeModel(model_name)
+            _gemini_models[model_name] = model
+            logger.info(f"Initialized Gemini model {model_name}")
+    return model
+
+
+def get_openai_client():
+    """Return the shared OpenAI client, or None when no API key is configured"""
+    global _openai_client
+    if _openai_client is not None:
+        return _openai_client
+
+    api_key = getattr(settings, 'OPENAI_API_KEY', None) or os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        return None
+
+    with _lock:
+        if _openai_client is None:
+            import httpx
+            import openai
+            # One pooled HTTP client: connections stay open between requests and are shared by threads
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=getattr(settings, 'LLM_HTTP_MAX_CONNECTIONS', 20),
+                    max_keepalive_connections=getattr(settings, 'LLM_HTTP_MAX_KEEPALIVE', 10),
+                ),
+                timeout=getattr(settings, 'LLM_HTTP_TIMEOUT', 60),
+            )
+            _openai_client = openai.OpenAI(api_key=api_key, http_client=http_client)
+            logger.info("Initialized OpenAI client")
+    return _openai_client
+
+
+def reset_clients():
+    """Drop all cached clients, e.g. after rotating API keys"""
+    global _gemini_configured, _openai_client
+    with _lock:
+        _gemini_models.clear()
+        _gemini_configured = False
+        if _openai_client is not None:
+            _openai_client.close()
+        _openai_client = None
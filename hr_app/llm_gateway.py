@@ -0,0 +1,523 @@
+"""
+Single entry point for every LLM call made by the app
+Each provider gets a token bucket (request rate), a concurrency cap and a circuit breaker,
+so a throttled or failing provider makes callers fail fast into their existing fallbacks
+instead of tying up request threads
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from .llm_clients import get_gemini_model, get_openai_client, DEFAULT_GEMINI_MODEL
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDER_SETTINGS = {
+    'rate_per_minute': 60,     # sustained request rate
+    'burst': 10,               # requests allowed back-to-back
+    'max_concurrency': 8,      # requests in flight at once
+    'acquire_timeout': 5,      # seconds to wait for a rate/concurrency slot
+    'failure_threshold': 5,    # consecutive failures that open the circuit
+    'reset_timeout': 30,       # seconds before an open circuit lets a trial call through
+}
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the gateway refuses a call (circuit open, rate limited or saturated)"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, timeout=None):
+        """Take one token, waiting up to `timeout` seconds (forever if None). Returns success."""
+        if not self.rate:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures, half-opens after `reset_timeout`"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self.trial_in_flight:
+                # Let a single trial call probe the provider
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def release_trial(self):
+        """Give back a trial slot that was granted but never used"""
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"LLM circuit opened after {self.failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class ProviderGate:
+    """Rate limit, concurrency cap, circuit breaker and stats for one provider"""
+
+    def __init__(self, name, config):
+        self.name = name
+        self.config = {**DEFAULT_PROVIDER_SETTINGS, **config}
+        self.bucket = TokenBucket(self.config['rate_per_minute'] / 60.0, self.config['burst'])
+        self.slots = threading.BoundedSemaphore(self.config['max_concurrency'])
+        self.breaker = CircuitBreaker(self.config['failure_threshold'], self.config['reset_timeout'])
+        self.stats_lock = threading.Lock()
+        self.counters = {
+            'calls': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'rejected_circuit_open': 0,
+            'rejected_rate_limited': 0,
+            'rejected_saturated': 0,
+            'in_flight': 0,
+            'cache_hits': 0,
+            'total_latency_ms': 0.0,
+        }
+
+    def _count(self, key, amount=1):
+        with self.stats_lock:
+            self.counters[key] += amount
+
+    def _admit(self):
+        """Pass the circuit breaker, rate limit and concurrency cap, or raise LLMUnavailableError"""
+        self._count('calls')
+        if not self.breaker.allow():
+            self._count('rejected_circuit_open')
+            raise LLMUnavailableError(f"{self.name} circuit is open")
+
+        timeout = self.config['acquire_timeout']
+        if not self.bucket.acquire(timeout):
+            self._count('rejected_rate_limited')
+            self.breaker.release_trial()
+            raise LLMUnavailableError(f"{self.name} rate limit exceeded")
+        if not self.slots.acquire(timeout=timeout):
+            self._count('rejected_saturated')
+            self.breaker.release_trial()
+            raise LLMUnavailableError(f"{self.name} has too many requests in flight")
+        self._count('in_flight')
+
+    def _release(self, started):
+        self._count('total_latency_ms', (time.monotonic() - started) * 1000)
+        self._count('in_flight', -1)
+        self.slots.release()
+
+    def call(self, func, *args, **kwargs):
+        self._admit()
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except LLMUnavailableError:
+            # Raised by the backend itself (e.g. a replay miss) - not a provider fault
+            self.breaker.release_trial()
+            self._count('failed')
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            self._count('failed')
+            raise
+        else:
+            self.breaker.record_success()
+            self._count('succeeded')
+            return result
+        finally:
+            self._release(started)
+
+    def stream(self, func, *args, **kwargs):
+        """Like call() for a func returning an iterator of chunks; the slot is held until the stream ends"""
+        self._admit()
+        started = time.monotonic()
+        try:
+            yield from func(*args, **kwargs)
+        except GeneratorExit:
+            # The consumer stopped reading (e.g. client disconnected) - not a provider fault
+            self.breaker.release_trial()
+            self._count('succeeded')
+            raise
+        except LLMUnavailableError:
+            self.breaker.release_trial()
+            self._count('failed')
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            self._count('failed')
+            raise
+        else:
+            self.breaker.record_success()
+            self._count('succeeded')
+        finally:
+            self._release(started)
+
+    def stats(self):
+        with self.stats_lock:
+            stats = dict(self.counters)
+        completed = stats['succeeded'] + stats['failed']
+        stats['avg_latency_ms'] = round(stats.pop('total_latency_ms') / completed, 1) if completed else 0.0
+        stats['circuit_state'] = self.breaker.state
+        return stats
+
+
+class LiveBackend:
+    """Calls the real providers using the shared clients from llm_clients"""
+
+    name = 'live'
+
+    def is_available(self, provider):
+        """Whether the provider is configured (has an API key)"""
+        if provider == 'openai':
+            return get_openai_client() is not None
+        return bool(getattr(settings, 'GEMINI_API_KEY', None))
+
+    def generate(self, prompt, model=DEFAULT_GEMINI_MODEL, **kwargs):
+        response = get_gemini_model(model).generate_content(prompt, **kwargs)
+        return response.text if hasattr(response, 'text') else str(response)
+
+    def generate_stream(self, prompt, model=DEFAULT_GEMINI_MODEL, **kwargs):
+        for chunk in get_gemini_model(model).generate_content(prompt, stream=True, **kwargs):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. only safety metadata)
+                continue
+            if text:
+                yield text
+
+    def chat(self, messages, model='gpt-3.5-turbo', **kwargs):
+        response = get_openai_client().chat.completions.create(model=model, messages=messages, **kwargs)
+        return response.choices[0].message.content
+
+
+BACKENDS = {
+    'live': 'hr_app.llm_gateway.LiveBackend',
+    'stub': 'hr_app.llm_stub.StubBackend',
+    'record': 'hr_app.llm_recorder.RecordingBackend',
+    'replay': 'hr_app.llm_recorder.ReplayBackend',
+}
+
+
+def load_backend(name):
+    """Instantiate a backend by short name ('live', 'stub', 'record', 'replay') or dotted class path"""
+    return import_string(BACKENDS.get(name, name))()
+
+
+def split_into_chunks(text, words_per_chunk=3):
+    """Split text into stream-sized pieces (a few words each) that join back to the original"""
+    pieces = re.findall(r'\s*\S+', text)
+    chunks = [''.join(pieces[i:i + words_per_chunk]) for i in range(0, len(pieces), words_per_chunk)]
+    trailing = text[len(''.join(pieces)):]
+    if trailing:
+        chunks.append(trailing)
+    return chunks
+
+
+def request_fingerprint(provider, model, payload, options=None):
+    """Stable hash identifying an LLM request (provider, model, prompt/messages and options)"""
+    data = json.dumps([provider, model, payload, options or {}], sort_keys=True, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def response_cache_key(fingerprint):
+    return f'llm:response:{fingerprint}'
+
+
+def get_response_cache():
+    """Cache holding LLM responses (shared between processes when LLM_RESPONSE_CACHE_ALIAS is)"""
+    return caches[getattr(settings, 'LLM_RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def normalize_prompt(prompt):
+    """Canonical form of a prompt for cache keys: trimmed lines, single spaces, at most one blank line"""
+    lines = [re.sub(r'[ \t]+', ' ', line).strip() for line in prompt.strip().splitlines()]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines))
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution whose outcome all callers share"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, func):
+        """Run func() unless a call for `key` is already running; returns (result, shared)"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result'], True
+
+        try:
+            call['result'] = func()
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call['done'].set()
+        return call['result'], False
+
+
+class PromptCache:
+    """
+    TTL cache of Gemini responses keyed on the normalized prompt, with single-flight
+    coalescing so identical concurrent prompts share one upstream call
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.flights = SingleFlight()
+        self.stats_lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'coalesced': 0, 'errors': 0}
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.counters[key] += 1
+
+    def key(self, namespace, prompt, model, options=None):
+        data = json.dumps([model, normalize_prompt(prompt), options or {}], sort_keys=True, default=str)
+        return f'llm:prompt:{namespace}:{hashlib.sha256(data.encode("utf-8")).hexdigest()}'
+
+    def lookup(self, key):
+        """Cached response for `key` (counted as a hit), or None"""
+        cached = get_response_cache().get(key)
+        if cached is not None:
+            self._count('hits')
+        return cached
+
+    def store(self, key, response):
+        """Store a response generated outside get_or_generate (counted as a miss)"""
+        get_response_cache().set(key, response, self.ttl)
+        self._count('misses')
+
+    def get_or_generate(self, key, generate):
+        cache = get_response_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            self._count('hits')
+            return cached
+
+        def fetch():
+            # A caller that finished just before this flight started may already have stored it
+            response = cache.get(key)
+            if response is None:
+                response = generate()
+                cache.set(key, response, self.ttl)
+            return response
+
+        try:
+            response, shared = self.flights.do(key, fetch)
+        except Exception:
+            self._count('errors')
+            raise
+        self._count('coalesced' if shared else 'misses')
+        return response
+
+    def stats(self):
+        with self.stats_lock:
+            stats = dict(self.counters)
+        requests = stats['hits'] + stats['misses'] + stats['coalesced']
+        stats['requests'] = requests
+        stats['ttl'] = self.ttl
+        # Share of requests answered without a call of their own to the provider
+        stats['hit_rate'] = round((stats['hits'] + stats['coalesced']) / requests, 3) if requests else 0.0
+        return stats
+
+
+class LLMGateway:
+    """Routes prompts to the configured backend through per-provider gates"""
+
+    PROVIDERS = ('gemini', 'openai')
+
+    def __init__(self, config=None, backend=None):
+        config = config if config is not None else getattr(settings, 'LLM_GATEWAY', {})
+        self.gates = {name: ProviderGate(name, config.get(name, {})) for name in self.PROVIDERS}
+        self.backend = backend or load_backend(getattr(settings, 'LLM_BACKEND', 'live'))
+        # Responses are only cached when a TTL is configured (e.g. after warming from recordings)
+        self.response_cache_ttl = getattr(settings, 'LLM_RESPONSE_CACHE_TTL', 0)
+        self.prompt_cache = PromptCache(getattr(settings, 'LLM_PROMPT_CACHE_TTL', 3600))
+
+    def is_available(self, provider):
+        """Whether the provider can be called with the current backend"""
+        return self.backend.is_available(provider)
+
+    def generate(self, prompt, model=DEFAULT_GEMINI_MODEL, **kwargs):
+        """Send a prompt to Gemini and return the response text"""
+        return self._call('gemini', self.backend.generate, prompt, model, kwargs)
+
+    def generate_cached(self, prompt, namespace='default', model=DEFAULT_GEMINI_MODEL, **kwargs):
+        """
+        generate() for prompts that recur verbatim (default prompts, double submits): responses are
+        cached per normalized prompt for LLM_PROMPT_CACHE_TTL seconds and concurrent identical
+        prompts wait for a single upstream call
+        """
+        key = self.prompt_cache.key(namespace, prompt, model, kwargs)
+        return self.prompt_cache.get_or_generate(key, lambda: self.generate(prompt, model=model, **kwargs))
+
+    def generate_stream(self, prompt, namespace=None, model=DEFAULT_GEMINI_MODEL, **kwargs):
+        """
+        Yield Gemini response text as it is generated. With a namespace, a prompt-cache hit is
+        yielded as a single chunk and a completed stream is stored in the prompt cache.
+        """
+        key = None
+        if namespace:
+            key = self.prompt_cache.key(namespace, prompt, model, kwargs)
+            cached = self.prompt_cache.lookup(key)
+            if cached is not None:
+                yield cached
+                return
+
+        method = getattr(self.backend, 'generate_stream', None)
+        if method is None:
+            # Backends without streaming deliver the whole response as one chunk
+            method = lambda payload, **options: iter([self.backend.generate(payload, **options)])
+
+        parts = []
+        for chunk in self.gates['gemini'].stream(method, prompt, model=model, **kwargs):
+            parts.append(chunk)
+            yield chunk
+        if key:
+            self.prompt_cache.store(key, ''.join(parts))
+
+    def chat(self, messages, model='gpt-3.5-turbo', **kwargs):
+        """Send chat messages to OpenAI and return the first choice's content"""
+        if not self.backend.is_available('openai'):
+            raise LLMUnavailableError("OpenAI API key not configured")
+        return self._call('openai', self.backend.chat, messages, model, kwargs)
+
+    def _call(self, provider, method, payload, model, options):
+        gate = self.gates[provider]
+        cache_key = None
+        if self.response_cache_ttl:
+            cache_key = response_cache_key(request_fingerprint(provider, model, payload, options))
+            cached = get_response_cache().get(cache_key)
+            if cached is not None:
+                gate._count('cache_hits')
+                return cached
+
+        result = gate.call(method, payload, model=model, **options)
+        if cache_key:
+            get_response_cache().set(cache_key, result, self.response_cache_ttl)
+        return result
+
+    def stats(self):
+        stats = {name: gate.stats() for name, gate in self.gates.items()}
+        stats['prompt_cache'] = self.prompt_cache.stats()
+        stats['backend'] = self.backend.name
+        return stats
+
+
+class PacedGateway:
+    """
+    Wraps a gateway so every call first takes a token from `bucket`, pacing one caller
+    (e.g. a bulk command) below the process-wide provider limits
+    """
+
+    def __init__(self, gateway, bucket):
+        self.gateway = gateway
+        self.bucket = bucket
+
+    def generate(self, prompt, **kwargs):
+        self.bucket.acquire()
+        return self.gateway.generate(prompt, **kwargs)
+
+    def chat(self, messages, **kwargs):
+        self.bucket.acquire()
+        return self.gateway.chat(messages, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.gateway, name)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """Return the process-wide gateway, creating it on first use"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
+
+
+def generate_text(prompt, **kwargs):
+    """Shortcut for get_gateway().generate()"""
+    return get_gateway().generate(prompt, **kwargs)
+
+
+def chat_completion(messages, **kwargs):
+    """Shortcut for get_gateway().chat()"""
+    return get_gateway().chat(messages, **kwargs)
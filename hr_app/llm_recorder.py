@@ -0,0 +1,186 @@
+"""
+Record/replay of LLM traffic
+LLM_BACKEND = 'record' passes calls through to LLM_RECORD_BACKEND (normally 'live') and stores
+each request fingerprint, response and latency in a local SQLite file (LLM_RECORD_STORE).
+LLM_BACKEND = 'replay' answers from that store, optionally reproducing the recorded latency,
+so benchmark runs are reproducible and need no API quota. Recordings can also be loaded
+into the LLM response cache (see the llm_recordings management command).
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from django.conf import settings
+from django.utils import timezone
+from .llm_gateway import LLMUnavailableError, load_backend, request_fingerprint, split_into_chunks
+
+logger = logging.getLogger(__name__)
+
+
+class RecordingStore:
+    """Append-only SQLite store of LLM responses keyed by request fingerprint"""
+
+    def __init__(self, path=None):
+        self.path = str(path or getattr(settings, 'LLM_RECORD_STORE', settings.BASE_DIR / 'llm_recordings.sqlite3'))
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_recordings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fingerprint TEXT NOT NULL,
+                    provider TEXT NOT NULL,
+                    model TEXT,
+                    prompt TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    latency_ms REAL NOT NULL,
+                    recorded_at TEXT NOT NULL
+                )
+                """
+            )
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS llm_recordings_fingerprint ON llm_recordings (fingerprint)'
+            )
+
+    def add(self, fingerprint, provider, model, prompt, response, latency_ms):
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT INTO llm_recordings (fingerprint, provider, model, prompt, response, latency_ms, recorded_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (fingerprint, provider, model, prompt, response, latency_ms, timezone.now().isoformat()),
+            )
+
+    def lookup(self, fingerprint):
+        """Most recent (response, latency_ms) for the fingerprint, or None"""
+        with self.lock:
+            return self.connection.execute(
+                'SELECT response, latency_ms FROM llm_recordings WHERE fingerprint = ? ORDER BY id DESC LIMIT 1',
+                (fingerprint,),
+            ).fetchone()
+
+    def latest(self):
+        """Yield (fingerprint, provider, response) for the newest recording of each request"""
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT fingerprint, provider, response FROM llm_recordings WHERE id IN '
+                '(SELECT MAX(id) FROM llm_recordings GROUP BY fingerprint)'
+            ).fetchall()
+        yield from rows
+
+    def summary(self):
+        """Per-provider recording counts, distinct requests and latency"""
+        with self.lock:
+            return self.connection.execute(
+                'SELECT provider, COUNT(*), COUNT(DISTINCT fingerprint), AVG(latency_ms), MAX(latency_ms) '
+                'FROM llm_recordings GROUP BY provider'
+            ).fetchall()
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM llm_recordings')
+
+
+def _prompt_text(payload):
+    if isinstance(payload, str):
+        return payload
+    return '\n'.join(f"{message.get('role')}: {message.get('content')}" for message in payload)
+
+
+class RecordingBackend:
+    """Passes calls through to another backend and records every response"""
+
+    name = 'record'
+
+    def __init__(self, inner=None, store=None):
+        self.inner = inner or load_backend(getattr(settings, 'LLM_RECORD_BACKEND', 'live'))
+        self.store = store or RecordingStore()
+
+    def is_available(self, provider):
+        return self.inner.is_available(provider)
+
+    def _record(self, provider, method, payload, model, kwargs):
+        started = time.monotonic()
+        response = method(payload, model=model, **kwargs)
+        latency_ms = (time.monotonic() - started) * 1000
+        try:
+            self.store.add(
+                request_fingerprint(provider, model, payload, kwargs),
+                provider, model, _prompt_text(payload), response, latency_ms,
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to record LLM response: {str(e)}")
+        return response
+
+    def generate(self, prompt, model=None, **kwargs):
+        return self._record('gemini', self.inner.generate, prompt, model, kwargs)
+
+    def generate_stream(self, prompt, model=None, **kwargs):
+        # Recorded as one response once the stream completes, so it replays for generate() too
+        inner_stream = getattr(self.inner, 'generate_stream', None)
+        if inner_stream is None:
+            yield self.generate(prompt, model=model, **kwargs)
+            return
+        started = time.monotonic()
+        parts = []
+        for chunk in inner_stream(prompt, model=model, **kwargs):
+            parts.append(chunk)
+            yield chunk
+        try:
+            self.store.add(
+                request_fingerprint('gemini', model, prompt, kwargs),
+                'gemini', model, prompt, ''.join(parts), (time.monotonic() - started) * 1000,
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to record LLM response: {str(e)}")
+
+    def chat(self, messages, model=None, **kwargs):
+        return self._record('openai', self.inner.chat, messages, model, kwargs)
+
+
+class ReplayBackend:
+    """
+    Answers from recorded responses. Misses raise LLMUnavailableError (so callers use
+    their fallbacks) unless LLM_REPLAY_MISS names a backend to fall through to.
+    """
+
+    name = 'replay'
+
+    def __init__(self, store=None):
+        self.store = store or RecordingStore()
+        self.simulate_latency = getattr(settings, 'LLM_REPLAY_LATENCY', True)
+        miss_backend = getattr(settings, 'LLM_REPLAY_MISS', None)
+        self.miss_backend = load_backend(miss_backend) if miss_backend else None
+
+    def is_available(self, provider):
+        return True
+
+    def _replay(self, provider, payload, model, kwargs, miss_method):
+        recorded = self.store.lookup(request_fingerprint(provider, model, payload, kwargs))
+        if recorded is None:
+            if self.miss_backend is None:
+                raise LLMUnavailableError(f"No recorded {provider} response for this request")
+            return getattr(self.miss_backend, miss_method)(payload, model=model, **kwargs)
+        response, latency_ms = recorded
+        if self.simulate_latency:
+            time.sleep(latency_ms / 1000)
+        return response
+
+    def generate(self, prompt, model=None, **kwargs):
+        return self._replay('gemini', prompt, model, kwargs, 'generate')
+
+    def generate_stream(self, prompt, model=None, **kwargs):
+        recorded = self.store.lookup(request_fingerprint('gemini', model, prompt, kwargs))
+        if recorded is None:
+            yield self._replay('gemini', prompt, model, kwargs, 'generate')
+            return
+        response, latency_ms = recorded
+        chunks = split_into_chunks(response) or ['']
+        for chunk in chunks:
+            if self.simulate_latency:
+                time.sleep(latency_ms / 1000 / len(chunks))
+            yield chunk
+
+    def chat(self, messages, model=None, **kwargs):
+        return self._replay('openai', messages, model, kwargs, 'chat')
@@ -0,0 +1,256 @@
+"""
+Deterministic local stand-in for Gemini and OpenAI, used for load testing and offline benchmarks
+Enable with LLM_BACKEND = 'stub'. Responses are derived from a hash of the prompt, so the same
+prompt always gets the same answer, and each prompt type gets output in the shape its caller parses.
+Latency is simulated from the distribution configured in LLM_STUB_LATENCY.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from django.conf import settings
+from .llm_gateway import split_into_chunks
+
+DEFAULT_LATENCY = {
+    'distribution': 'lognormal',  # fixed | uniform | normal | lognormal
+    'median_ms': 800,             # lognormal
+    'sigma': 0.5,                 # lognormal
+    'ms': 500,                    # fixed
+    'min_ms': 200,                # uniform
+    'max_ms': 1500,               # uniform
+    'mean_ms': 800,               # normal
+    'stddev_ms': 250,             # normal
+    'seed': None,                 # seed for the latency sampler, None for non-repeatable timings
+}
+FIRST_CHUNK_SHARE = 0.3  # share of the sampled latency spent before the first streamed chunk
+
+SKILLS = [
+    'Python', 'Django', 'React', 'TypeScript', 'SQL', 'Docker', 'Kubernetes', 'AWS',
+    'System Design', 'Communication', 'Leadership', 'Testing', 'CI/CD', 'Data Analysis',
+]
+CATEGORIES = ['frontend', 'backend', 'fullstack', 'devops', 'data_science', 'cloud', 'soft_skills']
+LEVELS = ['novice', 'beginner', 'intermediate', 'advanced', 'expert']
+PRIORITIES = ['critical', 'high', 'medium', 'low']
+DIFFICULTIES = ['beginner', 'intermediate', 'advanced']
+EXPERIENCE_LEVELS = ['fresher', 'junior', 'mid', 'senior', 'lead', 'principal']
+
+
+class LatencySampler:
+    """Draws simulated response times (in seconds) from the configured distribution"""
+
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_LATENCY, **(config or {})}
+        self.rng = random.Random(self.config['seed'])
+        self.lock = threading.Lock()
+
+    def sample(self):
+        config = self.config
+        distribution = config['distribution']
+        with self.lock:
+            if distribution == 'fixed':
+                ms = config['ms']
+            elif distribution == 'uniform':
+                ms = self.rng.uniform(config['min_ms'], config['max_ms'])
+            elif distribution == 'normal':
+                ms = self.rng.gauss(config['mean_ms'], config['stddev_ms'])
+            elif distribution == 'lognormal':
+                ms = config['median_ms'] * self.rng.lognormvariate(0, config['sigma'])
+            else:
+                raise ValueError(f"Unknown latency distribution: {distribution}")
+        return max(0.0, ms) / 1000.0
+
+
+class StubBackend:
+    """Gateway backend that fabricates schema-valid responses locally"""
+
+    name = 'stub'
+
+    def __init__(self, latency=None):
+        self.latency = LatencySampler(latency if latency is not None else getattr(settings, 'LLM_STUB_LATENCY', {}))
+
+    def is_available(self, provider):
+        return True
+
+    def generate(self, prompt, model=None, **kwargs):
+        time.sleep(self.latency.sample())
+        return respond(prompt)
+
+    def generate_stream(self, prompt, model=None, **kwargs):
+        # Time to first chunk is a share of the sampled latency; the rest is spread over the chunks
+        latency = self.latency.sample()
+        chunks = split_into_chunks(respond(prompt))
+        time.sleep(latency * FIRST_CHUNK_SHARE)
+        for chunk in chunks:
+            yield chunk
+            time.sleep(latency * (1 - FIRST_CHUNK_SHARE) / len(chunks))
+
+    def chat(self, messages, model=None, **kwargs):
+        time.sleep(self.latency.sample())
+        return respond('\n'.join(message.get('content', '') for message in messages))
+
+
+def classify_prompt(prompt):
+    """Identify which app prompt this is, by the phrases each prompt template uses"""
+    text = prompt.lower()
+    if 'analyze the following resume' in text:
+        return 'resume_analysis'
+    if '"employees"' in text and 'recommend specific online courses' in text:
+        return 'course_recommendations_batch'
+    if '"employees"' in text and 'skill gaps' in text:
+        return 'skill_gaps_batch'
+    if 'identify skill gaps' in text:
+        return 'skill_gaps'
+    if 'recommend specific online courses' in text:
+        return 'course_recommendations'
+    if '"understanding"' in text and '"course_completed"' in text:
+        return 'course_grading'
+    if '"score"' in text and '"completed"' in text:
+        return 'action_grading'
+    if 'questions' in text and 'generate' in text:
+        return 'questions'
+    return 'suggestion'
+
+
+def respond(prompt):
+    """Deterministic response text for `prompt`"""
+    rng = random.Random(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+    kind = classify_prompt(prompt)
+    if kind == 'questions':
+        return _questions(rng, prompt)
+    if kind == 'suggestion':
+        return _suggestion(rng)
+    return json.dumps(RESPONDERS[kind](rng, prompt))
+
+
+def _skill_gaps(rng):
+    gaps = []
+    for skill in rng.sample(SKILLS, 3):
+        current = rng.randrange(0, 3)
+        gaps.append({
+            "skill_name": skill,
+            "category": rng.choice(CATEGORIES),
+            "priority": rng.choice(PRIORITIES),
+            "current_level": LEVELS[current],
+            "target_level": LEVELS[current + rng.randint(1, 2)],
+            "learning_outcomes": [f"Apply {skill} in production work", f"Explain {skill} trade-offs"],
+            "reason": f"{skill} is expected at the next level of this role"
+        })
+    return {
+        "skill_gaps": gaps,
+        "overall_development_focus": gaps[0]["skill_name"],
+        "career_progression_path": f"Build depth in {gaps[0]['skill_name']} and {gaps[1]['skill_name']}"
+    }
+
+
+def _skill_gaps_single(rng, prompt):
+    return _skill_gaps(rng)
+
+
+def _skill_gaps_batch(rng, prompt):
+    employee_ids = [int(employee_id) for employee_id in re.findall(r'"employee_id":\s*(\d+)', prompt)]
+    # The last match is the example in the response format, which follows the employee list
+    employee_ids = list(dict.fromkeys(employee_ids[:-1] or employee_ids))
+    return {"employees": [{"employee_id": employee_id, **_skill_gaps(rng)} for employee_id in employee_ids]}
+
+
+def _course_recommendations(rng, prompt):
+    gap_names = re.findall(r'^\s*-\s*(.+?)\s*\(\w+ priority\)', prompt, re.MULTILINE) or ['General Development']
+    courses = []
+    for gap in gap_names:
+        for number in range(1, 3):
+            slug = re.sub(r'[^a-z0-9]+', '-', gap.lower()).strip('-')
+            courses.append({
+                "title": f"{gap} Masterclass Part {number}",
+                "provider": "udemy",
+                "skill_category": rng.choice(CATEGORIES),
+                "difficulty_level": rng.choice(DIFFICULTIES),
+                "description": f"Hands-on course covering {gap}.",
+                "skills_covered": [gap],
+                "estimated_duration_hours": rng.randint(4, 40),
+                "target_skill_gap": gap,
+                "course_url": f"https://www.udemy.com/course/{slug}-{number}/",
+                "estimated_rating": round(rng.uniform(4.0, 4.9), 1),
+                "estimated_price": round(rng.uniform(9.99, 99.99), 2),
+                "learning_outcomes": [f"Use {gap} confidently"],
+                "why_recommended": f"Closes the {gap} gap"
+            })
+    return {"course_recommendations": courses}
+
+
+def _course_recommendations_batch(rng, prompt):
+    employees = json.loads(re.search(r'Employees:\s*(\[.*?\])\s*$', prompt, re.MULTILINE).group(1))
+    return {"employees": [
+        {
+            "employee_id": employee["employee_id"],
+            "course_recommendations": _course_recommendations(
+                rng, '\n'.join(f"- {gap}" for gap in employee["gaps"])
+            )["course_recommendations"],
+        }
+        for employee in employees
+    ]}
+
+
+def _resume_analysis(rng, prompt):
+    years = round(rng.uniform(0, 15), 1)
+    skills = rng.sample(SKILLS, 8)
+    return {
+        "personal_info": {"name": "Stub Candidate", "email": "stub@example.com", "phone": "", "location": "Remote"},
+        "experience": {
+            "total_years": years,
+            "total_months": int(years * 12),
+            "level": EXPERIENCE_LEVELS[min(int(years // 2.5), len(EXPERIENCE_LEVELS) - 1)],
+            "current_role": "Software Engineer",
+            "domain_experience": {"Web Development": round(years * 0.7, 1)}
+        },
+        "skills": {"primary_skills": skills[:5], "secondary_skills": skills[5:], "soft_skills": ["Communication"]},
+        "education": [{"degree": "B.Tech", "institution": "Stub University", "year": "2015", "grade": ""}],
+        "certifications": [],
+        "projects": [{"name": "Stub Project", "description": "", "technologies": skills[:2], "duration": ""}],
+        "career_preferences": {"desired_roles": [], "current_salary": "", "expected_salary": "", "preferred_locations": []},
+        "analysis": {
+            "resume_summary": f"Engineer with {years} years of experience.",
+            "strengths": skills[:2],
+            "areas_for_improvement": skills[5:7],
+            "resume_score": rng.randint(50, 95)
+        }
+    }
+
+
+def _action_grading(rng, prompt):
+    score = rng.randint(3, 10)
+    return {"score": score, "feedback": "Answers were reviewed by the stub grader.", "completed": score >= 6}
+
+
+def _course_grading(rng, prompt):
+    scores = {key: rng.randint(3, 10) for key in ('understanding', 'application', 'completion', 'overall')}
+    return {**scores, "feedback": "Answers were reviewed by the stub grader.", "course_completed": scores['overall'] >= 6}
+
+
+def _questions(rng, prompt):
+    topics = rng.sample(['a real project', 'a trade-off you made', 'a mistake you fixed', 'how you measured success', 'what you would do differently'], 3)
+    return '\n'.join(
+        [f"Here are {len(topics)} questions:"]
+        + [f'{number}. "Can you describe {topic} related to this work?"' for number, topic in enumerate(topics, 1)]
+    )
+
+
+def _suggestion(rng):
+    return rng.choice([
+        "Consistently delivers on commitments; focus next on communicating blockers earlier.",
+        "Strong technical execution; would benefit from more proactive collaboration with the team.",
+        "Shows good ownership; improving documentation would help others build on this work.",
+    ])
+
+
+RESPONDERS = {
+    'resume_analysis': _resume_analysis,
+    'skill_gaps': _skill_gaps_single,
+    'skill_gaps_batch': _skill_gaps_batch,
+    'course_recommendations_batch': _course_recommendations_batch,
+    'course_recommendations': _course_recommendations,
+    'action_grading': _action_grading,
+    'course_grading': _course_grading,
+}
@@ -0,0 +1,78 @@
+"""
+Management command to inspect recorded LLM traffic and warm the LLM response cache from it
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from hr_app.llm_gateway import get_response_cache, response_cache_key
+from hr_app.llm_recorder import RecordingStore
+
+
+class Command(BaseCommand):
+    help = 'Summarize recorded LLM responses, warm the response cache from them, or clear them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--store',
+            type=str,
+            help='Recording store to use (default: LLM_RECORD_STORE)',
+        )
+        parser.add_argument(
+            '--warm-cache',
+            action='store_true',
+            help='Load the newest response for every recorded request into the LLM response cache',
+        )
+        parser.add_argument(
+            '--ttl',
+            type=int,
+            help='Cache timeout in seconds for warmed entries (default: LLM_RESPONSE_CACHE_TTL)',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete all recordings',
+        )
+
+    def handle(self, *args, **options):
+        store = RecordingStore(options.get('store'))
+
+        if options['clear']:
+            store.clear()
+            self.stdout.write(self.style.SUCCESS(f'Cleared recordings in {store.path}'))
+            return
+
+        if options['warm_cache']:
+            self.warm_cache(store, options.get('ttl'))
+
+        self.summarize(store)
+
+    def warm_cache(self, store, ttl):
+        ttl = ttl if ttl is not None else getattr(settings, 'LLM_RESPONSE_CACHE_TTL', 0)
+        if not ttl:
+            raise CommandError('Set LLM_RESPONSE_CACHE_TTL or pass --ttl; the gateway ignores the cache without a TTL')
+
+        cache = get_response_cache()
+        batch = {}
+        warmed = 0
+        for fingerprint, provider, response in store.latest():
+            batch[response_cache_key(fingerprint)] = response
+            if len(batch) >= 500:
+                cache.set_many(batch, ttl)
+                warmed += len(batch)
+                batch = {}
+        if batch:
+            cache.set_many(batch, ttl)
+            warmed += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Warmed {warmed} responses into the LLM response cache (ttl {ttl}s)'))
+
+    def summarize(self, store):
+        rows = store.summary()
+        if not rows:
+            self.stdout.write(f'No recordings in {store.path}')
+            return
+        self.stdout.write(self.style.SUCCESS(f'Recordings in {store.path}:'))
+        for provider, count, distinct, avg_latency, max_latency in rows:
+            self.stdout.write(
+                f'{provider}: {count} responses | {distinct} distinct requests | '
+                f'avg {avg_latency:.0f}ms | max {max_latency:.0f}ms'
+            )
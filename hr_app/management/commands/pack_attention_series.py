@@ -0,0 +1,61 @@
+"""
+Management command to pack existing attention tracking rows into AttentionSeries blobs
+Assessments recorded before the packed series existed still have one AttentionTrackingData row
+per frame. They stay readable as they are; this command converts them, and with --delete-rows
+removes the rows afterwards to reclaim the space. Rows the series can't store exactly (labels
+without a code, fractional scores) are never deleted; they are reported instead.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from hr_app.attention_series import SAMPLE_DTYPE, append_samples, packs_exactly
+from hr_app.models import AttentionTrackingData, VideoAssessment
+
+
+class Command(BaseCommand):
+    help = 'Pack per-frame attention tracking rows into one series per assessment'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete-rows',
+            action='store_true',
+            help='Delete the AttentionTrackingData rows once they are packed, except rows the series cannot store exactly',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Pack at most this many assessments',
+        )
+
+    def handle(self, *args, **options):
+        assessments = VideoAssessment.objects.filter(
+            attention_data__isnull=False, attention_series__isnull=True
+        ).distinct().order_by('id')[:options['limit']]
+
+        packed = samples = kept = 0
+        for assessment in assessments:
+            rows = list(AttentionTrackingData.objects.filter(assessment=assessment).order_by('timestamp'))
+            lossy = [row for row in rows if not packs_exactly(row)]
+            with transaction.atomic():
+                append_samples(assessment, rows)
+                if options['delete_rows']:
+                    lossy_ids = {row.id for row in lossy}
+                    AttentionTrackingData.objects.filter(
+                        id__in=[row.id for row in rows if row.id not in lossy_ids]
+                    ).delete()
+            packed += 1
+            samples += len(rows)
+            kept += len(lossy)
+            self.stdout.write(f'Assessment #{assessment.id}: {len(rows)} samples')
+            if lossy:
+                self.stdout.write(self.style.WARNING(
+                    f'  {len(lossy)} rows not stored exactly by the series'
+                    + (' were kept' if options['delete_rows'] else '') + ': '
+                    + ', '.join(f'#{row.id}' for row in lossy)
+                ))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {packed} assessments, {samples} samples packed into '
+            f'{samples * SAMPLE_DTYPE.itemsize} bytes'
+            + (f' (rows deleted, {kept} kept)' if options['delete_rows'] else '')
+        ))
@@ -0,0 +1,26 @@
+"""
+Management command to clean up abandoned assessment video uploads
+Aborts chunked uploads that stopped receiving chunks (the browser was closed mid-assessment)
+and deletes their partial files
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from hr_app.upload_service import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Abort assessment video uploads that have not received a chunk recently'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='Abort open uploads idle for longer than this many hours (default: 24)',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timezone.timedelta(hours=options['hours'])
+        purged = purge_stale_uploads(cutoff)
+        self.stdout.write(self.style.SUCCESS(f'Aborted {purged} stale uploads'))
@@ -0,0 +1,26 @@
+"""
+Management command to rebuild FeedbackRollup totals from ManagerFeedback
+Signals keep the rollups current for saves and deletes through the ORM; feedback inserted
+with bulk_create, loaded from SQL (e.g. sample_feedback_data.sql) or written before the
+rollup existed is only counted after running this.
+"""
+
+from django.core.management.base import BaseCommand
+from hr_app.models import FeedbackRollup
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-employee feedback rollups from the stored feedback'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employee',
+            type=int,
+            action='append',
+            dest='employee_ids',
+            help='Only rebuild the rollup of the user with this id (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = FeedbackRollup.rebuild(options['employee_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt feedback rollups for {rebuilt} employees'))
@@ -0,0 +1,243 @@
+"""
+Management command to regenerate AI development plans for the whole workforce
+Runs EmployeeDevelopmentService across CandidateProfiles in a rate-limited thread pool,
+checkpointing progress so an interrupted run can be resumed
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.db import connection
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from hr_app.models import CandidateProfile
+from hr_app.development_service import EmployeeDevelopmentService
+from hr_app.llm_gateway import PacedGateway, TokenBucket
+import json
+import os
+import threading
+import time
+
+
+class Command(BaseCommand):
+    help = 'Regenerate AI development plans for all (or a filtered set of) employee profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='users',
+            help='Only regenerate for this username (can be repeated)',
+        )
+        parser.add_argument(
+            '--experience-level',
+            choices=[level for level, _ in CandidateProfile.EXPERIENCE_LEVELS],
+            help='Only regenerate for profiles at this experience level',
+        )
+        parser.add_argument(
+            '--role',
+            type=str,
+            help='Only regenerate for profiles whose current role contains this text',
+        )
+        parser.add_argument(
+            '--include-unprocessed',
+            action='store_true',
+            help='Include profiles whose resume has not been processed yet',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Process at most this many profiles',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of plans generated concurrently (default: 4)',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=30,
+            help='Maximum AI requests started per minute, fallback calls included; 0 for unlimited (default: 30)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1,
+            help='Employees sharing one skill gap prompt; values above 1 use batched analysis (default: 1)',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            default=os.path.join(settings.BASE_DIR, 'development_plan_checkpoint.json'),
+            help='File used to record completed profiles',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip profiles already recorded in the checkpoint file',
+        )
+        parser.add_argument(
+            '--report-every',
+            type=int,
+            default=10,
+            help='Print throughput after every N profiles (default: 10)',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        self.checkpoint_path = options['checkpoint']
+        self.checkpoint_lock = threading.Lock()
+        self.checkpoint = self.load_checkpoint() if options['resume'] else {'completed': [], 'failed': {}}
+
+        profile_ids = self.select_profiles(options)
+        done = set(self.checkpoint['completed'])
+        pending = [profile_id for profile_id in profile_ids if profile_id not in done]
+        if options['limit']:
+            pending = pending[:options['limit']]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Regenerating development plans for {len(pending)} profiles '
+            f'({len(profile_ids) - len(pending)} skipped, {options["workers"]} workers, '
+            f'batch size {options["batch_size"]}, {options["rate"] or "unlimited"} per minute)'
+        ))
+        if not pending:
+            return
+
+        # Paces this run on top of the gateway's process-wide provider limits
+        limiter = TokenBucket(options['rate'] / 60.0, capacity=1)
+        started = time.monotonic()
+        processed = succeeded = plans_created = 0
+
+        batch_size = options['batch_size']
+        chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        last_report = 0
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = [
+                executor.submit(self.regenerate_profiles, chunk, limiter)
+                for chunk in chunks
+            ]
+            try:
+                for future in as_completed(futures):
+                    for profile_id, success, created, error in future.result():
+                        processed += 1
+                        if success:
+                            succeeded += 1
+                            plans_created += created
+                        self.record_result(profile_id, success, error)
+
+                    if processed - last_report >= options['report_every'] or processed == len(pending):
+                        last_report = processed
+                        self.report_progress(processed, len(pending), succeeded, plans_created, started)
+            except KeyboardInterrupt:
+                for future in futures:
+                    future.cancel()
+                self.stdout.write(self.style.WARNING(
+                    f'Interrupted - progress saved to {self.checkpoint_path}, rerun with --resume to continue'
+                ))
+                raise
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Finished {processed} profiles in {elapsed:.1f}s: {succeeded} succeeded, '
+            f'{processed - succeeded} failed, {plans_created} plans created '
+            f'({processed / elapsed * 60 if elapsed else 0:.1f} profiles/min)'
+        ))
+
+    def select_profiles(self, options):
+        """Return the ids of the profiles to regenerate, in a stable order"""
+        profiles = CandidateProfile.objects.all()
+        if not options['include_unprocessed']:
+            profiles = profiles.filter(resume_processed=True)
+        if options['users']:
+            profiles = profiles.filter(user_profile__user__username__in=options['users'])
+        if options['experience_level']:
+            profiles = profiles.filter(experience_level=options['experience_level'])
+        if options['role']:
+            profiles = profiles.filter(current_role__icontains=options['role'])
+        return list(profiles.order_by('id').values_list('id', flat=True))
+
+    def regenerate_profiles(self, profile_ids, limiter):
+        """
+        Worker: generate plans for a chunk of profiles.
+        Returns a list of (profile id, success, plans created, error).
+        """
+        results = []
+        try:
+            service = EmployeeDevelopmentService()
+            # Every AI call the service makes takes a token, including per-profile fallbacks
+            service.gateway = PacedGateway(service.gateway, limiter)
+            profiles = list(
+                CandidateProfile.objects.select_related('user_profile__user').filter(id__in=profile_ids)
+            )
+            missing = set(profile_ids) - {profile.id for profile in profiles}
+            results.extend((profile_id, False, 0, 'Profile not found') for profile_id in missing)
+
+            skill_analyses = {}
+            course_recommendations = {}
+            if len(profiles) > 1:
+                # One skill gap call and one course call for the whole chunk
+                skill_analyses = service.analyze_skill_gaps_batch(profiles, batch_size=len(profiles))
+                course_recommendations = service.recommend_courses_batch(skill_analyses, profiles, batch_size=len(profiles))
+
+            for profile in profiles:
+                try:
+                    result = service.create_development_plan(
+                        profile,
+                        skill_analysis=skill_analyses.get(profile.id),
+                        course_recommendations=course_recommendations.get(profile.id),
+                    )
+                    if result.get('success'):
+                        results.append((profile.id, True, result.get('created_plans', 0), ''))
+                    else:
+                        results.append((profile.id, False, 0, result.get('error', 'Unknown error')))
+                except Exception as e:
+                    results.append((profile.id, False, 0, str(e)))
+        except Exception as e:
+            done = {result[0] for result in results}
+            results.extend((profile_id, False, 0, str(e)) for profile_id in profile_ids if profile_id not in done)
+        finally:
+            # Worker threads open their own connections; don't leak them
+            connection.close()
+        return results
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+            checkpoint.setdefault('completed', [])
+            checkpoint.setdefault('failed', {})
+            self.stdout.write(f'Resuming from {self.checkpoint_path} ({len(checkpoint["completed"])} completed)')
+            return checkpoint
+        except FileNotFoundError:
+            return {'completed': [], 'failed': {}}
+        except (ValueError, OSError) as e:
+            raise CommandError(f'Could not read checkpoint {self.checkpoint_path}: {e}')
+
+    def record_result(self, profile_id, success, error):
+        """Record a finished profile and rewrite the checkpoint atomically"""
+        with self.checkpoint_lock:
+            if success:
+                self.checkpoint['completed'].append(profile_id)
+                self.checkpoint['failed'].pop(str(profile_id), None)
+            else:
+                self.checkpoint['failed'][str(profile_id)] = error
+                self.stderr.write(f'Profile {profile_id} failed: {error}')
+
+            tmp_path = f'{self.checkpoint_path}.tmp'
+            with open(tmp_path, 'w') as checkpoint_file:
+                json.dump(self.checkpoint, checkpoint_file)
+            os.replace(tmp_path, self.checkpoint_path)
+
+    def report_progress(self, processed, total, succeeded, plans_created, started):
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed else 0
+        remaining = (total - processed) / rate if rate else 0
+        self.stdout.write(
+            f'{processed}/{total} profiles | {succeeded} ok | {plans_created} plans | '
+            f'{rate * 60:.1f} profiles/min | elapsed {elapsed:.0f}s | eta {remaining:.0f}s'
+        )
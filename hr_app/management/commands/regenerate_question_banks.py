@@ -0,0 +1,80 @@
+"""
+Management command to (re)generate assessment question banks
+Builds the stored questions for feedback actions and learning courses, either only
+where a bank is missing or for everything (e.g. after changing the prompt or bank size)
+"""
+
+from django.core.management.base import BaseCommand
+from hr_app.models import FeedbackAction, LearningCourse
+from hr_app.assessment_service import AssessmentService
+from hr_app.llm_gateway import TokenBucket
+import time
+
+
+class Command(BaseCommand):
+    help = 'Generate assessment question banks for feedback actions and courses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            choices=['actions', 'courses'],
+            help='Only regenerate banks for actions or for courses',
+        )
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Only generate banks that do not exist yet',
+        )
+        parser.add_argument(
+            '--fallback-only',
+            action='store_true',
+            help='Only regenerate banks that fell back to template questions',
+        )
+        parser.add_argument(
+            '--id',
+            type=int,
+            action='append',
+            dest='ids',
+            help='Only regenerate the action/course with this id (can be repeated)',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=30,
+            help='Maximum AI requests per minute, 0 for unlimited (default: 30)',
+        )
+
+    def handle(self, *args, **options):
+        service = AssessmentService()
+        limiter = TokenBucket(options['rate'] / 60.0, capacity=1)
+        started = time.monotonic()
+        totals = {'ai': 0, 'fallback': 0}
+
+        targets = []
+        if options['only'] != 'courses':
+            targets.append(('action', self.select(FeedbackAction.objects.all(), options), service.build_action_bank))
+        if options['only'] != 'actions':
+            targets.append(('course', self.select(LearningCourse.objects.all(), options), service.build_course_bank))
+
+        for label, objects, build in targets:
+            objects = list(objects)
+            self.stdout.write(f'Generating question banks for {len(objects)} {label}s')
+            for obj in objects:
+                limiter.acquire()
+                bank = build(obj)
+                totals[bank.source] += 1
+                style = self.style.SUCCESS if bank.source == 'ai' else self.style.WARNING
+                self.stdout.write(style(f'{label} #{obj.id} {obj.title}: {len(bank.questions)} questions ({bank.source})'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done in {time.monotonic() - started:.1f}s: {totals["ai"]} AI generated, {totals["fallback"]} fallback'
+        ))
+
+    def select(self, queryset, options):
+        if options['ids']:
+            queryset = queryset.filter(id__in=options['ids'])
+        if options['missing']:
+            queryset = queryset.filter(question_bank__isnull=True)
+        if options['fallback_only']:
+            queryset = queryset.filter(question_bank__source='fallback')
+        return queryset.order_by('id')
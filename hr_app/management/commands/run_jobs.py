@@ -0,0 +1,58 @@
+"""
+Management command to run queued background jobs
+Picks up jobs that were queued but never started (e.g. the web process restarted).
+With --requeue-stale, jobs stuck in 'running' are re-queued first - only use it once the
+workers that were running them are known to be gone.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from hr_app.models import BackgroundJob
+from hr_app.jobs import HANDLERS, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs in this process'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            choices=sorted(HANDLERS),
+            help='Only run jobs of this kind',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Run at most this many jobs',
+        )
+        parser.add_argument(
+            '--requeue-stale',
+            type=int,
+            nargs='?',
+            const=getattr(settings, 'BACKGROUND_JOB_STALE_MINUTES', 30),
+            metavar='MINUTES',
+            help='First re-queue jobs that have been running for longer than this many minutes '
+                 '(default BACKGROUND_JOB_STALE_MINUTES). Only safe once their workers have stopped.',
+        )
+
+    def handle(self, *args, **options):
+        if options['requeue_stale'] is not None:
+            requeued = requeue_stale_jobs(options['requeue_stale'], kind=options['kind'])
+            self.stdout.write(f'Re-queued {len(requeued)} stale jobs')
+
+        jobs = BackgroundJob.objects.filter(status='queued').order_by('created_at')
+        if options['kind']:
+            jobs = jobs.filter(kind=options['kind'])
+        job_ids = list(jobs.values_list('id', flat=True))
+        if options['limit']:
+            job_ids = job_ids[:options['limit']]
+
+        ran = 0
+        for job_id in job_ids:
+            if run_job(job_id):
+                ran += 1
+                job = BackgroundJob.objects.get(id=job_id)
+                style = self.style.SUCCESS if job.status == 'succeeded' else self.style.ERROR
+                self.stdout.write(style(f'#{job.id} {job.kind} [{job.dedupe_key}]: {job.status} {job.error}'.rstrip()))
+
+        self.stdout.write(self.style.SUCCESS(f'Ran {ran} of {len(job_ids)} queued jobs'))
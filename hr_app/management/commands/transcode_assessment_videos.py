@@ -0,0 +1,64 @@
+"""
+Management command to write playback copies of stored assessment videos
+New recordings are transcoded by a background job when they are submitted; this command
+does the same for recordings stored before that, and reports the playback bandwidth saved.
+The original recordings are kept.
+"""
+
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand
+from hr_app.tasks import VIDEO_FIELD_MODELS, transcode_video_job
+
+
+class Command(BaseCommand):
+    help = 'Write smaller playback copies of stored assessment videos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            choices=sorted(VIDEO_FIELD_MODELS),
+            help='Only transcode videos of this kind of assessment',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Transcode at most this many videos of each kind',
+        )
+
+    def handle(self, *args, **options):
+        targets = {
+            model: model_class.objects.exclude(video='').values_list('id', flat=True)
+            for model, model_class in VIDEO_FIELD_MODELS.items()
+        }
+
+        totals = {'videos': 0, 'failed': 0, 'original_bytes': 0, 'transcoded_bytes': 0}
+        for model, ids in targets.items():
+            if options['only'] and model != options['only']:
+                continue
+            ids = list(ids.order_by('id'))[:options['limit']]
+            self.stdout.write(f'Transcoding {len(ids)} {model} videos')
+            for object_id in ids:
+                try:
+                    # Same handler the background job runs
+                    report = transcode_video_job(SimpleNamespace(payload={'model': model, 'id': object_id}))
+                except Exception as e:
+                    totals['failed'] += 1
+                    self.stdout.write(self.style.ERROR(f'{model} #{object_id}: {e}'))
+                    continue
+                if 'skipped' in report:
+                    continue
+                totals['videos'] += 1
+                totals['original_bytes'] += report['original_bytes']
+                totals['transcoded_bytes'] += report['transcoded_bytes'] if report['playback'] else report['original_bytes']
+                outcome = 'playback copy written' if report['playback'] else 'original plays as is'
+                self.stdout.write(
+                    f"{model} #{object_id}: {report['original_bytes'] / 1e6:.1f}MB -> "
+                    f"{report['transcoded_bytes'] / 1e6:.1f}MB ({report['saved_pct']}% smaller, "
+                    f"{report['width']}x{report['height']} @ {report['fps']}fps, {outcome})"
+                )
+
+        saved = totals['original_bytes'] - totals['transcoded_bytes']
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {totals['videos']} videos, {totals['original_bytes'] / 1e6:.1f}MB -> "
+            f"{totals['transcoded_bytes'] / 1e6:.1f}MB for playback ({saved / 1e6:.1f}MB less to stream), {totals['failed']} failed"
+        ))
@@ -0,0 +1,176 @@
+"""
+Permission-checked serving of uploaded media
+Resumes and assessment recordings are only served to their owner, the owner's managers and
+HR admins. Once access is checked the transfer is handed to the web server (X-Sendfile for
+Apache/lighttpd, X-Accel-Redirect for nginx) when MEDIA_SENDFILE_BACKEND is set. Otherwise Django streams the file
+itself with HTTP Range support, through a bounded file wrapper that keeps fileno() so WSGI servers
+with a sendfile-capable file_wrapper (e.g. gunicorn) still send it with os.sendfile().
+"""
+
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from .models import UserProfile, FeedbackActionAssessment, CourseAssessment, InterviewSummary
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+KEYFRAMES_PATTERN = re.compile(r'^(action|course)_assessments/(\d+)/keyframes/')
+
+
+def is_media_reviewer(user):
+    """Staff and HR admins may open any employee's media"""
+    return user.is_staff or (hasattr(user, 'userprofile') and user.userprofile.user_type == 'admin')
+
+
+def media_owners(user):
+    """
+    Users whose media `user` may open besides reviewers: themselves and, for a manager, their
+    reports - the employees they have given feedback to or assigned courses or development plans
+    """
+    if not (hasattr(user, 'userprofile') and user.userprofile.user_type == 'manager'):
+        return [user.id]
+    reports = User.objects.filter(
+        Q(received_feedbacks__manager=user)
+        | Q(course_assignments__assigned_by=user)
+        | Q(userprofile__candidateprofile__development_plans__assigned_by=user)
+    ).values('id')
+    return User.objects.filter(Q(id=user.id) | Q(id__in=reports)).values('id')
+
+
+def normalize_media_name(name):
+    """
+    `name` with `.`/`..` segments and duplicate slashes resolved, or None when it is absolute or
+    escapes MEDIA_ROOT. Permission checks and serving must both use the normalized name, otherwise
+    a path such as an owned prefix followed by `../` would pass the check and serve another file.
+    """
+    if not name or '\0' in name or '\\' in name:
+        return None
+    normalized = posixpath.normpath(name)
+    if posixpath.isabs(normalized) or normalized in ('.', '..') or normalized.startswith('../'):
+        return None
+    return normalized
+
+
+def can_access_media(user, name):
+    """Whether `user` may download the stored file `name` (relative to MEDIA_ROOT, already normalized)"""
+    if normalize_media_name(name) != name:
+        return False
+    if is_media_reviewer(user):
+        return True
+    owners = media_owners(user)
+    if name.startswith('resumes/'):
+        return UserProfile.objects.filter(resume=name, user__in=owners).exists()
+    keyframes = KEYFRAMES_PATTERN.match(name)
+    if keyframes:
+        model = FeedbackActionAssessment if keyframes.group(1) == 'action' else CourseAssessment
+        return model.objects.filter(id=keyframes.group(2), employee__in=owners).exists()
+    if name.startswith('action_assessments/'):
+        return FeedbackActionAssessment.objects.filter(Q(video=name) | Q(playback_video=name), employee__in=owners).exists()
+    if name.startswith('course_assessments/'):
+        return CourseAssessment.objects.filter(Q(video=name) | Q(playback_video=name), employee__in=owners).exists()
+    if name.startswith('assessments/'):
+        return InterviewSummary.objects.filter(video_assessment=name, candidate__in=owners).exists()
+    # Anything else (e.g. partial chunked uploads) is never served directly
+    return False
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single-range "bytes=" header, None to serve the whole file,
+    or 'unsatisfiable'. Multiple ranges are answered with the whole file, which RFC 9110 allows.
+    """
+    match = RANGE_PATTERN.match((header or '').strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return 'unsatisfiable'
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, end
+
+
+class BoundedFile:
+    """
+    Read-only view of `length` bytes of an open file starting at `start`.
+    The underlying file is positioned at `start` and fileno() is passed through, so a WSGI
+    file_wrapper can sendfile() Content-Length bytes from the current offset instead of reading them.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def sendfile_response(name, path, content_type):
+    """Empty response telling the front-end web server to send the file, or None if not configured"""
+    backend = getattr(settings, 'MEDIA_SENDFILE_BACKEND', None)
+    if backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    elif backend == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix + quote(name)
+    else:
+        return None
+    # The web server handles Range and conditional requests itself
+    return response
+
+
+def serve_media(request, name):
+    """Serve MEDIA_ROOT/name (normalized) after the caller has checked permissions"""
+    path = safe_join(settings.MEDIA_ROOT, name)
+    if not os.path.isfile(path):
+        return HttpResponse(status=404)
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    response = sendfile_response(name, path, content_type)
+    if response is None:
+        stat = os.stat(path)
+        requested = parse_range(request.headers.get('Range'), stat.st_size)
+        if requested == 'unsatisfiable':
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        start, end = requested or (0, stat.st_size - 1)
+        length = max(0, end - start + 1)
+        response = FileResponse(BoundedFile(open(path, 'rb'), start, length), content_type=content_type)
+        response['Content-Length'] = str(length)
+        if requested:
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:12
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_app', '0008_skillupcourse_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='learningcourse',
+            index=models.Index(django.db.models.functions.text.Lower('title'), models.F('provider'), name='learningcourse_title_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_feedback_rollups(apps, schema_editor):
+    ManagerFeedback = apps.get_model('hr_app', 'ManagerFeedback')
+    FeedbackRollup = apps.get_model('hr_app', 'FeedbackRollup')
+
+    rollups = {}
+    for employee_id, rating, areas_of_concern in ManagerFeedback.objects.values_list(
+        'employee_id', 'rating', 'areas_of_concern'
+    ).iterator():
+        rollup = rollups.setdefault(employee_id, {'feedback_count': 0, 'rating_sum': 0, 'area_counts': {}})
+        rollup['feedback_count'] += 1
+        rollup['rating_sum'] += rating
+        for area in areas_of_concern or []:
+            rollup['area_counts'][area] = rollup['area_counts'].get(area, 0) + 1
+
+    FeedbackRollup.objects.bulk_create(
+        FeedbackRollup(employee_id=employee_id, **totals) for employee_id, totals in rollups.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_app', '0010_backgroundjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feedback_count', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('area_counts', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='feedback_rollup', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_feedback_rollups, migrations.RunPython.noop),
+    ]
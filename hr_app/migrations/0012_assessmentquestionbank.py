@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_app', '0011_feedbackrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssessmentQuestionBank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('questions', models.JSONField(default=list)),
+                ('source', models.CharField(choices=[('ai', 'AI Generated'), ('fallback', 'Fallback Template')], default='ai', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('action', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='question_bank', to='hr_app.feedbackaction')),
+                ('course', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='question_bank', to='hr_app.learningcourse')),
+            ],
+            options={
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('action__isnull', False), ('course__isnull', True)), models.Q(('action__isnull', True), ('course__isnull', False)), _connector='OR'), name='questionbank_action_xor_course')],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_app', '0012_assessmentquestionbank'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='feedbackactionassessment',
+            name='video',
+            field=models.FileField(blank=True, upload_to='action_assessments/videos/'),
+        ),
+        migrations.AlterField(
+            model_name='feedbackactionassessment',
+            name='transcript',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='feedbackactionassessment',
+            name='cheating_data',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='feedbackactionassessment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('grading', 'Grading'), ('graded', 'Graded'), ('failed', 'Grading Failed')], default='graded', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='feedbackactionassessment',
+            name='result',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='feedbackactionassessment',
+            name='grading_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.CreateModel(
+            name='CourseAssessment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video', models.FileField(blank=True, upload_to='course_assessments/videos/')),
+                ('transcript', models.TextField(blank=True)),
+                ('ai_score', models.FloatField(default=0.0)),
+                ('ai_feedback', models.TextField(blank=True)),
+                ('questions_asked', models.JSONField(default=list)),
+                ('answers', models.JSONField(default=list)),
+                ('cheating_data', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('grading', 'Grading'), ('graded', 'Graded'), ('failed', 'Grading Failed')], default='pending', max_length=20)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('grading_error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('cheating_detected', models.BooleanField(default=False)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_assessments', to=settings.AUTH_USER_MODEL)),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assessments', to='hr_app.employeedevelopmentplan')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_app', '0014_assessmentupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttentionSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('data', models.BinaryField(default=bytes)),
+                ('format_version', models.PositiveSmallIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assessment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='attention_series', to='hr_app.videoassessment')),
+            ],
+        ),
+    ]
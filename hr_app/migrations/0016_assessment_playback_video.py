@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_app', '0015_attentionseries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courseassessment',
+            name='playback_video',
+            field=models.FileField(blank=True, upload_to='course_assessments/videos/'),
+        ),
+        migrations.AddField(
+            model_name='feedbackactionassessment',
+            name='playback_video',
+            field=models.FileField(blank=True, upload_to='action_assessments/videos/'),
+        ),
+    ]
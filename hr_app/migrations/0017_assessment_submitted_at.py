@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:17
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_submitted_at(apps, schema_editor):
+    # Until now started_at was overwritten with the submission time
+    for model_name in ('CourseAssessment', 'FeedbackActionAssessment'):
+        apps.get_model('hr_app', model_name).objects.update(submitted_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_app', '0016_assessment_playback_video'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courseassessment',
+            name='submitted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='feedbackactionassessment',
+            name='submitted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_submitted_at, migrations.RunPython.noop),
+    ]
@@ -1,25 +1,86 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
+from django.db.models.functions import Lower
 import json
+import uuid
+
+GRADING_STATUS_CHOICES = [
+    ('pending', 'Pending'),
+    ('grading', 'Grading'),
+    ('graded', 'Graded'),
+    ('failed', 'Grading Failed'),
+]
 
 class FeedbackActionAssessment(models.Model):
     """Stores video-based AI assessment for feedback actions"""
     action = models.OneToOneField('FeedbackAction', on_delete=models.CASCADE, related_name='assessment')
     employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='action_assessments')
-    video = models.FileField(upload_to='action_assessments/videos/')
-    transcript = models.TextField()
+    video = models.FileField(upload_to='action_assessments/videos/', blank=True)
+    playback_video = models.FileField(upload_to='action_assessments/videos/', blank=True)  # Smaller re-encode for viewing; `video` stays the original
+    transcript = models.TextField(blank=True)
     ai_score = models.FloatField(default=0.0)
     ai_feedback = models.TextField(blank=True)
     questions_asked = models.JSONField(default=list)
     answers = models.JSONField(default=list)
+    cheating_data = models.JSONField(default=dict, blank=True)  # Browser integrity signals sent with the submission
+    status = models.CharField(max_length=20, choices=GRADING_STATUS_CHOICES, default='graded')
+    result = models.JSONField(default=dict, blank=True)  # Grading outcome returned by the status endpoint
+    grading_error = models.TextField(blank=True)
     started_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)  # Latest submission; started_at keeps the first attempt's start
     completed_at = models.DateTimeField(null=True, blank=True)
     cheating_detected = models.BooleanField(default=False)
 
     def __str__(self):
         return f"Assessment for {self.action.title} by {self.employee.username}"
 
+class CourseAssessment(models.Model):
+    """Stores a video-based AI assessment attempt for a development plan course"""
+    plan = models.ForeignKey('EmployeeDevelopmentPlan', on_delete=models.CASCADE, related_name='assessments')
+    employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='course_assessments')
+    video = models.FileField(upload_to='course_assessments/videos/', blank=True)
+    playback_video = models.FileField(upload_to='course_assessments/videos/', blank=True)
+    transcript = models.TextField(blank=True)
+    ai_score = models.FloatField(default=0.0)
+    ai_feedback = models.TextField(blank=True)
+    questions_asked = models.JSONField(default=list)
+    answers = models.JSONField(default=list)
+    cheating_data = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=GRADING_STATUS_CHOICES, default='pending')
+    result = models.JSONField(default=dict, blank=True)
+    grading_error = models.TextField(blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    cheating_detected = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Course assessment for {self.plan.course.title} by {self.employee.username}"
+
+class AssessmentUpload(models.Model):
+    """A resumable, chunked assessment video upload; chunks are appended to a partial file until submission"""
+    UPLOAD_STATUS_CHOICES = [
+        ('open', 'Receiving Chunks'),
+        ('committed', 'Committed'),
+        ('aborted', 'Aborted'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='assessment_uploads')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    received_bytes = models.BigIntegerField(default=0)  # Offset the next chunk must start at
+    status = models.CharField(max_length=20, choices=UPLOAD_STATUS_CHOICES, default='open')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.filename} by {self.owner.username} ({self.received_bytes} bytes, {self.status})"
+
 class UserProfile(models.Model):
     USER_TYPES = [
         ('candidate', 'Candidate'),
@@ -168,6 +229,12 @@ class LearningCourse(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Course lookups during plan generation match on the normalized (lower-cased) title
+            models.Index(Lower('title'), 'provider', name='learningcourse_title_lower_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.title} - {self.provider}"
 
@@ -279,6 +346,85 @@ class ManagerFeedback(models.Model):
     def __str__(self):
         return f"Feedback for {self.employee.username} by {self.manager.username}"
 
+class FeedbackRollup(models.Model):
+    """
+    Per-employee running totals over their ManagerFeedback, kept current by the
+    signals in hr_app/signals.py so the feedback page doesn't re-aggregate history
+    """
+    employee = models.OneToOneField(User, on_delete=models.CASCADE, related_name='feedback_rollup')
+    feedback_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    area_counts = models.JSONField(default=dict, blank=True)  # area of concern -> mentions across all feedback
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Feedback rollup for {self.employee.username}: {self.feedback_count} feedbacks"
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.feedback_count if self.feedback_count else 0
+
+    def top_areas(self, limit=5):
+        """Most common areas of concern as {area: count}, like Counter.most_common"""
+        ranked = sorted(self.area_counts.items(), key=lambda item: item[1], reverse=True)
+        return dict(ranked[:limit])
+
+    @classmethod
+    def apply(cls, employee_id, count=0, rating=0, added_areas=(), removed_areas=(), create=True):
+        """
+        Apply a change in one employee's feedback to their rollup under a row lock.
+        With create=False a missing rollup is left missing (returns None): removals must not
+        insert a row for an employee who is being deleted.
+        """
+        from django.db import transaction
+        with transaction.atomic():
+            if create:
+                rollup, _ = cls.objects.select_for_update().get_or_create(employee_id=employee_id)
+            else:
+                rollup = cls.objects.select_for_update().filter(employee_id=employee_id).first()
+                if rollup is None:
+                    return None
+            rollup.feedback_count += count
+            rollup.rating_sum += rating
+            area_counts = dict(rollup.area_counts)
+            for area in added_areas:
+                area_counts[area] = area_counts.get(area, 0) + 1
+            for area in removed_areas:
+                remaining = area_counts.get(area, 0) - 1
+                if remaining > 0:
+                    area_counts[area] = remaining
+                else:
+                    area_counts.pop(area, None)
+            rollup.area_counts = area_counts
+            rollup.save()
+        return rollup
+
+    @classmethod
+    def rebuild(cls, employee_ids=None):
+        """
+        Recompute rollups from ManagerFeedback, for feedback written without signals
+        (bulk_create, raw SQL, rows from before the rollup existed). Returns the number rebuilt.
+        """
+        from django.db import transaction
+        feedbacks = ManagerFeedback.objects.order_by()
+        rollups = cls.objects.all()
+        if employee_ids is not None:
+            feedbacks = feedbacks.filter(employee_id__in=employee_ids)
+            rollups = rollups.filter(employee_id__in=employee_ids)
+        totals = {}
+        for employee_id, rating, areas in feedbacks.values_list('employee_id', 'rating', 'areas_of_concern'):
+            total = totals.setdefault(employee_id, {'feedback_count': 0, 'rating_sum': 0, 'area_counts': {}})
+            total['feedback_count'] += 1
+            total['rating_sum'] += rating
+            for area in areas or []:
+                total['area_counts'][area] = total['area_counts'].get(area, 0) + 1
+        with transaction.atomic():
+            # Employees whose feedback is all gone keep no rollup
+            rollups.exclude(employee_id__in=totals).delete()
+            for employee_id, total in totals.items():
+                cls.objects.update_or_create(employee_id=employee_id, defaults=total)
+        return len(totals)
+
 class FeedbackAction(models.Model):
     """Recommended actions based on feedback"""
     PRIORITY_CHOICES = [
@@ -313,6 +459,32 @@ class FeedbackCourseRecommendation(models.Model):
     def __str__(self):
         return f"Course: {self.course.title} for {self.employee.username}"
 
+class AssessmentQuestionBank(models.Model):
+    """Pre-generated assessment questions for a FeedbackAction or a LearningCourse; attempts sample from it"""
+    SOURCE_CHOICES = [
+        ('ai', 'AI Generated'),
+        ('fallback', 'Fallback Template'),
+    ]
+
+    action = models.OneToOneField(FeedbackAction, on_delete=models.CASCADE, null=True, blank=True, related_name='question_bank')
+    course = models.OneToOneField(LearningCourse, on_delete=models.CASCADE, null=True, blank=True, related_name='question_bank')
+    questions = models.JSONField(default=list)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='ai')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(action__isnull=False, course__isnull=True) | models.Q(action__isnull=True, course__isnull=False),
+                name='questionbank_action_xor_course',
+            ),
+        ]
+
+    def __str__(self):
+        target = f"action {self.action.title}" if self.action_id else f"course {self.course.title}"
+        return f"Question bank for {target} ({len(self.questions)} questions)"
+
 # Skill-Up Module Models
 class SkillUpCourse(models.Model):
     """Enhanced course model for skill-up module"""
@@ -404,7 +576,9 @@ class VideoAssessment(models.Model):
     facial_analysis_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)  # 0-100
     overall_behavior_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)  # 0-100
     
-    # Technical details
+    # Technical details. Never populated: the skill-up page does not record video (its start/complete
+    # calls have no server endpoints), so there is no recording to transcode or build keyframes from.
+    # Keyframe sprites exist for action and course assessments only (see tasks.keyframes_dir).
     video_file_path = models.CharField(max_length=500, blank=True)
     screenshots_path = models.CharField(max_length=500, blank=True)
     
@@ -444,6 +618,18 @@ class AttentionTrackingData(models.Model):
     def __str__(self):
         return f"Attention data - {self.assessment.assignment.employee.username} at {self.timestamp}"
 
+class AttentionSeries(models.Model):
+    """Attention tracking samples of a video assessment packed into one binary blob (see hr_app/attention_series.py)"""
+    assessment = models.OneToOneField(VideoAssessment, on_delete=models.CASCADE, related_name='attention_series')
+    started_at = models.DateTimeField()  # sample offsets are milliseconds after this
+    sample_count = models.PositiveIntegerField(default=0)
+    data = models.BinaryField(default=bytes)  # SAMPLE_DTYPE records in arrival order
+    format_version = models.PositiveSmallIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Attention series - assessment {self.assessment_id} ({self.sample_count} samples)"
+
 class CourseProgress(models.Model):
     """Detailed progress tracking for courses"""
     assignment = models.OneToOneField(CourseAssignment, on_delete=models.CASCADE, related_name='detailed_progress')
@@ -467,3 +653,48 @@ class CourseProgress(models.Model):
     
     def __str__(self):
         return f"Progress - {self.assignment.employee.username}: {self.assignment.course.title}"
+
+
+class BackgroundJob(models.Model):
+    """Slow work (mostly AI calls) queued to run outside the request/save path"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    kind = models.CharField(max_length=50)  # Handler name registered in hr_app.jobs
+    dedupe_key = models.CharField(max_length=100)  # e.g. 'profile:42'; one active job per kind and key
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='background_jobs')
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['kind', 'dedupe_key', '-created_at'], name='backgroundjob_lookup_idx'),
+            models.Index(fields=['status', 'created_at'], name='backgroundjob_status_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'dedupe_key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='backgroundjob_one_active_per_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} [{self.dedupe_key}] - {self.status}"
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
@@ -4,16 +4,15 @@ import PyPDF2
 import docx
 from django.conf import settings
 from .models import CandidateProfile
-import openai
+from .llm_gateway import get_gateway
 import re
 
 class ResumeProcessingService:
     def __init__(self):
-        # Initialize OpenAI with your API key from environment
-        self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        if self.openai_api_key:
-            openai.api_key = self.openai_api_key
-        else:
+        # OpenAI calls go through the shared, rate-limited gateway
+        self.gateway = get_gateway()
+        self.openai_available = self.gateway.is_available('openai')
+        if not self.openai_available:
             print("Warning: OPENAI_API_KEY not found. Will use fallback analysis.")
     
     def extract_text_from_pdf(self, pdf_path):
@@ -55,7 +54,7 @@ class ResumeProcessingService:
         """Analyze resume text using OpenAI API"""
         
         # Check if OpenAI is available
-        if not self.openai_api_key:
+        if not self.openai_available:
             print("OpenAI API key not available, using fallback analysis")
             return self.fallback_analysis(resume_text)
         
@@ -135,7 +134,7 @@ class ResumeProcessingService:
         """
 
         try:
-            response = openai.chat.completions.create(
+            result = self.gateway.chat(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are an expert HR analyst and resume parser. Extract information accurately and return valid JSON."},
@@ -145,7 +144,6 @@ class ResumeProcessingService:
                 temperature=0.3
             )
             
-            result = response.choices[0].message.content
             print("[AI RAW RESUME ANALYSIS]", result)
             # Clean the response to ensure it's valid JSON
             result = result.strip()
@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
-from .models import CandidateProfile
-from .development_service import EmployeeDevelopmentService
+from .models import CandidateProfile, ManagerFeedback, FeedbackRollup, FeedbackAction, LearningCourse
+from .jobs import enqueue
+from .tasks import DEVELOPMENT_PLAN_JOB, development_plan_key, queue_question_banks
 
 @receiver(post_save, sender=CandidateProfile)
 def auto_generate_development_plan(sender, instance, created, **kwargs):
@@ -15,7 +16,59 @@ def auto_generate_development_plan(sender, instance, created, **kwargs):
         instance.areas_for_improvement
     ]
     if created and all(required_fields):
-        print(f"Auto-generating development plan for {instance.user_profile.user.username}")
-        dev_service = EmployeeDevelopmentService()
-        result = dev_service.create_development_plan(instance)
-        print(f"Development plan result: {result}")
\ No newline at end of file
+        # The AI calls run on the job pool after commit; saving the profile doesn't wait for them
+        job = enqueue(
+            DEVELOPMENT_PLAN_JOB,
+            development_plan_key(instance.id),
+            payload={'profile_id': instance.id},
+            owner=instance.user_profile.user,
+        )
+        print(f"Queued development plan job #{job.id} for {instance.user_profile.user.username}")
+
+
+# FeedbackRollup maintenance. Saves and deletes through the ORM instance API keep the
+# rollup current; queryset.update()/bulk_create() bypass these signals, and
+# `manage.py rebuild_feedback_rollups` recomputes the rollups from scratch.
+
+@receiver(pre_save, sender=ManagerFeedback)
+def remember_previous_feedback(sender, instance, **kwargs):
+    # Remember what the row looked like so post_save can apply only the difference
+    instance._rollup_previous = None
+    if instance.pk:
+        instance._rollup_previous = ManagerFeedback.objects.filter(pk=instance.pk).values(
+            'employee_id', 'rating', 'areas_of_concern'
+        ).first()
+
+@receiver(post_save, sender=ManagerFeedback)
+def update_feedback_rollup(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_rollup_previous', None)
+    areas = instance.areas_of_concern or []
+    if previous is None:
+        FeedbackRollup.apply(instance.employee_id, count=1, rating=instance.rating, added_areas=areas)
+    elif previous['employee_id'] != instance.employee_id:
+        FeedbackRollup.apply(previous['employee_id'], count=-1, rating=-previous['rating'],
+                             removed_areas=previous['areas_of_concern'] or [])
+        FeedbackRollup.apply(instance.employee_id, count=1, rating=instance.rating, added_areas=areas)
+    else:
+        FeedbackRollup.apply(instance.employee_id, rating=instance.rating - previous['rating'],
+                             added_areas=areas, removed_areas=previous['areas_of_concern'] or [])
+
+@receiver(post_delete, sender=ManagerFeedback)
+def remove_from_feedback_rollup(sender, instance, **kwargs):
+    # When the employee is being deleted their rollup may already be gone: never recreate it
+    FeedbackRollup.apply(instance.employee_id, count=-1, rating=-instance.rating,
+                         removed_areas=instance.areas_of_concern or [], create=False)
+
+
+# Assessment questions are generated once per action/course, when it is created
+# (bulk_create callers queue them explicitly)
+
+@receiver(post_save, sender=FeedbackAction)
+def queue_action_question_bank(sender, instance, created, **kwargs):
+    if created:
+        queue_question_banks(actions=[instance])
+
+@receiver(post_save, sender=LearningCourse)
+def queue_course_question_bank(sender, instance, created, **kwargs):
+    if created:
+        queue_question_banks(courses=[instance])
@@ -0,0 +1,91 @@
+/**
+ * Resumable, chunked upload of assessment recordings
+ * Sends MediaRecorder chunks to the server while the assessment is still recording,
+ * so submitting only has to reference the upload instead of posting the whole video.
+ */
+
+class ChunkedUploader {
+    constructor(filename, contentType) {
+        this.filename = filename;
+        this.contentType = contentType || 'video/webm';
+        this.uploadId = null;
+        this.uploadUrl = null;
+        this.offset = 0;            // bytes the server has confirmed
+        this.failed = false;
+        this.maxRetries = 5;
+        this.queue = this.open();   // chunks are sent one after another, in recording order
+    }
+
+    async open() {
+        const formData = new FormData();
+        formData.append('filename', this.filename);
+        formData.append('content_type', this.contentType);
+        const response = await fetch('/api/assessment-uploads/', { method: 'POST', body: formData });
+        const data = await response.json();
+        if (!data.success) {
+            throw new Error(data.error || 'Could not start the upload');
+        }
+        this.uploadId = data.upload.upload_id;
+        this.uploadUrl = data.upload_url;
+    }
+
+    push(blob) {
+        this.queue = this.queue
+            .then(() => this.failed ? null : this.sendChunk(blob))
+            .catch(error => {
+                console.warn('Chunked upload failed, the video will be sent at submission instead:', error);
+                this.failed = true;
+            });
+    }
+
+    async sendChunk(blob) {
+        const start = this.offset;
+        for (let attempt = 0; attempt <= this.maxRetries; attempt++) {
+            // After a failed attempt the server may already hold part (or all) of this chunk
+            const remaining = blob.slice(this.offset - start);
+            if (remaining.size === 0) {
+                return;
+            }
+            try {
+                const response = await fetch(this.uploadUrl, {
+                    method: 'PUT',
+                    headers: { 'Upload-Offset': String(this.offset), 'Content-Type': 'application/octet-stream' },
+                    body: remaining
+                });
+                const data = await response.json();
+                if (response.ok && data.success) {
+                    this.offset = data.upload.offset;
+                    return;
+                }
+                if (response.status !== 409 || data.offset === null || data.offset === undefined) {
+                    throw new Error(data.error || `Upload failed with status ${response.status}`);
+                }
+                this.offset = data.offset;  // resume from where the server is
+            } catch (error) {
+                if (attempt === this.maxRetries) {
+                    throw error;
+                }
+                await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** attempt));
+                await this.syncOffset();
+            }
+        }
+    }
+
+    async syncOffset() {
+        try {
+            const response = await fetch(this.uploadUrl);
+            const data = await response.json();
+            if (data.success) {
+                this.offset = data.upload.offset;
+            }
+        } catch (error) {
+            // Still offline; the next attempt retries from the last confirmed offset
+        }
+    }
+
+    /** Wait for queued chunks; resolves to the upload id, or null if the upload failed */
+    async finish() {
+        await this.queue.catch(() => { this.failed = true; });
+        return this.failed ? null : this.uploadId;
+    }
+}
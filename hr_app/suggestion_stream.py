@@ -0,0 +1,127 @@
+"""
+Incremental clean-up of streamed feedback suggestions
+Strips the headings, option labels, bullets and markdown that Gemini wraps around a
+suggestion while the response is still arriving, so cleaned text can be forwarded
+to the browser chunk by chunk instead of after the whole response.
+"""
+
+import re
+
+# Lines starting with these are preamble, never part of the suggestion
+PREAMBLE_PREFIXES = ('here are', 'here is', "here's", 'subject:', 'original:', 'original message:')
+
+# A leading "Label:" such as "Option 1:", "**Improved:**" or "Message:"
+LABEL_PATTERN = re.compile(r'^(?:[A-Za-z][\w ()/-]{0,30}?)\s*:\s*')
+# What is left of a heading like "Option 1: (More direct)"
+DESCRIPTOR_PATTERN = re.compile(r'^\([^)]*\)\s*$')
+BULLET_PATTERN = re.compile(r'^(?:[*\-•]+|\d+[.)])\s+')
+MARKDOWN_PATTERN = re.compile(r'\*\*|__|`|^#+\s*')
+QUOTES = '"\'“”‘’'
+
+# Characters needed before a line can be classified (enough to see a leading label)
+CLASSIFY_AFTER = 48
+
+
+class SuggestionStreamCleaner:
+    """
+    feed() streamed chunks and forward what it returns; call finish() at the end.
+    Only the first option is kept: once text has been emitted, a later "Option N" line ends the suggestion.
+    """
+
+    def __init__(self):
+        self.line = ''            # current line, not yet classified
+        self.mode = 'classify'    # classify | emit | skip
+        self.pending_newline = False
+        self.emitted = False
+        self.done = False
+        self.held = ''            # trailing markdown, quote or space characters not yet emitted
+
+    def feed(self, chunk):
+        if self.done:
+            return ''
+        output = []
+        for piece in re.split(r'(\n)', chunk):
+            if piece == '\n':
+                output.append(self._end_line())
+            elif piece:
+                output.append(self._add(piece))
+            if self.done:
+                break
+        return ''.join(output)
+
+    def finish(self):
+        """Flush whatever is buffered at the end of the stream"""
+        if self.done:
+            return ''
+        text = self._end_line()
+        self.done = True
+        return text
+
+    def _add(self, text):
+        if self.mode == 'skip':
+            return ''
+        if self.mode == 'emit':
+            return self._inline(text)
+        self.line += text
+        if len(self.line) < CLASSIFY_AFTER:
+            return ''
+        return self._classify(final=False)
+
+    def _end_line(self):
+        text = ''
+        if self.mode == 'classify' and self.line:
+            text = self._classify(final=True)
+        elif self.mode == 'emit':
+            text = self._inline('', final=True)
+        if self.mode == 'emit' or text:
+            self.pending_newline = self.emitted
+        self.line = ''
+        self.mode = 'classify'
+        return text
+
+    def _classify(self, final):
+        """Decide what the buffered start of a line is, and emit its content part"""
+        raw, self.line = self.line, ''
+        # Only the start is trimmed: a mid-line buffer may end in a space that belongs to the text
+        stripped = MARKDOWN_PATTERN.sub('', raw.lstrip()).lstrip()
+        lowered = stripped.lower()
+
+        if self.emitted and lowered.startswith('option'):
+            # A second option follows the one already sent
+            self.done = True
+            return ''
+        if not stripped.strip() or lowered.startswith(PREAMBLE_PREFIXES):
+            self.mode = 'skip'
+            return ''
+
+        content = BULLET_PATTERN.sub('', stripped)
+        label = LABEL_PATTERN.match(content)
+        if label:
+            content = content[label.end():]
+            if not content.strip() or DESCRIPTOR_PATTERN.match(content):
+                # A heading line such as "Areas of Concern:" or "Option 1: (Concise)"
+                self.mode = 'skip'
+                return ''
+        content = content.lstrip(QUOTES + ' ')
+
+        self.mode = 'emit'
+        return self._inline(content, final=final)
+
+    def _inline(self, text, final=False):
+        """Emit text from the body of a line, dropping markdown tokens split across chunks"""
+        text = self.held + text
+        self.held = ''
+        if not final:
+            # Hold back what could start a markdown token or be a closing quote or trailing space
+            match = re.search(r'[*_\s' + QUOTES + r']+$', text)
+            if match:
+                self.held, text = match.group(0), text[:match.start()]
+        text = re.sub(r'\*\*|__|`', '', text)
+        if final:
+            text = text.rstrip().rstrip(QUOTES)
+        if not text:
+            return ''
+        prefix = '\n' if self.pending_newline else ''
+        self.pending_newline = False
+        self.emitted = True
+        return prefix + text
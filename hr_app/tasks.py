@@ -0,0 +1,200 @@
+"""
+Background job handlers
+Each handler receives its BackgroundJob and returns a JSON-serialisable result dict;
+raising marks the job failed. See hr_app/jobs.py for queueing and deduplication.
+"""
+
+import os
+from django.conf import settings
+from django.utils import timezone
+from .jobs import enqueue, register
+from .models import (
+    CandidateProfile, ManagerFeedback, FeedbackAction, LearningCourse, FeedbackActionAssessment, CourseAssessment
+)
+from .development_service import EmployeeDevelopmentService
+from .assessment_service import AssessmentService
+from .video_service import build_keyframe_sprite, transcode_field_file
+
+DEVELOPMENT_PLAN_JOB = 'development_plan'
+FEEDBACK_RECOMMENDATIONS_JOB = 'feedback_recommendations'
+QUESTION_BANK_JOB = 'question_bank'
+ACTION_ASSESSMENT_JOB = 'action_assessment'
+COURSE_ASSESSMENT_JOB = 'course_assessment'
+TRANSCODE_VIDEO_JOB = 'transcode_video'
+KEYFRAME_SPRITE_JOB = 'keyframe_sprite'
+
+# Models whose `video` FileField holds an assessment recording
+VIDEO_FIELD_MODELS = {
+    'action_assessment': FeedbackActionAssessment,
+    'course_assessment': CourseAssessment,
+}
+
+
+def development_plan_key(profile_id):
+    return f'profile:{profile_id}'
+
+
+def feedback_recommendations_key(employee_id):
+    return f'employee:{employee_id}'
+
+
+def queue_missing_feedback_recommendations(employee, recommendations_job=None):
+    """
+    Queue the feedback recommendations job for an employee whose feedback has no actions or courses
+    yet (feedback that predates the job, or a job that failed). Returns the job to report, if any.
+    """
+    if recommendations_job is not None and recommendations_job.status != 'failed':
+        # Queued, running, or it ran and found nothing to recommend
+        return recommendations_job
+    feedback = ManagerFeedback.objects.filter(employee=employee).order_by('-created_at').first()
+    if feedback is None:
+        return recommendations_job
+    return enqueue(
+        FEEDBACK_RECOMMENDATIONS_JOB,
+        feedback_recommendations_key(employee.id),
+        payload={'feedback_id': feedback.id},
+        owner=employee,
+    )
+
+
+def action_assessment_key(assessment_id):
+    return f'action_assessment:{assessment_id}'
+
+
+def course_assessment_key(assessment_id):
+    return f'course_assessment:{assessment_id}'
+
+
+def recording_key(model, object_id):
+    """Dedupe key of the transcode and keyframe sprite jobs for one recording"""
+    return f'{model}:{object_id}'
+
+
+def queue_video_transcode(model, object_id):
+    """
+    Queue the playback copy of a stored assessment recording (`model` is a VIDEO_FIELD_MODELS key);
+    the keyframe sprite is queued when it finishes, so the two never read the recording at the same time
+    """
+    return enqueue(TRANSCODE_VIDEO_JOB, recording_key(model, object_id), payload={'model': model, 'id': object_id})
+
+
+def queue_keyframe_sprite(model, object_id):
+    """Queue the keyframe sprite for an assessment recording; returns the (possibly already active) job"""
+    return enqueue(KEYFRAME_SPRITE_JOB, recording_key(model, object_id), payload={'model': model, 'id': object_id})
+
+
+def keyframes_dir(model, object_id):
+    """Where a recording's sprite and index are stored, relative to MEDIA_ROOT"""
+    return f'{model}s/{object_id}/keyframes'
+
+
+def media_path(path):
+    """Absolute location of a path stored either absolute or relative to MEDIA_ROOT"""
+    return path if os.path.isabs(path) else os.path.join(settings.MEDIA_ROOT, path)
+
+
+def queue_question_banks(actions=(), courses=()):
+    """Queue question bank generation for new FeedbackActions and LearningCourses"""
+    for action in actions:
+        enqueue(QUESTION_BANK_JOB, f'action:{action.id}', payload={'action_id': action.id})
+    for course in courses:
+        enqueue(QUESTION_BANK_JOB, f'course:{course.id}', payload={'course_id': course.id})
+
+
+@register(DEVELOPMENT_PLAN_JOB)
+def generate_development_plan_job(job):
+    """Run the AI skill gap analysis and course recommendations for one profile"""
+    profile = CandidateProfile.objects.select_related('user_profile__user').get(id=job.payload['profile_id'])
+    result = EmployeeDevelopmentService().create_development_plan(profile)
+    if not result.get('success'):
+        raise RuntimeError(result.get('error', 'Development plan generation failed'))
+    # The full skill analysis is already reflected in the created plans
+    result.pop('skill_analysis', None)
+    return result
+
+
+@register(FEEDBACK_RECOMMENDATIONS_JOB)
+def generate_feedback_recommendations_job(job):
+    """Precompute the actions and courses shown on the employee's feedback page"""
+    feedback = ManagerFeedback.objects.select_related('employee').get(id=job.payload['feedback_id'])
+    return EmployeeDevelopmentService().create_feedback_recommendations(feedback)
+
+
+@register(QUESTION_BANK_JOB)
+def generate_question_bank_job(job):
+    """Generate the stored assessment questions for one action or course"""
+    service = AssessmentService()
+    if 'action_id' in job.payload:
+        bank = service.build_action_bank(FeedbackAction.objects.get(id=job.payload['action_id']))
+    else:
+        bank = service.build_course_bank(LearningCourse.objects.get(id=job.payload['course_id']))
+    return {'bank_id': bank.id, 'questions': len(bank.questions), 'source': bank.source}
+
+
+def _grade_assessment(assessment, grade):
+    """Run `grade(assessment)`, recording the grading status and result on the assessment row"""
+    assessment.status = 'grading'
+    assessment.grading_error = ''
+    assessment.save(update_fields=['status', 'grading_error'])
+    try:
+        result = grade(assessment)
+    except Exception as e:
+        assessment.status = 'failed'
+        assessment.grading_error = str(e)
+        assessment.completed_at = timezone.now()
+        assessment.save(update_fields=['status', 'grading_error', 'completed_at'])
+        raise
+    assessment.status = 'graded'
+    assessment.result = result
+    assessment.save(update_fields=['status', 'result'])
+    return {'assessment_id': assessment.id, 'ai_score': result['ai_score'], 'marked_complete': result['marked_complete']}
+
+
+@register(ACTION_ASSESSMENT_JOB)
+def grade_action_assessment_job(job):
+    """Grade a submitted feedback action assessment"""
+    assessment = FeedbackActionAssessment.objects.select_related('action').get(id=job.payload['assessment_id'])
+    return _grade_assessment(assessment, AssessmentService().grade_action_assessment)
+
+
+@register(COURSE_ASSESSMENT_JOB)
+def grade_course_assessment_job(job):
+    """Grade a submitted course assessment"""
+    assessment = CourseAssessment.objects.select_related('plan__course').get(id=job.payload['assessment_id'])
+    return _grade_assessment(assessment, AssessmentService().grade_course_assessment)
+
+
+@register(TRANSCODE_VIDEO_JOB)
+def transcode_video_job(job):
+    """Write a smaller playback copy of a stored assessment recording; the result reports the bytes saved"""
+    model, object_id = job.payload['model'], job.payload['id']
+    model_class = VIDEO_FIELD_MODELS[model]
+    obj = model_class.objects.get(id=object_id)
+    if not obj.video:
+        return {'skipped': 'no video'}
+    original_name = obj.video.name
+    try:
+        report = transcode_field_file(obj.video)
+        if report['name']:
+            # Only attach the copy if no retake replaced the video meanwhile
+            if not model_class.objects.filter(id=object_id, video=original_name).update(playback_video=report['name']):
+                os.remove(report['path'])
+    finally:
+        # The sprite is built from the playback copy when there is one, so it runs after the transcode
+        queue_keyframe_sprite(model, object_id)
+    report.pop('path')
+    return report
+
+
+@register(KEYFRAME_SPRITE_JOB)
+def build_keyframe_sprite_job(job):
+    """Extract keyframes of an assessment recording into a sprite and index under keyframes_dir()"""
+    model, object_id = job.payload['model'], job.payload['id']
+    obj = VIDEO_FIELD_MODELS[model].objects.get(id=object_id)
+    if not obj.video:
+        raise ValueError(f'{model} {object_id} has no recording')
+    # The playback copy decodes faster and has the same frames
+    source = obj.playback_video or obj.video
+    relative_dir = keyframes_dir(model, object_id)
+    index = build_keyframe_sprite(source.path, media_path(relative_dir), video=obj.video.name)
+    return {'keyframes_dir': relative_dir, 'frames': len(index['frames']), 'interval_seconds': index['interval_seconds']}
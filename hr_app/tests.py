@@ -1,3 +1,538 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+from datetime import timedelta
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import cv2
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import jobs
+from .assessment_service import PreGrader
+from .attention_series import append_samples, load_attention_series
+from .attention_service import FrameError, clean_result, parse_timestamp
+from .concern_tagger import tag_concerns
+from .development_service import EmployeeDevelopmentService
+from .frame_socket import HEADER_SIZE, JPEG_MAGIC, FrameStream
+from .llm_stub import respond
+from .media_service import can_access_media
+from .tasks import build_keyframe_sprite_job, queue_video_transcode, transcode_video_job
+from .models import (
+    AssessmentQuestionBank, AssessmentUpload, AttentionTrackingData, BackgroundJob, CourseAssignment, CandidateProfile, EmployeeDevelopmentPlan, FeedbackRollup, FeedbackAction, FeedbackActionAssessment, LearningCourse,
+    ManagerFeedback, SkillUpCourse, UserProfile, VideoAssessment,
+)
+
+
+def create_employee(username, user_type='candidate', **profile):
+    user = User.objects.create_user(username=username)
+    user_profile = UserProfile.objects.create(user=user, user_type=user_type, mobile_number='9999999999', resume='resumes/cv.pdf')
+    return CandidateProfile.objects.create(user_profile=user_profile, current_role='Developer', **profile)
+
+
+class CountingGateway:
+    """Answers prompts with the local LLM stub and counts them"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt, **kwargs):
+        self.calls += 1
+        return respond(prompt)
+
+
+class UpsertCoursesTests(TestCase):
+    def setUp(self):
+        self.service = EmployeeDevelopmentService()
+
+    def test_missing_title_is_keyed_like_the_stored_default(self):
+        courses = self.service.upsert_courses([{'title': None, 'provider': 'udemy'}])
+        self.assertEqual(list(courses), [('unknown course', 'udemy')])
+        self.assertEqual(courses[('unknown course', 'udemy')].title, 'Unknown Course')
+
+        again = self.service.upsert_courses([{'title': 'unknown course '}])
+        self.assertEqual(again[('unknown course', 'udemy')].pk, courses[('unknown course', 'udemy')].pk)
+        self.assertEqual(LearningCourse.objects.count(), 1)
+
+    def test_non_ascii_titles_are_found_again(self):
+        first = self.service.upsert_courses([{'title': 'Éléments de Gestion'}])
+        second = self.service.upsert_courses([{'title': 'éléments de gestion'}])
+        self.assertEqual(list(first.values())[0].pk, list(second.values())[0].pk)
+        self.assertEqual(LearningCourse.objects.count(), 1)
+
+
+class DevelopmentPlanBatchTests(TestCase):
+    def test_skill_gaps_and_courses_are_both_batched(self):
+        profiles = [create_employee(f'employee{number}') for number in range(16)]
+        service = EmployeeDevelopmentService()
+        service.gateway = CountingGateway()
+
+        results = service.create_development_plans_batch(profiles, batch_size=8)
+
+        # Two skill gap prompts and two course prompts for 16 employees
+        self.assertEqual(service.gateway.calls, 4)
+        self.assertTrue(all(result['success'] and result['created_plans'] for result in results.values()))
+        self.assertEqual(
+            EmployeeDevelopmentPlan.objects.count(),
+            sum(result['created_plans'] for result in results.values()),
+        )
+
+    def test_regenerate_command_paces_every_ai_call(self):
+        from hr_app.management.commands.regenerate_development_plans import Command
+
+        profile = create_employee('employee')
+        gateway = CountingGateway()
+        limiter = mock.Mock()
+        with mock.patch('hr_app.development_service.get_gateway', return_value=gateway), \
+                mock.patch('hr_app.management.commands.regenerate_development_plans.connection'):
+            results = Command().regenerate_profiles([profile.id], limiter)
+
+        self.assertTrue(results[0][1])
+        # Skill gaps and courses for one profile: two calls, two tokens
+        self.assertEqual(gateway.calls, 2)
+        self.assertEqual(limiter.acquire.call_count, 2)
+
+    def test_malformed_recommendation_is_skipped_not_fatal(self):
+        profile = create_employee('employee')
+        skill_analysis = {'skill_gaps': [
+            {'skill_name': 'Python', 'current_level': 'beginner', 'target_level': 'advanced', 'priority': 'high'},
+            {'current_level': 'beginner'},
+        ]}
+        course_recommendations = [
+            {'title': 'Python Basics', 'provider': 'Coursera', 'target_skill_gap': 'Python',
+             'estimated_duration_hours': '12 hours'},
+            {'title': 'Broken Course', 'provider': 'Udemy', 'target_skill_gap': None,
+             'estimated_duration_hours': 'a few', 'estimated_rating': 'n/a'},
+            'not a course',
+        ]
+
+        result = EmployeeDevelopmentService().create_development_plan(
+            profile, skill_analysis=skill_analysis, course_recommendations=course_recommendations,
+        )
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['created_plans'], 2)
+        python = LearningCourse.objects.get(title='Python Basics')
+        self.assertEqual(python.duration_hours, 12)
+        self.assertEqual(LearningCourse.objects.get(title='Broken Course').duration_hours, 0)
+        plan = EmployeeDevelopmentPlan.objects.get(course=python)
+        self.assertEqual(plan.priority_level, 'high')
+
+
+class StaleJobTests(TestCase):
+    def setUp(self):
+        self.stale = BackgroundJob.objects.create(
+            kind='development_plan', dedupe_key='profile:1', status='running',
+            started_at=timezone.now() - timedelta(hours=2),
+        )
+        self.busy = BackgroundJob.objects.create(
+            kind='development_plan', dedupe_key='profile:2', status='running', started_at=timezone.now(),
+        )
+
+    def test_new_worker_pool_leaves_running_jobs_alone(self):
+        # Another live process may still be running them
+        with mock.patch.object(jobs, '_executor', None), mock.patch.object(jobs, 'ThreadPoolExecutor') as pool:
+            jobs.get_executor()
+
+        self.stale.refresh_from_db()
+        self.assertEqual(self.stale.status, 'running')
+        pool.return_value.submit.assert_not_called()
+
+    def test_requeue_stale_only_requeues_old_jobs(self):
+        self.assertEqual(jobs.requeue_stale_jobs(30), [self.stale.id])
+
+        self.stale.refresh_from_db()
+        self.busy.refresh_from_db()
+        self.assertEqual(self.stale.status, 'queued')
+        self.assertEqual(self.busy.status, 'running')
+
+
+class FeedbackRecommendationTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('employee').user_profile.user
+        self.manager = User.objects.create_user(username='manager')
+        ManagerFeedback.objects.create(
+            employee=self.employee, manager=self.manager, subject='Q3', message='Missed deadlines', rating=2,
+            areas_of_concern=['Time Management'],
+        )
+        self.client.force_login(self.employee)
+
+    def test_feedback_page_queues_missing_recommendations_once(self):
+        self.client.get(reverse('feedback'))
+        self.client.get(reverse('feedback'))
+
+        job = BackgroundJob.objects.get(kind='feedback_recommendations')
+        self.assertEqual(job.dedupe_key, f'employee:{self.employee.id}')
+
+    def test_failed_job_is_retried_but_a_finished_one_is_not(self):
+        job = BackgroundJob.objects.create(
+            kind='feedback_recommendations', dedupe_key=f'employee:{self.employee.id}', status='succeeded',
+        )
+        self.client.get(reverse('feedback'))
+        self.assertEqual(BackgroundJob.objects.count(), 1)
+
+        job.status = 'failed'
+        job.save()
+        self.client.get(reverse('feedback'))
+        self.assertEqual(BackgroundJob.objects.filter(status='queued').count(), 1)
+
+
+class FeedbackRollupTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('employee').user_profile.user
+        self.manager = User.objects.create_user(username='manager')
+
+    def feedback(self, rating, areas):
+        return ManagerFeedback(employee=self.employee, manager=self.manager, subject='Review', message='...',
+                               rating=rating, areas_of_concern=areas)
+
+    def test_deleting_an_employee_with_feedback_leaves_no_rollup(self):
+        self.feedback(2, ['Testing']).save()
+        self.employee.delete()
+        self.assertFalse(FeedbackRollup.objects.exists())
+        self.assertFalse(ManagerFeedback.objects.exists())
+
+    def test_deleting_feedback_updates_the_rollup(self):
+        kept, removed = self.feedback(4, ['Testing']), self.feedback(2, ['Testing', 'Communication'])
+        kept.save()
+        removed.save()
+        removed.delete()
+        rollup = FeedbackRollup.objects.get(employee=self.employee)
+        self.assertEqual((rollup.feedback_count, rollup.rating_sum, rollup.area_counts), (1, 4, {'Testing': 1}))
+
+    def test_feedback_page_rebuilds_rollup_for_feedback_written_without_signals(self):
+        ManagerFeedback.objects.bulk_create([self.feedback(2, ['Testing']), self.feedback(4, ['Testing'])])
+        self.client.force_login(self.employee)
+
+        response = self.client.get(reverse('feedback'))
+
+        self.assertEqual(len(response.context['feedbacks']), 2)
+        self.assertEqual(response.context['average_rating'], 3)
+        self.assertEqual(response.context['common_areas'], {'Testing': 2})
+
+    def test_rebuild_drops_rollups_without_feedback(self):
+        FeedbackRollup.objects.create(employee=self.employee, feedback_count=3, rating_sum=9)
+        self.assertEqual(FeedbackRollup.rebuild(), 0)
+        self.assertFalse(FeedbackRollup.objects.exists())
+
+
+class ConcernTaggerTests(TestCase):
+    PRAISE = [
+        'Excellent teamwork and leadership, very proactive and strong ownership of releases. Fixed many bugs.',
+        'Good attitude and a positive tone with clients',
+        'Never missed deadlines, no bugs reported in review',
+        'Great communication skills and thorough documentation',
+        'Impressive problem-solving and solid technical skills',
+        'No longer late with submissions and resolved the regressions quickly',
+    ]
+    CRITICISM = [
+        ('Poor teamwork and lack of ownership', ['Teamwork', 'Ownership']),
+        ('Missed deadlines twice and the code is buggy', ['Time Management', 'Code Quality']),
+        ('Not proactive, needs to improve documentation', ['Ownership', 'Documentation']),
+        ('Bad attitude in meetings', ['Professionalism']),
+        ('Lots of bugs in the last release', ['Code Quality']),
+        ('Good at debugging but poor communication with the team', ['Communication']),
+        ('Not good teamwork this quarter', ['Teamwork']),
+        ('Needs to take more ownership', ['Ownership']),
+    ]
+
+    def test_praise_is_not_tagged(self):
+        for text in self.PRAISE:
+            with self.subTest(text=text):
+                self.assertEqual(tag_concerns(text), [])
+
+    def test_criticism_is_tagged(self):
+        for text, areas in self.CRITICISM:
+            with self.subTest(text=text):
+                self.assertEqual([tag['area'] for tag in tag_concerns(text)], areas)
+
+
+LONG_ANSWER = (
+    'I planned the release around weekly milestones, estimated every task with the team, tracked progress '
+    'in a shared board and raised risks early with my manager whenever a dependency slipped, then reviewed '
+    'what went wrong in a short retrospective after each sprint and adjusted the next plan using deadlines '
+    'that the whole team agreed were realistic and achievable for everyone involved in delivery.'
+)
+
+
+class PreGraderTests(TestCase):
+    QUESTIONS = ['How did you plan your work?', 'How do you track deadlines?', 'What changed after the sprint?']
+
+    def test_long_on_topic_answers_pass(self):
+        result = PreGrader().grade(self.QUESTIONS, [LONG_ANSWER] * 3, key_terms=['deadlines', 'planned'])
+        self.assertEqual(result['decision'], 'pass')
+
+    def test_no_key_terms_defers_to_the_ai_grader(self):
+        result = PreGrader().grade(self.QUESTIONS, [LONG_ANSWER] * 3, key_terms=[])
+        self.assertEqual(result['decision'], 'ambiguous')
+
+    def test_no_issued_questions_defers_to_the_ai_grader(self):
+        result = PreGrader().grade([], [LONG_ANSWER], key_terms=['deadlines'])
+        self.assertEqual(result['decision'], 'ambiguous')
+
+
+def create_action(employee):
+    """A feedback action for `employee` with a stored question bank"""
+    feedback = ManagerFeedback.objects.create(
+        employee=employee, manager=User.objects.create_user(username='manager'), subject='Q3',
+        message='Missed deadlines', rating=2,
+    )
+    action = FeedbackAction.objects.create(
+        feedback=feedback, employee=employee, title='Plan work around deadlines', description='...',
+    )
+    AssessmentQuestionBank.objects.create(action=action, questions=PreGraderTests.QUESTIONS)
+    return action
+
+
+class AssessmentSubmissionTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('employee').user_profile.user
+        self.action = create_action(self.employee)
+        self.client.force_login(self.employee)
+
+    def submit(self, questions):
+        return self.client.post(reverse('submit_action_assessment', args=[self.action.id]), {
+            'questions': questions, 'answers': json.dumps([LONG_ANSWER]), 'cheating_data': '{}',
+        })
+
+    def test_questions_come_from_the_issued_bank_sample(self):
+        issued = self.client.get(reverse('start_action_assessment', args=[self.action.id])).json()['questions']
+        self.submit('[]')
+        assessment = FeedbackActionAssessment.objects.get(action=self.action)
+        self.assertEqual(assessment.questions_asked, issued)
+
+    def test_posted_questions_are_ignored(self):
+        self.submit(json.dumps(['Type anything?']))
+        self.assertEqual(FeedbackActionAssessment.objects.get(action=self.action).questions_asked, [])
+
+    def test_resubmission_keeps_the_start_time(self):
+        assessment = FeedbackActionAssessment.objects.create(action=self.action, employee=self.employee)
+        started_at = assessment.started_at
+        self.submit('[]')
+        assessment.refresh_from_db()
+        self.assertEqual(assessment.started_at, started_at)
+        self.assertGreaterEqual(assessment.submitted_at, started_at)
+
+    def test_malformed_upload_id_is_a_bad_request(self):
+        response = self.client.post(reverse('submit_action_assessment', args=[self.action.id]), {
+            'answers': json.dumps([LONG_ANSWER]), 'cheating_data': '{}', 'upload_id': 'not-a-uuid',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FeedbackActionAssessment.objects.filter(action=self.action).exists())
+
+
+class RetakeVideoTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('employee').user_profile.user
+        self.action = create_action(self.employee)
+        self.client.force_login(self.employee)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.assessment = FeedbackActionAssessment(action=self.action, employee=self.employee, status='graded')
+        self.assessment.video.save('first.webm', ContentFile(b'first take'))
+        self.previous = self.assessment.video
+
+    def retake(self, **data):
+        # Keep the submission's jobs from dispatching when the commit callbacks run
+        with mock.patch.object(jobs, 'dispatch'), self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('submit_action_assessment', args=[self.action.id]), {
+                'answers': json.dumps([LONG_ANSWER]), 'cheating_data': '{}', **data,
+            })
+
+    def test_previous_video_is_deleted_after_the_new_one_is_committed(self):
+        self.retake(video=SimpleUploadedFile('second.webm', b'second take'))
+        self.assessment.refresh_from_db()
+        self.assertEqual(self.assessment.video.read(), b'second take')
+        self.assertFalse(self.previous.storage.exists(self.previous.name))
+
+    def test_failed_submission_keeps_the_previous_video(self):
+        upload = AssessmentUpload.objects.create(owner=self.employee, filename='second.webm', status='committed')
+        response = self.retake(upload_id=str(upload.id))
+        self.assertFalse(response.json()['success'])
+        self.assessment.refresh_from_db()
+        self.assertEqual(self.assessment.video.name, self.previous.name)
+        self.assertTrue(self.previous.storage.exists(self.previous.name))
+
+
+def noise_video(path, frames=5, size=(640, 480)):
+    """A short, incompressible webm: the worst case for the recording's size"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'VP80'), 10, size)
+    rng = np.random.default_rng(0)
+    for _ in range(frames):
+        writer.write(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+    writer.release()
+
+
+@override_settings(ASSESSMENT_VIDEO_TRANSCODE={'max_width': 160, 'max_height': 120})
+class TranscodeVideoTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        employee = create_employee('employee').user_profile.user
+        self.assessment = FeedbackActionAssessment(action=create_action(employee), employee=employee)
+        recording = os.path.join(media_root, 'recording.webm')
+        noise_video(recording)
+        with open(recording, 'rb') as recording_file:
+            self.original = recording_file.read()
+        self.assessment.video.save('recording.webm', ContentFile(self.original))
+
+    def test_original_recording_is_kept_next_to_the_playback_copy(self):
+        report = transcode_video_job(SimpleNamespace(payload={'model': 'action_assessment', 'id': self.assessment.id}))
+
+        self.assertTrue(report['playback'])
+        self.assessment.refresh_from_db()
+        with self.assessment.video.open('rb') as video:
+            self.assertEqual(video.read(), self.original)
+        self.assertTrue(self.assessment.playback_video.name.endswith('.playback.webm'))
+        self.assertEqual(self.assessment.playback_video.size, report['transcoded_bytes'])
+
+    def test_sprite_is_built_after_the_transcode(self):
+        payload = {'model': 'action_assessment', 'id': self.assessment.id}
+        url = reverse('action_assessment_keyframes', args=[self.assessment.id])
+        self.client.force_login(self.assessment.employee)
+        queue_video_transcode('action_assessment', self.assessment.id)
+
+        # While the transcode is pending the endpoint waits for it instead of racing it
+        self.assertEqual(self.client.get(url).json()['job']['kind'], 'transcode_video')
+        self.assertFalse(BackgroundJob.objects.filter(kind='keyframe_sprite').exists())
+
+        transcode_video_job(SimpleNamespace(payload=payload))
+        sprite_job = BackgroundJob.objects.get(kind='keyframe_sprite')
+        self.assertEqual(sprite_job.payload, payload)
+        build_keyframe_sprite_job(SimpleNamespace(payload=payload))
+
+        response = self.client.get(url).json()
+        self.assertTrue(response['ready'])
+        self.assertEqual(response['keyframes']['video'], self.assessment.video.name)
+        sprite = self.client.get(response['keyframes']['sprite_url'])
+        self.assertEqual(sprite.status_code, 200)
+
+
+class MediaAccessTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('employee').user_profile.user
+        self.manager = create_employee('manager', user_type='manager').user_profile.user
+        self.other_manager = create_employee('other', user_type='manager').user_profile.user
+        self.colleague = create_employee('colleague').user_profile.user
+        UserProfile.objects.filter(user=self.employee).update(resume='resumes/employee.pdf')
+        ManagerFeedback.objects.create(employee=self.employee, manager=self.manager, subject='Q3', message='...')
+
+    def test_owner_and_their_manager_open_the_media(self):
+        self.assertTrue(can_access_media(self.employee, 'resumes/employee.pdf'))
+        self.assertTrue(can_access_media(self.manager, 'resumes/employee.pdf'))
+
+    def test_other_managers_and_colleagues_cannot(self):
+        self.assertFalse(can_access_media(self.other_manager, 'resumes/employee.pdf'))
+        self.assertFalse(can_access_media(self.colleague, 'resumes/employee.pdf'))
+
+    def test_dot_dot_segments_cannot_reach_another_users_file(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        os.makedirs(os.path.join(media_root, 'resumes'))
+        with open(os.path.join(media_root, 'resumes', 'employee.pdf'), 'wb') as resume:
+            resume.write(b'%PDF private')
+        feedback = ManagerFeedback.objects.create(employee=self.colleague, manager=self.other_manager, subject='Q3', message='...')
+        action = FeedbackAction.objects.create(feedback=feedback, employee=self.colleague, title='Focus', description='...')
+        owned = FeedbackActionAssessment.objects.create(action=action, employee=self.colleague)
+        self.client.force_login(self.colleague)
+
+        with override_settings(MEDIA_ROOT=media_root):
+            for path in (
+                f'action_assessments/{owned.id}/keyframes/../../../resumes/employee.pdf',
+                f'action_assessments/{owned.id}/keyframes/%2e%2e/%2e%2e/%2e%2e/resumes/employee.pdf',
+            ):
+                with self.subTest(path=path):
+                    self.assertEqual(self.client.get(f'{settings.MEDIA_URL}{path}').status_code, 403)
+            self.assertEqual(self.client.get(f'{settings.MEDIA_URL}resumes/../../etc/passwd').status_code, 404)
+        self.assertFalse(can_access_media(self.colleague, f'action_assessments/{owned.id}/keyframes/../x'))
+
+
+class FrameTimestampTests(TestCase):
+    def test_out_of_range_timestamps_are_frame_errors(self):
+        for value in (1e20, -1e20, float('inf'), float('nan'), 2 ** 64 - 1):
+            with self.subTest(value=value), self.assertRaises(FrameError):
+                parse_timestamp(value)
+
+    def test_stream_answers_an_out_of_range_timestamp_with_an_error(self):
+        message = (2 ** (8 * HEADER_SIZE) - 1).to_bytes(HEADER_SIZE, 'big') + JPEG_MAGIC + b'jpeg'
+        reply = asyncio.run(FrameStream(assessment=None).handle_frame(message))
+        self.assertEqual(reply['type'], 'error')
+        self.assertIn('Invalid timestamp', reply['error'])
+
+
+class AttentionSeriesTests(TestCase):
+    def setUp(self):
+        self.employee = create_employee('employee').user_profile.user
+        course = SkillUpCourse.objects.create(
+            title='Focus', description='...', instructor_name='A', duration_hours=1,
+            course_url='https://example.com/focus', has_video_assessment=True,
+        )
+        self.assignment = CourseAssignment.objects.create(
+            employee=self.employee, course=course, assigned_by=User.objects.create_user(username='manager'),
+        )
+
+    def sample(self, assessment, timestamp):
+        return AttentionTrackingData(
+            assessment=assessment, timestamp=timestamp, attention_level=80, eye_contact_score=70,
+            facial_expression='focused', head_position='center', confidence_score=90,
+        )
+
+    def test_starting_the_assessment_sets_start_time(self):
+        self.client.force_login(self.employee)
+        url = reverse('start_video_assessment', args=[self.assignment.id])
+        self.client.get(url)
+        self.client.post(url)
+        assessment = VideoAssessment.objects.get(assignment=self.assignment)
+        self.assertEqual(assessment.status, 'in_progress')
+        self.assertIsNotNone(assessment.start_time)
+
+    def test_an_earlier_sample_rebases_the_series_instead_of_clamping(self):
+        assessment = VideoAssessment.objects.create(assignment=self.assignment, session_id='session')
+        start = timezone.now().replace(microsecond=0)
+        append_samples(assessment, [self.sample(assessment, start + timedelta(seconds=10))])
+        append_samples(assessment, [self.sample(assessment, start + timedelta(seconds=2))])
+        append_samples(assessment, [self.sample(assessment, start)])
+
+        started_at, samples = load_attention_series(assessment)
+        self.assertEqual(started_at, start)
+        self.assertEqual(samples['offset_ms'].tolist(), [0, 2000, 10000])
+
+    def test_packing_keeps_rows_the_series_cannot_store(self):
+        assessment = VideoAssessment.objects.create(assignment=self.assignment, session_id='session')
+        start = timezone.now()
+        exact = self.sample(assessment, start)
+        unmapped = self.sample(assessment, start + timedelta(seconds=1))
+        unmapped.facial_expression = 'smiling'
+        AttentionTrackingData.objects.bulk_create([exact, unmapped])
+
+        output = io.StringIO()
+        call_command('pack_attention_series', '--delete-rows', stdout=output)
+
+        remaining = AttentionTrackingData.objects.filter(assessment=assessment)
+        self.assertEqual(list(remaining.values_list('facial_expression', flat=True)), ['smiling'])
+        self.assertIn(f'#{remaining.get().id}', output.getvalue())
+        self.assertEqual(load_attention_series(assessment)[1]['facial_expression'].tolist(), [1, 0])
+
+    def test_ingestion_rejects_labels_the_series_cannot_store(self):
+        with self.assertRaises(FrameError):
+            clean_result({'facial_expression': 'smiling'})
+        analysis = clean_result({'attention_level': '72.6', 'head_position': 'looking_away'})
+        self.assertEqual(analysis['attention_level'], 73)
+        self.assertEqual((analysis['facial_expression'], analysis['head_position']), ('unknown', 'looking_away'))
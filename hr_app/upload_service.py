@@ -0,0 +1,132 @@
+"""
+Resumable, chunked uploads for assessment videos
+The browser appends recorder chunks to an AssessmentUpload while the assessment is running.
+Each chunk is streamed from the request straight into a partial file on disk, so neither a
+chunk nor the whole video is ever held in memory. The chunk's offset must match the bytes
+already received; after a dropped connection the client asks for the current offset and
+resends from there. Submitting the assessment commits the partial file into the video field.
+"""
+
+import logging
+import os
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+from .models import AssessmentUpload
+
+logger = logging.getLogger(__name__)
+
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """An upload request that can't be applied; `status` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def upload_dir():
+    return getattr(settings, 'ASSESSMENT_UPLOAD_DIR', os.path.join(settings.MEDIA_ROOT, 'uploads', 'partial'))
+
+
+def partial_path(upload):
+    return os.path.join(upload_dir(), f'{upload.id}.part')
+
+
+def create_upload(owner, filename, content_type=''):
+    """Open a new upload and its (empty) partial file"""
+    os.makedirs(upload_dir(), exist_ok=True)
+    upload = AssessmentUpload.objects.create(
+        owner=owner,
+        filename=os.path.basename(filename or 'assessment.webm')[:255],
+        content_type=(content_type or '')[:100],
+    )
+    open(partial_path(upload), 'wb').close()
+    return upload
+
+
+def append_chunk(upload, stream, offset, length):
+    """
+    Copy `length` bytes from the file-like `stream` into the partial file at `offset`.
+    Returns the new offset. A chunk that doesn't start at the received offset raises
+    UploadError(409) carrying the offset to resume from.
+    """
+    if upload.status != 'open':
+        raise UploadError(f'Upload is {upload.status}', status=409, offset=upload.received_bytes)
+    if offset != upload.received_bytes:
+        raise UploadError('Chunk offset does not match the bytes received', status=409, offset=upload.received_bytes)
+    if length <= 0:
+        raise UploadError('Empty chunk')
+    if length > getattr(settings, 'ASSESSMENT_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024):
+        raise UploadError('Chunk too large', status=413)
+    if offset + length > getattr(settings, 'ASSESSMENT_UPLOAD_MAX_SIZE', 500 * 1024 * 1024):
+        raise UploadError('Upload exceeds the maximum video size', status=413)
+
+    written = 0
+    with open(partial_path(upload), 'r+b') as partial:
+        # Drop any tail left by an earlier attempt at this chunk that was cut off mid-transfer
+        partial.seek(offset)
+        partial.truncate()
+        while written < length:
+            data = stream.read(min(COPY_BUFFER_SIZE, length - written))
+            if not data:
+                break
+            partial.write(data)
+            written += len(data)
+    if written != length:
+        raise UploadError(f'Chunk ended after {written} of {length} bytes', offset=upload.received_bytes)
+
+    # Only the request whose offset is still current may advance it (guards concurrent retries)
+    advanced = AssessmentUpload.objects.filter(id=upload.id, status='open', received_bytes=offset).update(
+        received_bytes=offset + written, updated_at=timezone.now()
+    )
+    if not advanced:
+        upload.refresh_from_db()
+        raise UploadError('Upload changed while the chunk was written', status=409, offset=upload.received_bytes)
+    upload.received_bytes = offset + written
+    return upload.received_bytes
+
+
+def commit_upload(upload, field_file):
+    """Save the completed partial file into `field_file` (without saving its model) and close the upload"""
+    if upload.status != 'open':
+        raise UploadError(f'Upload is {upload.status}', status=409)
+    if not upload.received_bytes:
+        raise UploadError('Upload is empty')
+    path = partial_path(upload)
+    with open(path, 'rb') as partial:
+        # Storage copies File objects chunk by chunk
+        field_file.save(upload.filename, File(partial), save=False)
+    os.remove(path)
+    upload.status = 'committed'
+    upload.save(update_fields=['status', 'updated_at'])
+
+
+def abort_upload(upload):
+    """Discard an open upload and its partial file"""
+    try:
+        os.remove(partial_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.status = 'aborted'
+    upload.save(update_fields=['status', 'updated_at'])
+
+
+def describe_upload(upload):
+    return {
+        'upload_id': str(upload.id),
+        'filename': upload.filename,
+        'offset': upload.received_bytes,
+        'status': upload.status,
+    }
+
+
+def purge_stale_uploads(older_than):
+    """Abort open uploads not touched since `older_than` (a datetime); returns how many were removed"""
+    stale = list(AssessmentUpload.objects.filter(status='open', updated_at__lt=older_than))
+    for upload in stale:
+        abort_upload(upload)
+    return len(stale)
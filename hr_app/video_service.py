@@ -0,0 +1,265 @@
+"""
+Assessment video post-processing
+Recordings are stored exactly as the browser produced them, usually high-bitrate webm at the
+webcam's full resolution. transcode_video() re-encodes a recording with OpenCV to a bounded frame
+size, frame rate and bitrate (VP8 in webm, so browsers still play it back) into a separate playback
+copy when that is meaningfully smaller. OpenCV writes video only, so the copy has no audio track;
+the original recording is the assessment evidence and is never modified or removed.
+build_keyframe_sprite() grabs a thumbnail every few seconds into a single sprite image plus a JSON
+index, so reviewers can scrub through an assessment without downloading the video.
+"""
+
+import json
+import logging
+import math
+import os
+import cv2
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSCODE_SETTINGS = {
+    'max_width': 640,       # frames are scaled down (never up) to fit max_width x max_height
+    'max_height': 480,
+    'max_fps': 12,          # output frame rate; faster sources are resampled down to it
+    'max_bitrate_kbps': 600,  # re-encoded at a smaller frame size while the result is above this
+    'max_attempts': 3,
+    'fourcc': 'VP80',       # VP8, playable in the browser's <video> element
+    'extension': '.webm',
+    'min_saving': 0.1,      # keep the original unless the re-encode is at least this much smaller
+}
+
+DEFAULT_SPRITE_SETTINGS = {
+    'interval_seconds': 5,  # one keyframe every this many seconds of video
+    'tile_width': 160,      # thumbnail width in the sprite; the height follows the aspect ratio
+    'columns': 10,
+    'max_frames': 180,      # longer videos get a proportionally wider interval
+    'jpeg_quality': 70,
+}
+
+SPRITE_FILENAME = 'sprite.jpg'
+SPRITE_INDEX_FILENAME = 'index.json'
+
+# MediaRecorder webm files carry no frame rate; OpenCV then reports 0 or a placeholder like 1000
+MAX_PLAUSIBLE_FPS = 120
+
+
+class VideoProcessingError(Exception):
+    pass
+
+
+def transcode_settings(config=None):
+    config = config if config is not None else getattr(settings, 'ASSESSMENT_VIDEO_TRANSCODE', {})
+    return {**DEFAULT_TRANSCODE_SETTINGS, **config}
+
+
+def bounded_size(width, height, max_width, max_height):
+    """Frame size scaled down to fit the bounds, keeping the aspect ratio and even dimensions for the encoder"""
+    scale = min(1.0, max_width / width, max_height / height)
+    return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+
+def transcode_file(source_path, target_path, config):
+    """Re-encode source_path into target_path at the configured size and frame rate; returns frame stats"""
+    capture = cv2.VideoCapture(source_path)
+    if not capture.isOpened():
+        raise VideoProcessingError(f"Cannot open video {source_path}")
+
+    source_fps = capture.get(cv2.CAP_PROP_FPS)
+    if not 0 < source_fps <= MAX_PLAUSIBLE_FPS:
+        source_fps = None
+    output_fps = min(config['max_fps'], source_fps) if source_fps else config['max_fps']
+    interval_ms = 1000.0 / output_fps
+
+    writer = None
+    size = None
+    frames_in = frames_out = 0
+    next_ms = 0.0
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames_in += 1
+            if writer is None:
+                height, width = frame.shape[:2]
+                size = bounded_size(width, height, config['max_width'], config['max_height'])
+                writer = cv2.VideoWriter(target_path, cv2.VideoWriter_fourcc(*config['fourcc']), output_fps, size)
+                if not writer.isOpened():
+                    raise VideoProcessingError(f"OpenCV cannot encode {config['fourcc']} to {target_path}")
+
+            position_ms = capture.get(cv2.CAP_PROP_POS_MSEC)
+            if position_ms <= 0 and frames_in > 1:
+                # No timestamps: fall back to the frame rate, or treat frames as evenly spaced output frames
+                position_ms = (frames_in - 1) * (1000.0 / source_fps if source_fps else interval_ms)
+            if position_ms < next_ms:
+                continue  # Dropped to bring the frame rate down
+
+            if (frame.shape[1], frame.shape[0]) != size:
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            # Fill every output slot up to this frame so a sparse source keeps its duration
+            while next_ms <= position_ms:
+                writer.write(frame)
+                frames_out += 1
+                next_ms += interval_ms
+    finally:
+        capture.release()
+        if writer is not None:
+            writer.release()
+
+    if not frames_out:
+        raise VideoProcessingError(f"No frames could be decoded from {source_path}")
+    return {'frames_in': frames_in, 'frames_out': frames_out, 'width': size[0], 'height': size[1], 'fps': output_fps}
+
+
+def playback_path(source_path, config=None):
+    """Where transcode_video() writes the playback copy of source_path"""
+    config = transcode_settings(config)
+    base, _ = os.path.splitext(source_path)
+    return f"{base}.playback{config['extension']}"
+
+
+def transcode_video(source_path, config=None):
+    """
+    Write a smaller playback copy of the video at source_path (see playback_path); the source is left as is.
+    Returns a report with the sizes of both and, in 'path', the copy (None when it would not be smaller).
+    """
+    config = transcode_settings(config)
+    base, _ = os.path.splitext(source_path)
+    temp_path = f"{base}.transcoding{config['extension']}"
+    original_bytes = os.path.getsize(source_path)
+
+    bounds = dict(config)
+    try:
+        for attempt in range(1, config['max_attempts'] + 1):
+            stats = transcode_file(source_path, temp_path, bounds)
+            transcoded_bytes = os.path.getsize(temp_path)
+            bitrate_kbps = transcoded_bytes * 8 / (stats['frames_out'] / stats['fps']) / 1000
+            if bitrate_kbps <= config['max_bitrate_kbps'] or attempt == config['max_attempts']:
+                break
+            # OpenCV's writer has no bitrate setting; frame area is the lever it offers
+            scale = max(0.5, (config['max_bitrate_kbps'] / bitrate_kbps) ** 0.5)
+            bounds['max_width'] = stats['width'] * scale
+            bounds['max_height'] = stats['height'] * scale
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    report = {
+        'original_bytes': original_bytes,
+        'transcoded_bytes': transcoded_bytes,
+        'saved_pct': round(100 * (1 - transcoded_bytes / original_bytes), 1) if original_bytes else 0.0,
+        'bitrate_kbps': round(bitrate_kbps, 1),
+        'attempts': attempt,
+        **stats,
+    }
+
+    if transcoded_bytes > original_bytes * (1 - config['min_saving']):
+        # Already compact; the original plays back as it is
+        os.remove(temp_path)
+        report.update(playback=False, path=None)
+        return report
+
+    final_path = playback_path(source_path, config)
+    os.replace(temp_path, final_path)
+    report.update(playback=True, path=final_path)
+    logger.info(
+        f"Transcoded {source_path} for playback: {original_bytes} -> {transcoded_bytes} bytes "
+        f"({report['saved_pct']}% smaller, {stats['width']}x{stats['height']} @ {stats['fps']}fps)"
+    )
+    return report
+
+
+def transcode_field_file(field_file, config=None):
+    """Transcode the file behind a FileField value; report['name'] is the playback copy's storage name, if any"""
+    report = transcode_video(field_file.path, config)
+    report['name'] = (
+        os.path.relpath(report['path'], field_file.storage.location).replace(os.sep, '/') if report['path'] else None
+    )
+    return report
+
+
+def sprite_settings(config=None):
+    config = config if config is not None else getattr(settings, 'ASSESSMENT_KEYFRAME_SPRITE', {})
+    return {**DEFAULT_SPRITE_SETTINGS, **config}
+
+
+def build_keyframe_sprite(video_path, output_dir, config=None, video=None):
+    """
+    Write SPRITE_FILENAME (thumbnails in a grid, left to right then top to bottom) and SPRITE_INDEX_FILENAME
+    (tile size, interval and each tile's timestamp and offset) into output_dir. Returns the index.
+    `video` is stored in the index to tell which recording the sprite was built from.
+    """
+    config = sprite_settings(config)
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise VideoProcessingError(f"Cannot open video {video_path}")
+
+    source_fps = capture.get(cv2.CAP_PROP_FPS)
+    if not 0 < source_fps <= MAX_PLAUSIBLE_FPS:
+        source_fps = None
+    interval_ms = config['interval_seconds'] * 1000.0
+    frame_count = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+    if source_fps and frame_count > 0:
+        # Widen the interval up front for long videos so the sprite stays bounded
+        duration_ms = frame_count / source_fps * 1000
+        interval_ms = max(interval_ms, duration_ms / config['max_frames'])
+
+    tiles = []
+    tile_size = None
+    frames_read = 0
+    next_ms = 0.0
+    try:
+        # grab() walks the stream without converting frames; only the sampled ones are retrieved.
+        # Sequential reading is used because seeking is unreliable in MediaRecorder webm files.
+        while capture.grab():
+            frames_read += 1
+            position_ms = capture.get(cv2.CAP_PROP_POS_MSEC)
+            if position_ms <= 0 and frames_read > 1 and source_fps:
+                position_ms = (frames_read - 1) * 1000.0 / source_fps
+            if position_ms < next_ms:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                continue
+            if tile_size is None:
+                height, width = frame.shape[:2]
+                tile_size = bounded_size(width, height, config['tile_width'], height)
+            tiles.append((position_ms / 1000.0, cv2.resize(frame, tile_size, interpolation=cv2.INTER_AREA)))
+            next_ms = position_ms + interval_ms
+            if len(tiles) >= config['max_frames']:
+                break
+    finally:
+        capture.release()
+
+    if not tiles:
+        raise VideoProcessingError(f"No frames could be decoded from {video_path}")
+
+    tile_width, tile_height = tile_size
+    columns = min(config['columns'], len(tiles))
+    rows = math.ceil(len(tiles) / columns)
+    sprite = np.zeros((rows * tile_height, columns * tile_width, 3), dtype=np.uint8)
+    frames = []
+    for position, (seconds, tile) in enumerate(tiles):
+        x, y = (position % columns) * tile_width, (position // columns) * tile_height
+        sprite[y:y + tile_height, x:x + tile_width] = tile
+        frames.append({'time': round(seconds, 2), 'x': x, 'y': y})
+
+    os.makedirs(output_dir, exist_ok=True)
+    if not cv2.imwrite(os.path.join(output_dir, SPRITE_FILENAME), sprite,
+                       [cv2.IMWRITE_JPEG_QUALITY, config['jpeg_quality']]):
+        raise VideoProcessingError(f"Cannot write sprite to {output_dir}")
+    index = {
+        'sprite': SPRITE_FILENAME,
+        'tile_width': tile_width,
+        'tile_height': tile_height,
+        'columns': columns,
+        'interval_seconds': round(interval_ms / 1000.0, 2),
+        'frames': frames,
+        'video': video,
+    }
+    with open(os.path.join(output_dir, SPRITE_INDEX_FILENAME), 'w') as index_file:
+        json.dump(index, index_file)
+    return index
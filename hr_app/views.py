@@ -5,44 +5,14 @@ from django.contrib.auth.decorators import login_required
 
 @login_required
 def start_action_assessment(request, id):
-    """API to start an assessment: returns AI-generated questions for the action."""
+    """API to start an assessment: returns questions sampled from the action's stored question bank."""
     from .models import FeedbackAction
-    from .gemini_client import get_gemini_client
+    from .assessment_service import AssessmentService
     try:
         action = FeedbackAction.objects.get(id=id, employee=request.user)
-        # Generate 3 questions using Gemini (or fallback)
-        prompt = f"Generate 3 interview-style questions to assess understanding and completion of the following action: {action.title}. Action details: {action.description}"
-        client = get_gemini_client()
-        response = client.generate_content(prompt)
-        text = response.text.strip()
-        print('Gemini raw response:', repr(text))  # Log the raw Gemini output for debugging
-        # Extract questions by finding quoted strings within numbered sections
-        import re
-        questions = []
-        
-        # Split text into sections by number pattern
-        sections = re.split(r'\n\s*[0-9]+\.\s*', text)
-        
-        for section in sections[1:]:  # Skip first empty section
-            # Look for quoted question (text between quotes)
-            quote_match = re.search(r'"([^"]+)"', section)
-            if quote_match:
-                question = quote_match.group(1).strip()
-                # Clean up any remaining markdown
-                question = re.sub(r'\*\*|\*', '', question)
-                questions.append(question)
-            else:
-                # Fallback: take first sentence that ends with ?
-                sentences = section.split('.')
-                for sentence in sentences:
-                    if '?' in sentence:
-                        question = sentence.split('?')[0] + '?'
-                        question = re.sub(r'\*\*|\*|"', '', question).strip()
-                        if question:
-                            questions.append(question)
-                            break
-        
-        questions = questions[:3] if questions else [f"Describe how you completed the action '{action.title}'."]
+        questions = AssessmentService().questions_for_action(action)
+        # Grading uses the questions issued here, not whatever the client posts back
+        request.session[issued_questions_key('action', action.id)] = questions
         return JsonResponse({'success': True, 'questions': questions})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
@@ -66,7 +36,7 @@ from .development_service import EmployeeDevelopmentService
 import json
 import threading
 from django.views.decorators.csrf import csrf_protect, csrf_exempt
-from .gemini_client import get_gemini_client
+from .llm_gateway import generate_text, get_gateway
 import re
 
 # Create your views here.
@@ -275,12 +245,18 @@ def candidate_dashboard(request):
             employee_profile=candidate_profile
         ).select_related('course').order_by('-created_at')
         
+        # Latest background run of the AI development plan for this profile
+        from .jobs import latest_job
+        from .tasks import DEVELOPMENT_PLAN_JOB, development_plan_key
+        development_plan_job = latest_job(DEVELOPMENT_PLAN_JOB, development_plan_key(candidate_profile.id))
+        
         context = {
             'user_profile': user_profile,
             'candidate_profile': candidate_profile,
             'resume_processed': candidate_profile.resume_processed,
             'score_degrees': score_degrees,
             'development_plans': development_plans,
+            'development_plan_job': development_plan_job,
         }
         
         return render(request, 'dashboard/candidate.html', context)
@@ -292,6 +268,7 @@ def candidate_dashboard(request):
             'resume_processed': False,
             'score_degrees': 0,
             'development_plans': [],
+            'development_plan_job': None,
         })
 
 @login_required
@@ -607,110 +584,47 @@ def professional_development_view(request):
 @login_required
 def feedback_view(request):
     """Display manager feedback and AI-powered recommendations"""
-    from .models import ManagerFeedback, FeedbackAction, FeedbackCourseRecommendation, CandidateProfile
-    from collections import Counter
-    from django.db.models import Avg
-    from .development_service import EmployeeDevelopmentService
-    from django.db import transaction
+    from .models import ManagerFeedback, FeedbackAction, FeedbackCourseRecommendation, FeedbackRollup
+    from .jobs import latest_job
+    from .tasks import FEEDBACK_RECOMMENDATIONS_JOB, feedback_recommendations_key, queue_missing_feedback_recommendations
 
     # Get all feedback for the current user
     feedbacks = ManagerFeedback.objects.filter(employee=request.user)
+    feedback_count = feedbacks.count()
 
-    if feedbacks.exists():
-        # Calculate average rating
-        average_rating = feedbacks.aggregate(Avg('rating'))['rating__avg'] or 0
+    # Rating and areas of concern totals are maintained incrementally by signals
+    rollup = FeedbackRollup.objects.filter(employee=request.user).first()
+    if feedback_count != (rollup.feedback_count if rollup else 0):
+        # Feedback written without signals (bulk inserts, SQL imports, rows older than the rollup)
+        FeedbackRollup.rebuild([request.user.id])
+        rollup = FeedbackRollup.objects.filter(employee=request.user).first()
 
-        # Get common areas of concern
-        all_areas = []
-        for feedback in feedbacks:
-            if feedback.areas_of_concern:
-                all_areas.extend(feedback.areas_of_concern)
-        common_areas = dict(Counter(all_areas).most_common(5))
+    if feedback_count:
+        average_rating = rollup.average_rating
+        common_areas = rollup.top_areas(5)
 
-        # Get recommended actions
+        # Actions and courses are precomputed by the job queued in admin_submit_feedback
         recommended_actions = list(FeedbackAction.objects.filter(employee=request.user).order_by('priority', '-created_at'))
-
-        # Get course recommendations
         recommended_courses = list(FeedbackCourseRecommendation.objects.filter(employee=request.user).select_related('course'))
-
-        # If no actions or courses exist, use Gemini to generate them
-        if not recommended_actions or not recommended_courses:
-            try:
-                # Get candidate profile for AI context
-                candidate_profile = CandidateProfile.objects.get(user_profile__user=request.user)
-                dev_service = EmployeeDevelopmentService()
-
-                # Use areas of concern and feedback messages as input for AI
-                feedback_text = '\n'.join([f.message for f in feedbacks])
-                areas = list(set(all_areas))
-                # For skill gap analysis, add areas as "areas_for_improvement"
-                candidate_profile.areas_for_improvement = areas
-                candidate_profile.save(update_fields=["areas_for_improvement"])
-
-                # Analyze skill gaps
-                skill_gap_result = dev_service.analyze_skill_gaps(candidate_profile)
-                skill_gaps = skill_gap_result.get("skill_gaps", [])
-
-                # Generate actions from skill gaps if none exist
-                if not recommended_actions and skill_gaps:
-                    with transaction.atomic():
-                        for gap in skill_gaps:
-                            FeedbackAction.objects.create(
-                                feedback=feedbacks.first(),  # Link to latest feedback
-                                employee=request.user,
-                                title=f"Improve {gap['skill_name']}",
-                                description=gap.get('reason', 'Focus on this area for improvement.'),
-                                priority=gap.get('priority', 'medium'),
-                                estimated_time_hours=8
-                            )
-                    recommended_actions = list(FeedbackAction.objects.filter(employee=request.user).order_by('priority', '-created_at'))
-
-                # Generate course recommendations from skill gaps if none exist
-                if not recommended_courses and skill_gaps:
-                    course_recs = dev_service.recommend_courses(skill_gaps, candidate_profile)
-                    with transaction.atomic():
-                        for course in course_recs:
-                            # Try to find or create a LearningCourse
-                            from .models import LearningCourse
-                            lc, _ = LearningCourse.objects.get_or_create(
-                                title=course['title'],
-                                defaults={
-                                    'description': course.get('description', ''),
-                                    'provider': course.get('provider', 'udemy'),
-                                    'course_url': course.get('course_url', ''),
-                                    'skill_category': course.get('skill_category', 'soft_skills'),
-                                    'difficulty_level': course.get('difficulty_level', 'beginner'),
-                                    'duration_hours': int(course.get('estimated_duration_hours', 8)),
-                                    'rating': float(course.get('estimated_rating', 4.0)),
-                                    'price': float(course.get('estimated_price', 0)),
-                                    'skills_covered': course.get('skills_covered', []),
-                                }
-                            )
-                            FeedbackCourseRecommendation.objects.get_or_create(
-                                feedback=feedbacks.first(),
-                                employee=request.user,
-                                course=lc,
-                                feedback_area_addressed=course.get('target_skill_gap', 'General')
-                            )
-                    recommended_courses = list(FeedbackCourseRecommendation.objects.filter(employee=request.user).select_related('course'))
-            except Exception as e:
-                print("[AI FEEDBACK RECOMMENDATION ERROR]", str(e))
-
-        context = {
-            'feedbacks': feedbacks,
-            'average_rating': average_rating,
-            'common_areas': common_areas,
-            'recommended_actions': recommended_actions,
-            'recommended_courses': recommended_courses,
-        }
+        recommendations_job = latest_job(FEEDBACK_RECOMMENDATIONS_JOB, feedback_recommendations_key(request.user.id))
+        if not (recommended_actions and recommended_courses):
+            # Feedback from before recommendations were precomputed, or a failed job: (re)generate them
+            recommendations_job = queue_missing_feedback_recommendations(request.user, recommendations_job)
     else:
-        context = {
-            'feedbacks': None,
-            'average_rating': 0,
-            'common_areas': {},
-            'recommended_actions': [],
-            'recommended_courses': [],
-        }
+        average_rating = 0
+        common_areas = {}
+        recommended_actions = []
+        recommended_courses = []
+        recommendations_job = None
+
+    context = {
+        'feedbacks': feedbacks,
+        'average_rating': average_rating,
+        'common_areas': common_areas,
+        'recommended_actions': recommended_actions,
+        'recommended_courses': recommended_courses,
+        'recommendations_pending': bool(recommendations_job and recommendations_job.is_active),
+    }
 
     return render(request, 'dashboard/feedback.html', context)
 
@@ -813,6 +727,7 @@ def skillup_dashboard(request):
 @login_required
 def start_video_assessment(request, assignment_id):
     """Start video assessment for a course assignment"""
+    import uuid
     try:
         assignment = CourseAssignment.objects.get(
             id=assignment_id,
@@ -827,7 +742,7 @@ def start_video_assessment(request, assignment_id):
             assignment=assignment,
             defaults={
                 'status': 'scheduled',
-                'started_at': timezone.now()
+                'session_id': uuid.uuid4().hex,
             }
         )
         
@@ -842,7 +757,8 @@ def start_video_assessment(request, assignment_id):
         elif request.method == 'POST':
             # Start the assessment
             video_assessment.status = 'in_progress'
-            video_assessment.started_at = timezone.now()
+            # Attention samples are stored as offsets from this time (see attention_series.py)
+            video_assessment.start_time = timezone.now()
             video_assessment.save()
             
             # Update assignment status
@@ -862,46 +778,26 @@ def start_video_assessment(request, assignment_id):
         return JsonResponse({'success': False, 'message': 'Failed to start assessment'})
 
 @csrf_protect
+@login_required
 def analyze_video_frame(request):
     """API endpoint to analyze video frames during assessment"""
+    from .attention_service import FrameError, display_analysis, get_tracked_assessment, ingest_frames
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            assessment_id = data.get('assessment_id')
-            frame_data = data.get('frame_data')  # Base64 encoded image
-            timestamp = data.get('timestamp')
-            
-            # Get the video assessment
-            assessment = VideoAssessment.objects.get(id=assessment_id)
-            
-            # Simple AI analysis simulation
-            # In production, this would use real AI models
-            import random
-            
-            analysis_result = {
-                'attention_score': random.uniform(0.7, 1.0),
-                'engagement_level': random.choice(['high', 'medium', 'low']),
-                'facial_expression': random.choice(['focused', 'confused', 'distracted', 'engaged']),
-                'looking_at_screen': random.choice([True, False]),
-                'confidence': random.uniform(0.8, 0.95)
-            }
+            assessment = get_tracked_assessment(request.user, data)
             
-            # Save attention tracking data
-            AttentionTrackingData.objects.create(
-                video_assessment=assessment,
-                timestamp=timestamp,
-                attention_score=analysis_result['attention_score'],
-                engagement_level=analysis_result['engagement_level'],
-                facial_expression=analysis_result['facial_expression'],
-                looking_at_screen=analysis_result['looking_at_screen'],
-                raw_data=json.dumps(analysis_result)
-            )
+            analysis = ingest_frames(assessment, frames=[data])[0]
             
             return JsonResponse({
                 'success': True,
-                'analysis': analysis_result
+                'analysis': display_analysis(analysis)
             })
             
+        except VideoAssessment.DoesNotExist:
+            return JsonResponse({'success': False, 'message': 'Assessment not found'}, status=404)
+        except FrameError as e:
+            return JsonResponse({'success': False, 'message': str(e)}, status=400)
         except Exception as e:
             print(f"Frame analysis error: {str(e)}")
             return JsonResponse({
@@ -911,6 +807,31 @@ def analyze_video_frame(request):
     
     return JsonResponse({'success': False, 'message': 'Invalid request method'})
 
+@csrf_protect
+@login_required
+def analyze_video_frames_batch(request):
+    """
+    Batched frame ingestion: {"assessment_id" | "session_id", "frames": [{"timestamp", "frame_data"}],
+    "results": [{"timestamp", "attention_level", ...}]}. All rows are saved in one bulk insert.
+    """
+    from .attention_service import FrameError, display_analysis, get_tracked_assessment, ingest_frames
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Invalid request method'}, status=405)
+    try:
+        data = json.loads(request.body)
+        assessment = get_tracked_assessment(request.user, data)
+        analyses = ingest_frames(assessment, frames=data.get('frames') or [], results=data.get('results') or [])
+    except VideoAssessment.DoesNotExist:
+        return JsonResponse({'success': False, 'message': 'Assessment not found'}, status=404)
+    except (FrameError, ValueError, AttributeError) as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'saved': len(analyses),
+        'analyses': [display_analysis(analysis) for analysis in analyses],
+    })
+
 @login_required
 def complete_video_assessment(request, assessment_id):
     """Complete video assessment and calculate scores"""
@@ -922,24 +843,19 @@ def complete_video_assessment(request, assessment_id):
             )
             
             # Calculate scores based on attention tracking data
-            tracking_data = AttentionTrackingData.objects.filter(
-                video_assessment=assessment
-            )
+            from .attention_series import load_attention_series, summarize_attention
+            _, samples = load_attention_series(assessment)
             
-            if tracking_data.exists():
-                # Calculate average attention score
-                avg_attention = tracking_data.aggregate(
-                    avg_score=models.Avg('attention_score')
-                )['avg_score'] or 0
+            if len(samples):
+                summary = summarize_attention(samples)
+                # Calculate average attention score (stored 0-100)
+                avg_attention = summary['avg_attention'] / 100
                 
                 # Calculate engagement metrics
-                high_engagement_count = tracking_data.filter(engagement_level='high').count()
-                total_data_points = tracking_data.count()
-                engagement_ratio = high_engagement_count / max(total_data_points, 1)
+                engagement_ratio = summary['high'] / summary['samples']
                 
                 # Calculate looking at screen percentage
-                looking_count = tracking_data.filter(looking_at_screen=True).count()
-                looking_ratio = looking_count / max(total_data_points, 1)
+                looking_ratio = summary['screen_focus_ratio']
                 
                 # Final score calculation (weighted average)
                 final_score = (
@@ -1141,31 +1057,28 @@ def view_assessment_details(request, assessment_id):
         if not (request.user.is_staff or assessment.assignment.employee == request.user):
             return redirect('skillup_dashboard')
         
-        # Get attention tracking data
-        tracking_data = AttentionTrackingData.objects.filter(
-            video_assessment=assessment
-        ).order_by('timestamp')
+        # Get attention tracking data (one packed series, loaded as a NumPy array)
+        from .attention_series import load_attention_series, sample_points, summarize_attention
+        started_at, samples = load_attention_series(assessment)
         
         # Calculate analytics
         analytics = {}
-        if tracking_data.exists():
+        if len(samples):
+            summary = summarize_attention(samples)
             analytics = {
-                'total_duration': (assessment.completed_at - assessment.started_at).total_seconds() if assessment.completed_at else 0,
-                'avg_attention': tracking_data.aggregate(avg=models.Avg('attention_score'))['avg'] or 0,
+                'total_duration': (assessment.end_time - assessment.start_time).total_seconds() if assessment.start_time and assessment.end_time else 0,
+                'avg_attention': summary['avg_attention'],
                 'engagement_breakdown': {
-                    'high': tracking_data.filter(engagement_level='high').count(),
-                    'medium': tracking_data.filter(engagement_level='medium').count(),
-                    'low': tracking_data.filter(engagement_level='low').count()
+                    'high': summary['high'],
+                    'medium': summary['medium'],
+                    'low': summary['low']
                 },
-                'screen_focus_percentage': (
-                    tracking_data.filter(looking_at_screen=True).count() / 
-                    max(tracking_data.count(), 1)
-                ) * 100
+                'screen_focus_percentage': summary['screen_focus_ratio'] * 100
             }
         
         context = {
             'assessment': assessment,
-            'tracking_data': tracking_data,
+            'tracking_data': sample_points(started_at, samples),
             'analytics': analytics
         }
         
@@ -1385,10 +1298,22 @@ def admin_submit_feedback(request, employee_id):
             areas_of_concern=areas_of_concern
         )
         
+        # Actions and course recommendations are generated in the background, so the
+        # employee's feedback page only has to read them
+        from .jobs import enqueue
+        from .tasks import FEEDBACK_RECOMMENDATIONS_JOB, feedback_recommendations_key
+        job = enqueue(
+            FEEDBACK_RECOMMENDATIONS_JOB,
+            feedback_recommendations_key(employee.id),
+            payload={'feedback_id': feedback.id},
+            owner=employee,
+        )
+        
         return JsonResponse({
             'success': True, 
             'message': 'Feedback submitted successfully',
-            'feedback_id': feedback.id
+            'feedback_id': feedback.id,
+            'job_id': job.id
         })
         
     except User.DoesNotExist:
@@ -1407,9 +1332,8 @@ def ai_feedback_suggestion(request):
         prompt = request.POST.get('prompt', '').strip()
         if not prompt:
             prompt = 'Suggest a constructive feedback message for an employee.'
-        client = get_gemini_client()
-        response = client.generate_content(prompt)
-        suggestion = response.text if hasattr(response, 'text') else str(response)
+        # Repeated prompts (the default prompt, double submits) are served from the prompt cache
+        suggestion = get_gateway().generate_cached(prompt, namespace='feedback_suggestion')
         print('AI RAW SUGGESTION:', suggestion)
         # Extract only the first option or sentence if multiple are present
         # Prefer lines starting with Option 1, otherwise first non-empty line
@@ -1474,179 +1398,219 @@ def ai_feedback_suggestion(request):
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
+def sse_event(event, data):
+    """Format one Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@csrf_exempt
+@login_required
+def ai_feedback_suggestion_stream(request):
+    """
+    Streaming variant of ai_feedback_suggestion: forwards the suggestion as Server-Sent Events
+    ('token' events with cleaned text, then 'done' with the full suggestion, or 'error')
+    """
+    from django.http import StreamingHttpResponse
+    from .suggestion_stream import SuggestionStreamCleaner
+
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Only POST method allowed'})
+    prompt = request.POST.get('prompt', '').strip()
+    if not prompt:
+        prompt = 'Suggest a constructive feedback message for an employee.'
+
+    def events():
+        cleaner = SuggestionStreamCleaner()
+        suggestion = []
+        try:
+            # Shares the prompt cache namespace with ai_feedback_suggestion
+            for chunk in get_gateway().generate_stream(prompt, namespace='feedback_suggestion'):
+                if cleaner.done:
+                    # Keep reading so the complete response reaches the prompt cache
+                    continue
+                text = cleaner.feed(chunk)
+                if cleaner.done:
+                    text += cleaner.finish()
+                if text:
+                    suggestion.append(text)
+                    yield sse_event('token', {'text': text})
+                if cleaner.done:
+                    yield sse_event('done', {'suggestion': ''.join(suggestion)})
+            if not cleaner.done:
+                text = cleaner.finish()
+                if text:
+                    suggestion.append(text)
+                    yield sse_event('token', {'text': text})
+                yield sse_event('done', {'suggestion': ''.join(suggestion)})
+        except Exception as e:
+            print("[AI SUGGESTION STREAM ERROR]", str(e))
+            yield sse_event('error', {'error': str(e)})
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # let nginx pass events through unbuffered
+    return response
+
+@login_required
+def suggest_concern_tags(request):
+    """Suggest areas of concern for a feedback message using the local keyword tagger"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Only POST method allowed'})
+    if not request.user.is_staff and not (hasattr(request.user, 'userprofile') and request.user.userprofile.user_type == 'admin'):
+        return JsonResponse({'success': False, 'error': 'Access denied'})
+    from .concern_tagger import tag_concerns
+    return JsonResponse({'success': True, 'tags': tag_concerns(request.POST.get('text', ''))})
+
 from django.http import JsonResponse  # ensure JsonResponse is imported
 
+def issued_questions_key(kind, id):
+    """Session key holding the questions issued by start_action_assessment / start_course_assessment"""
+    return f'assessment_questions:{kind}:{id}'
+
+
+def store_assessment_submission(request, assessment, questions_key):
+    """
+    Copy a submitted assessment (answers, integrity signals, video) onto an assessment row awaiting grading.
+    The video is either a chunked upload referenced by `upload_id` or a single multipart `video` file.
+    The questions are the ones issued into the session under `questions_key` when the assessment started;
+    without them the submission is left to the AI grader. Raises UploadError for an unknown `upload_id`.
+    """
+    import json
+    from django.core.exceptions import ValidationError
+    from django.db import transaction
+    from .models import AssessmentUpload
+    from .upload_service import UploadError, commit_upload
+    video_file = request.FILES.get('video')
+    upload_id = request.POST.get('upload_id')
+    upload = None
+    if upload_id:
+        try:
+            upload = AssessmentUpload.objects.get(id=upload_id, owner=request.user)
+        except ValidationError:
+            raise UploadError('Invalid upload id')
+        except AssessmentUpload.DoesNotExist:
+            raise UploadError('Upload not found', status=404)
+    previous_files = []
+    if video_file or upload:
+        # A retake replaces the recording and its playback copy
+        previous_files = [file.name for file in (assessment.video, assessment.playback_video) if file]
+        assessment.playback_video = ''
+    if upload:
+        # The video was streamed in chunks during the assessment; move it into place
+        commit_upload(upload, assessment.video)
+    elif video_file:
+        assessment.video = video_file
+    assessment.transcript = request.POST.get('transcript', '')
+    assessment.questions_asked = request.session.pop(questions_key, [])
+    assessment.answers = json.loads(request.POST.get('answers', '[]'))
+    assessment.cheating_data = json.loads(request.POST.get('cheating_data', '{}'))
+    assessment.status = 'pending'
+    assessment.result = {}
+    assessment.grading_error = ''
+    assessment.ai_score = 0.0
+    assessment.ai_feedback = ''
+    assessment.cheating_detected = False
+    assessment.submitted_at = timezone.now()
+    assessment.completed_at = None
+    assessment.save()
+    for previous in previous_files:
+        if previous != assessment.video.name:
+            # Remove the previous files instead of leaving them orphaned on disk, but only once
+            # the new recording is committed so a failed submission keeps the old video
+            transaction.on_commit(lambda name=previous, storage=assessment.video.storage: storage.delete(name))
+
+
+def describe_assessment(assessment):
+    """JSON status of an assessment being graded in the background"""
+    return {
+        'assessment_id': assessment.id,
+        'status': assessment.status,
+        'result': assessment.result if assessment.status == 'graded' else None,
+        'error': assessment.grading_error if assessment.status == 'failed' else '',
+        'started_at': assessment.started_at.isoformat() if assessment.started_at else None,
+        'submitted_at': assessment.submitted_at.isoformat() if assessment.submitted_at else None,
+        'completed_at': assessment.completed_at.isoformat() if assessment.completed_at else None,
+    }
+
+
 @csrf_exempt
 @login_required
 def submit_action_assessment(request, id):
-    """Endpoint to handle submission of action assessments."""
-    import json
-    from .models import FeedbackAction
+    """Store an action assessment submission and queue it for grading; poll status_url for the result."""
+    from django.db import transaction
+    from django.urls import reverse
+    from .models import FeedbackAction, FeedbackActionAssessment
+    from .jobs import enqueue
+    from .tasks import ACTION_ASSESSMENT_JOB, action_assessment_key, queue_video_transcode
+    from .upload_service import UploadError
     
     try:
         if request.method == 'POST':
             action = FeedbackAction.objects.get(id=id, employee=request.user)
             
-            # Get form data
-            video_file = request.FILES.get('video')
-            transcript = request.POST.get('transcript', '')
-            questions = json.loads(request.POST.get('questions', '[]'))
-            answers = json.loads(request.POST.get('answers', '[]'))
-            cheating_data = json.loads(request.POST.get('cheating_data', '{}'))
-            
-            # Analyze cheating indicators
-            cheating_detected = False
-            cheating_details = []
-            
-            if cheating_data.get('tabSwitches', 0) > 0:
-                cheating_detected = True
-                cheating_details.append(f"Tab switched {cheating_data['tabSwitches']} times")
-                
-            if cheating_data.get('windowBlur', 0) > 2:
-                cheating_detected = True
-                cheating_details.append(f"Window lost focus {cheating_data['windowBlur']} times")
-                
-            if len(cheating_data.get('suspicious_activity', [])) > 3:
-                cheating_detected = True
-                cheating_details.append(f"{len(cheating_data['suspicious_activity'])} suspicious activities detected")
-            
-            # Generate AI feedback using Gemini
-            from .gemini_client import get_gemini_client
-            
-            prompt = f"""
-            Analyze this employee assessment for action completion: "{action.title}"
-            
-            Questions asked: {questions}
-            Answers provided: {answers}
-            Transcript: {transcript}
-            
-            Please provide:
-            1. A score from 1-10 on action completion
-            2. Brief feedback on the quality of responses
-            3. Whether the action appears to be genuinely completed
-            
-            Respond in JSON format: {{"score": X, "feedback": "...", "completed": true/false}}
-            """
-            
-            try:
-                client = get_gemini_client()
-                response = client.generate_content(prompt)
-                ai_result = json.loads(response.text.strip())
-                ai_score = ai_result.get('score', 5)
-                ai_feedback = ai_result.get('feedback', 'Assessment completed.')
-                action_completed = ai_result.get('completed', False)
-            except:
-                ai_score = 7  # Default score if AI analysis fails
-                ai_feedback = 'Assessment completed successfully.'
-                action_completed = True
-            
-            # Apply cheating penalty
-            if cheating_detected:
-                ai_score = max(1, ai_score - 3)  # Reduce score by 3 points for cheating
-                ai_feedback += " Note: Assessment integrity concerns detected."
-            
-            # Mark action as complete if score is good and no major cheating
-            if ai_score >= 6 and not (cheating_data.get('tabSwitches', 0) > 2):
-                action.is_completed = True
-                action.save()
-                marked_complete = True
-            else:
-                marked_complete = False
+            with transaction.atomic():
+                assessment = FeedbackActionAssessment.objects.select_for_update().filter(action=action).first()
+                if assessment is not None and assessment.status in ('pending', 'grading'):
+                    return JsonResponse({
+                        'success': False,
+                        'error': 'This assessment is already being graded',
+                        'assessment_id': assessment.id,
+                        'status_url': reverse('action_assessment_status', args=[assessment.id]),
+                    }, status=409)
+                if assessment is None:
+                    assessment = FeedbackActionAssessment(action=action, employee=request.user)
+                store_assessment_submission(request, assessment, issued_questions_key('action', action.id))
+                # Grading starts once the submission is committed
+                job = enqueue(
+                    ACTION_ASSESSMENT_JOB, action_assessment_key(assessment.id),
+                    payload={'assessment_id': assessment.id}, owner=request.user
+                )
+                if assessment.video:
+                    queue_video_transcode('action_assessment', assessment.id)
             
             return JsonResponse({
                 'success': True,
-                'ai_score': ai_score,
-                'ai_feedback': ai_feedback,
-                'cheating_detected': cheating_detected,
-                'cheating_details': '; '.join(cheating_details),
-                'marked_complete': marked_complete
-            })
+                'assessment_id': assessment.id,
+                'status': assessment.status,
+                'job_id': job.id,
+                'status_url': reverse('action_assessment_status', args=[assessment.id]),
+            }, status=202)
         
         return JsonResponse({'success': False, 'error': 'Invalid request method'})
         
+    except UploadError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
+@login_required
+def action_assessment_status(request, assessment_id):
+    """Grading status and result of an action assessment, visible to its owner and staff"""
+    from .models import FeedbackActionAssessment
+    try:
+        assessment = FeedbackActionAssessment.objects.get(id=assessment_id)
+    except FeedbackActionAssessment.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Assessment not found'}, status=404)
+    if assessment.employee_id != request.user.id and not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
+    return JsonResponse({'success': True, 'assessment': describe_assessment(assessment)})
+
 @csrf_exempt
 @login_required 
 def start_course_assessment(request, assignment_id):
     """Start video assessment for course completion"""
     try:
         from .models import EmployeeDevelopmentPlan
+        from .assessment_service import AssessmentService
         
         assignment = EmployeeDevelopmentPlan.objects.get(
             id=assignment_id,
             employee_profile__user_profile__user=request.user
         )
         
-        course = assignment.course
-        
-        # Generate course-specific questions using Gemini
-        from .gemini_client import get_gemini_client
-        
-        prompt = f"""
-        Generate 3 detailed interview questions to assess if the user has completed and understood the course: "{course.title}"
-        
-        Course Description: {course.description}
-        Course Skills: {getattr(course, 'skills_covered', 'General skills')}
-        
-        The questions should:
-        1. Test practical understanding of course concepts
-        2. Ask for specific examples or applications
-        3. Verify genuine learning vs superficial completion
-        
-        Format each question clearly and make them specific to this course content.
-        """
-        
-        try:
-            client = get_gemini_client()
-            response = client.generate_content(prompt)
-            text = response.text.strip()
-            
-            print(f'Course Assessment - Gemini raw response: {repr(text)}')
-            
-            # Extract questions using the same logic as before
-            import re
-            questions = []
-            
-            # Split text into sections by number pattern
-            sections = re.split(r'\n\s*[0-9]+\.\s*', text)
-            
-            for section in sections[1:]:  # Skip first empty section
-                # Look for quoted question (text between quotes)
-                quote_match = re.search(r'"([^"]+)"', section)
-                if quote_match:
-                    question = quote_match.group(1).strip()
-                    # Clean up any remaining markdown
-                    question = re.sub(r'\*\*|\*', '', question)
-                    questions.append(question)
-                else:
-                    # Fallback: take first sentence that ends with ?
-                    sentences = section.split('.')
-                    for sentence in sentences:
-                        if '?' in sentence:
-                            question = sentence.split('?')[0] + '?'
-                            question = re.sub(r'\*\*|\*|"', '', question).strip()
-                            if question:
-                                questions.append(question)
-                                break
-            
-            questions = questions[:3] if questions else [
-                f"How have you applied the key concepts from '{course.title}' in practical scenarios?",
-                f"What specific skills from this course will you use in your current role?", 
-                f"Describe a project or task where you could implement what you learned from '{course.title}'."
-            ]
-            
-            return JsonResponse({'success': True, 'questions': questions})
-            
-        except Exception as e:
-            # Fallback questions if AI fails
-            questions = [
-                f"How have you applied the key concepts from '{course.title}' in practical scenarios?",
-                f"What specific skills from this course will you use in your current role?",
-                f"Describe a project or task where you could implement what you learned from '{course.title}'."
-            ]
-            return JsonResponse({'success': True, 'questions': questions})
+        # Questions are sampled from the course's stored question bank
+        questions = AssessmentService().questions_for_course(assignment.course)
+        request.session[issued_questions_key('course', assignment.id)] = questions
+        return JsonResponse({'success': True, 'questions': questions})
             
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
@@ -1654,9 +1618,13 @@ def start_course_assessment(request, assignment_id):
 @csrf_exempt
 @login_required
 def submit_course_assessment(request, assignment_id):
-    """Submit course video assessment and mark completion"""
-    import json
-    from .models import EmployeeDevelopmentPlan
+    """Store a course assessment submission and queue it for grading; poll status_url for the result."""
+    from django.db import transaction
+    from django.urls import reverse
+    from .models import EmployeeDevelopmentPlan, CourseAssessment
+    from .jobs import enqueue
+    from .tasks import COURSE_ASSESSMENT_JOB, course_assessment_key, queue_video_transcode
+    from .upload_service import UploadError
     
     try:
         if request.method == 'POST':
@@ -1665,100 +1633,211 @@ def submit_course_assessment(request, assignment_id):
                 employee_profile__user_profile__user=request.user
             )
             
-            course = assignment.course
-            
-            # Get form data
-            video_file = request.FILES.get('video')
-            transcript = request.POST.get('transcript', '')
-            questions = json.loads(request.POST.get('questions', '[]'))
-            answers = json.loads(request.POST.get('answers', '[]'))
-            cheating_data = json.loads(request.POST.get('cheating_data', '{}'))
-            
-            # Analyze cheating indicators
-            cheating_detected = False
-            cheating_details = []
-            
-            if cheating_data.get('tabSwitches', 0) > 0:
-                cheating_detected = True
-                cheating_details.append(f"Tab switched {cheating_data['tabSwitches']} times")
-                
-            if cheating_data.get('windowBlur', 0) > 2:
-                cheating_detected = True
-                cheating_details.append(f"Window lost focus {cheating_data['windowBlur']} times")
-                
-            if len(cheating_data.get('suspicious_activity', [])) > 3:
-                cheating_detected = True
-                cheating_details.append(f"{len(cheating_data['suspicious_activity'])} suspicious activities detected")
-            
-            # Generate AI feedback using Gemini
-            from .gemini_client import get_gemini_client
-            
-            prompt = f"""
-            Analyze this course completion assessment for: "{course.title}"
-            
-            Course Description: {course.description}
-            Questions asked: {questions}
-            Answers provided: {answers}
-            Transcript: {transcript}
-            
-            Please evaluate:
-            1. Understanding of course concepts (1-10)
-            2. Practical application knowledge (1-10) 
-            3. Genuine completion vs superficial (1-10)
-            4. Overall course mastery (1-10)
-            
-            Respond in JSON format: {{"understanding": X, "application": X, "completion": X, "overall": X, "feedback": "...", "course_completed": true/false}}
-            """
-            
-            try:
-                client = get_gemini_client()
-                response = client.generate_content(prompt)
-                ai_result = json.loads(response.text.strip())
-                
-                understanding = ai_result.get('understanding', 7)
-                application = ai_result.get('application', 7) 
-                completion = ai_result.get('completion', 7)
-                overall_score = ai_result.get('overall', 7)
-                ai_feedback = ai_result.get('feedback', 'Course assessment completed.')
-                course_completed = ai_result.get('course_completed', True)
-                
-            except:
-                understanding = application = completion = overall_score = 7
-                ai_feedback = 'Course assessment completed successfully.'
-                course_completed = True
-            
-            # Apply cheating penalty
-            if cheating_detected:
-                overall_score = max(1, overall_score - 3)
-                ai_feedback += " Note: Assessment integrity concerns detected."
-            
-            # Mark course as complete if score is good and no major cheating
-            if overall_score >= 6 and not (cheating_data.get('tabSwitches', 0) > 2):
-                assignment.status = 'completed'
-                assignment.progress_percentage = 100
-                assignment.save()
-                marked_complete = True
-            else:
-                marked_complete = False
+            with transaction.atomic():
+                in_progress = CourseAssessment.objects.select_for_update().filter(
+                    plan=assignment, status__in=('pending', 'grading')
+                ).first()
+                if in_progress is not None:
+                    return JsonResponse({
+                        'success': False,
+                        'error': 'This assessment is already being graded',
+                        'assessment_id': in_progress.id,
+                        'status_url': reverse('course_assessment_status', args=[in_progress.id]),
+                    }, status=409)
+                assessment = CourseAssessment(plan=assignment, employee=request.user)
+                store_assessment_submission(request, assessment, issued_questions_key('course', assignment.id))
+                # Grading starts once the submission is committed
+                job = enqueue(
+                    COURSE_ASSESSMENT_JOB, course_assessment_key(assessment.id),
+                    payload={'assessment_id': assessment.id}, owner=request.user
+                )
+                if assessment.video:
+                    queue_video_transcode('course_assessment', assessment.id)
             
             return JsonResponse({
                 'success': True,
-                'ai_score': overall_score,
-                'understanding': understanding,
-                'application': application, 
-                'completion': completion,
-                'ai_feedback': ai_feedback,
-                'cheating_detected': cheating_detected,
-                'cheating_details': '; '.join(cheating_details),
-                'marked_complete': marked_complete,
-                'course_title': course.title
-            })
+                'assessment_id': assessment.id,
+                'status': assessment.status,
+                'job_id': job.id,
+                'status_url': reverse('course_assessment_status', args=[assessment.id]),
+            }, status=202)
         
         return JsonResponse({'success': False, 'error': 'Invalid request method'})
         
+    except UploadError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
+@login_required
+def course_assessment_status(request, assessment_id):
+    """Grading status and result of a course assessment, visible to its owner and staff"""
+    from .models import CourseAssessment
+    try:
+        assessment = CourseAssessment.objects.get(id=assessment_id)
+    except CourseAssessment.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Assessment not found'}, status=404)
+    if assessment.employee_id != request.user.id and not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
+    return JsonResponse({'success': True, 'assessment': describe_assessment(assessment)})
+
+def recording_keyframes(request, model, assessment):
+    """
+    Keyframe sprite index for scrubbing an assessment recording without downloading it;
+    queues the sprite if it hasn't been built for the current recording yet
+    """
+    import os
+    from django.conf import settings
+    from .jobs import describe_job, latest_job
+    from .tasks import (
+        KEYFRAME_SPRITE_JOB, TRANSCODE_VIDEO_JOB, keyframes_dir, media_path, queue_keyframe_sprite, recording_key
+    )
+    from .video_service import SPRITE_INDEX_FILENAME
+    if assessment.employee_id != request.user.id and not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
+    if not assessment.video:
+        return JsonResponse({'success': True, 'ready': False, 'error': 'No recording for this assessment'})
+
+    relative_dir = keyframes_dir(model, assessment.id)
+    index_path = os.path.join(media_path(relative_dir), SPRITE_INDEX_FILENAME)
+    if os.path.exists(index_path):
+        with open(index_path) as index_file:
+            index = json.load(index_file)
+        # A retake leaves the previous recording's sprite behind until the new one is built
+        if index.get('video') == assessment.video.name:
+            index['sprite_url'] = f"{settings.MEDIA_URL}{relative_dir}/{index['sprite']}"
+            return JsonResponse({'success': True, 'ready': True, 'keyframes': index})
+
+    key = recording_key(model, assessment.id)
+    transcode = latest_job(TRANSCODE_VIDEO_JOB, key)
+    if transcode is not None and transcode.is_active:
+        # The sprite is queued when the transcode finishes
+        return JsonResponse({'success': True, 'ready': False, 'job': describe_job(transcode)}, status=202)
+    job = latest_job(KEYFRAME_SPRITE_JOB, key)
+    if job is None or job.status == 'succeeded':
+        # Never built, or built for an earlier recording: build it now
+        job = queue_keyframe_sprite(model, assessment.id)
+    return JsonResponse({'success': True, 'ready': False, 'job': describe_job(job)}, status=202)
+
+
+@login_required
+def action_assessment_keyframes(request, assessment_id):
+    """Keyframe sprite of an action assessment recording, for its owner and staff"""
+    from .models import FeedbackActionAssessment
+    try:
+        assessment = FeedbackActionAssessment.objects.get(id=assessment_id)
+    except FeedbackActionAssessment.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Assessment not found'}, status=404)
+    return recording_keyframes(request, 'action_assessment', assessment)
+
+
+@login_required
+def course_assessment_keyframes(request, assessment_id):
+    """Keyframe sprite of a course assessment recording, for its owner and staff"""
+    from .models import CourseAssessment
+    try:
+        assessment = CourseAssessment.objects.get(id=assessment_id)
+    except CourseAssessment.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Assessment not found'}, status=404)
+    return recording_keyframes(request, 'course_assessment', assessment)
+
+# --- Chunked Assessment Video Uploads ---
+
+@csrf_exempt
+@login_required
+def create_assessment_upload(request):
+    """Open a resumable assessment video upload; chunks are then sent to upload_url"""
+    from django.urls import reverse
+    from .upload_service import create_upload, describe_upload
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    upload = create_upload(request.user, request.POST.get('filename', ''), request.POST.get('content_type', ''))
+    return JsonResponse({
+        'success': True,
+        'upload': describe_upload(upload),
+        'upload_url': reverse('assessment_upload_chunk', args=[upload.id]),
+    }, status=201)
+
+@csrf_exempt
+@login_required
+def assessment_upload_chunk(request, upload_id):
+    """
+    GET: the offset received so far, to resume after a dropped connection.
+    PUT: append the raw request body at the offset given in the Upload-Offset header.
+    DELETE: abort the upload.
+    """
+    from .models import AssessmentUpload
+    from .upload_service import UploadError, append_chunk, abort_upload, describe_upload
+    try:
+        upload = AssessmentUpload.objects.get(id=upload_id, owner=request.user)
+    except AssessmentUpload.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Upload not found'}, status=404)
+
+    if request.method == 'GET':
+        return JsonResponse({'success': True, 'upload': describe_upload(upload)})
+    if request.method == 'DELETE':
+        if upload.status == 'open':
+            abort_upload(upload)
+        return JsonResponse({'success': True, 'upload': describe_upload(upload)})
+    if request.method not in ('PUT', 'POST'):
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', request.GET.get('offset', '')))
+        length = int(request.headers.get('Content-Length', ''))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Upload-Offset and Content-Length are required'}, status=400)
+    try:
+        # Read from the request stream itself; request.body would buffer the whole chunk
+        append_chunk(upload, request, offset, length)
+    except UploadError as e:
+        return JsonResponse({'success': False, 'error': str(e), 'offset': e.offset}, status=e.status)
+    return JsonResponse({'success': True, 'upload': describe_upload(upload)})
+
+# --- Protected Media ---
+
+@login_required
+def protected_media(request, path):
+    """Serve an uploaded file (resume, assessment video, keyframes) to its owner or an HR admin"""
+    from django.core.exceptions import SuspiciousFileOperation
+    from .media_service import can_access_media, normalize_media_name, serve_media
+    # Check and serve the same resolved name so `..` segments can't smuggle in another file
+    name = normalize_media_name(path)
+    if name is None:
+        return HttpResponse(status=404)
+    if not can_access_media(request.user, name):
+        return HttpResponse(status=403)
+    try:
+        return serve_media(request, name)
+    except SuspiciousFileOperation:
+        return HttpResponse(status=404)
+
+# --- LLM Gateway Monitoring ---
+
+@login_required
+def llm_gateway_stats(request):
+    """Staff-only API exposing per-provider LLM gateway counters and assessment pre-grader outcomes"""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    from .assessment_service import pregrade_stats
+    return JsonResponse({'success': True, 'providers': get_gateway().stats(), 'pregrader': pregrade_stats()})
+
+
+# --- Background Jobs ---
+
+@login_required
+def background_job_status(request, job_id):
+    """Status of a background job, visible to its owner and staff"""
+    from .jobs import describe_job
+    from .models import BackgroundJob
+    try:
+        job = BackgroundJob.objects.get(id=job_id)
+    except BackgroundJob.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Job not found'}, status=404)
+    if job.owner_id != request.user.id and not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
+    return JsonResponse({'success': True, 'job': describe_job(job)})
+
 
 # --- Session Management APIs ---
 
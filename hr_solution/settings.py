@@ -128,6 +128,11 @@ STATICFILES_DIRS = [
 # Media files (User uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Uploads are served by hr_app.views.protected_media after a permission check. Set to 'x-sendfile'
+# (Apache/lighttpd) or 'x-accel-redirect' (nginx) to let the web server send the file itself;
+# for nginx, MEDIA_ACCEL_REDIRECT_PREFIX must be an `internal` location aliased to MEDIA_ROOT.
+MEDIA_SENDFILE_BACKEND = os.getenv('MEDIA_SENDFILE_BACKEND') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -162,3 +167,98 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Gemini AI Studio API Configuration
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+
+# OpenAI API Configuration (resume analysis)
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+
+# Shared LLM HTTP connection pool (see hr_app/llm_clients.py)
+LLM_HTTP_MAX_CONNECTIONS = 20
+LLM_HTTP_MAX_KEEPALIVE = 10
+LLM_HTTP_TIMEOUT = 60  # seconds
+
+# LLM backend: 'live' calls Gemini/OpenAI, 'stub' uses the deterministic local fake
+# from hr_app/llm_stub.py (no API quota, for load tests and offline benchmarks)
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'live')
+
+# Simulated response time for the stub backend
+LLM_STUB_LATENCY = {
+    'distribution': os.getenv('LLM_STUB_LATENCY_DISTRIBUTION', 'lognormal'),  # fixed | uniform | normal | lognormal
+    'median_ms': 800,
+    'sigma': 0.5,
+}
+
+# Record/replay of LLM traffic (LLM_BACKEND = 'record' or 'replay', see hr_app/llm_recorder.py)
+LLM_RECORD_STORE = BASE_DIR / 'llm_recordings.sqlite3'
+LLM_RECORD_BACKEND = 'live'  # backend whose responses are recorded
+LLM_REPLAY_LATENCY = True  # sleep for the recorded latency when replaying
+LLM_REPLAY_MISS = None  # backend used for unrecorded requests, None to fail fast
+
+# LLM response cache. Disabled while the TTL is 0; the 'llm' cache is file based so entries
+# warmed with `manage.py llm_recordings --warm-cache` are shared by all worker processes
+LLM_RESPONSE_CACHE_TTL = int(os.getenv('LLM_RESPONSE_CACHE_TTL', '0'))
+LLM_RESPONSE_CACHE_ALIAS = 'llm'
+
+# Seconds that responses to recurring prompts (e.g. feedback suggestions) are reused, see LLMGateway.generate_cached
+LLM_PROMPT_CACHE_TTL = int(os.getenv('LLM_PROMPT_CACHE_TTL', '3600'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'llm': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'llm_cache',
+    },
+}
+
+# Per-provider backpressure for LLM calls (see hr_app/llm_gateway.py)
+LLM_GATEWAY = {
+    'gemini': {
+        'rate_per_minute': 60,
+        'burst': 10,
+        'max_concurrency': 8,
+        'acquire_timeout': 5,  # seconds to wait for a slot before failing fast
+        'failure_threshold': 5,  # consecutive failures before the circuit opens
+        'reset_timeout': 30,  # seconds before a trial call is let through
+    },
+    'openai': {
+        'rate_per_minute': 60,
+        'burst': 5,
+        'max_concurrency': 4,
+        'acquire_timeout': 5,
+        'failure_threshold': 5,
+        'reset_timeout': 30,
+    },
+}
+
+# Background jobs (see hr_app/jobs.py)
+BACKGROUND_JOB_WORKERS = int(os.getenv('BACKGROUND_JOB_WORKERS', '4'))
+BACKGROUND_JOBS_EAGER = False  # run jobs inline on commit instead of on the thread pool
+BACKGROUND_JOB_STALE_MINUTES = 30  # default age for `run_jobs --requeue-stale`
+
+# Assessment question banks (see hr_app/assessment_service.py)
+ASSESSMENT_QUESTION_BANK_SIZE = 8  # questions generated and stored per action/course
+ASSESSMENT_QUESTIONS_PER_ATTEMPT = 3  # questions sampled from the bank for each attempt
+# Local pre-grading of assessment submissions; overrides DEFAULT_PREGRADER_SETTINGS in hr_app/assessment_service.py
+ASSESSMENT_PREGRADER = {}
+
+# Chunked assessment video uploads (see hr_app/upload_service.py)
+ASSESSMENT_UPLOAD_DIR = os.path.join(MEDIA_ROOT, 'uploads', 'partial')  # partial files while chunks arrive
+ASSESSMENT_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB per chunk request
+ASSESSMENT_UPLOAD_MAX_SIZE = 500 * 1024 * 1024  # 500MB per video
+
+# Re-encoding of stored assessment videos; overrides DEFAULT_TRANSCODE_SETTINGS in hr_app/video_service.py
+ASSESSMENT_VIDEO_TRANSCODE = {}
+# Keyframe sprites for reviewing assessment recordings; overrides DEFAULT_SPRITE_SETTINGS in hr_app/video_service.py
+ASSESSMENT_KEYFRAME_SPRITE = {}
+
+# Video assessment frame ingestion (see hr_app/attention_service.py)
+ATTENTION_BATCH_MAX_FRAMES = 60  # frames or results accepted per batched request
+ATTENTION_ANALYZER_WORKERS = int(os.getenv('ATTENTION_ANALYZER_WORKERS', '4'))  # threads analysing frames with OpenCV
+# Reuse of the last analysis for near-identical frames; overrides DEFAULT_DEDUPE_SETTINGS in hr_app/attention_service.py
+ATTENTION_FRAME_DEDUPE = {}
+# Samples are stored as one packed AttentionSeries per assessment (see hr_app/attention_series.py)
+ATTENTION_STORE_ROWS = False  # also insert one AttentionTrackingData row per sample, for code still reading rows
+# Live frame WebSocket (ASGI only, see hr_app/frame_socket.py)
+ATTENTION_STREAM_BATCH_SIZE = 10  # analysed frames buffered per write
+ATTENTION_STREAM_MAX_FRAME_BYTES = 512 * 1024
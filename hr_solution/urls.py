@@ -27,14 +27,22 @@ from hr_app.views import (
     professional_development_view, feedback_view, mark_action_complete, enroll_feedback_course,
     # Assessment endpoints
     start_action_assessment, submit_action_assessment, start_course_assessment, submit_course_assessment,
+    action_assessment_status, course_assessment_status, action_assessment_keyframes, course_assessment_keyframes,
+    create_assessment_upload, assessment_upload_chunk,
     # Session management endpoints
     session_status, extend_session,
+    # LLM gateway monitoring
+    llm_gateway_stats,
+    # Background jobs
+    background_job_status,
+    # Uploaded media
+    protected_media,
     # Skill-Up Module views
-    skillup_dashboard, start_video_assessment, analyze_video_frame, complete_video_assessment,
+    skillup_dashboard, start_video_assessment, analyze_video_frame, analyze_video_frames_batch, complete_video_assessment,
     admin_skillup_dashboard, assign_course_api, view_assignment_progress, view_assessment_details,
     # Admin Dashboard views
     admin_employee_detail, admin_employee_feedback, admin_submit_feedback,
-    ai_feedback_suggestion, start_action_assessment, submit_action_assessment  # added assessment endpoints
+    ai_feedback_suggestion, ai_feedback_suggestion_stream, suggest_concern_tags, start_action_assessment, submit_action_assessment  # added assessment endpoints
 )
 
 urlpatterns = [
@@ -74,6 +82,7 @@ urlpatterns = [
     
     # Skill-Up API endpoints
     path('api/analyze-frame/', analyze_video_frame, name='analyze_video_frame'),
+    path('api/analyze-frames/', analyze_video_frames_batch, name='analyze_video_frames_batch'),
     path('api/assign-course/', assign_course_api, name='assign_course_api'),
     
     # Admin Dashboard URLs
@@ -85,18 +94,32 @@ urlpatterns = [
     
     # AI Feedback Suggestion API
     path('api/ai-feedback-suggestion/', ai_feedback_suggestion, name='ai_feedback_suggestion'),
+    path('api/ai-feedback-suggestion/stream/', ai_feedback_suggestion_stream, name='ai_feedback_suggestion_stream'),
+    path('api/concern-tags/', suggest_concern_tags, name='suggest_concern_tags'),
     
     # Assessment endpoints
     path('start-action-assessment/<int:id>/', start_action_assessment, name='start_action_assessment'),
     path('submit-action-assessment/<int:id>/', submit_action_assessment, name='submit_action_assessment'),
     path('start-course-assessment/<int:assignment_id>/', start_course_assessment, name='start_course_assessment'),
     path('submit-course-assessment/<int:assignment_id>/', submit_course_assessment, name='submit_course_assessment'),
+    path('api/action-assessments/<int:assessment_id>/', action_assessment_status, name='action_assessment_status'),
+    path('api/course-assessments/<int:assessment_id>/', course_assessment_status, name='course_assessment_status'),
+    path('api/action-assessments/<int:assessment_id>/keyframes/', action_assessment_keyframes, name='action_assessment_keyframes'),
+    path('api/course-assessments/<int:assessment_id>/keyframes/', course_assessment_keyframes, name='course_assessment_keyframes'),
+    path('api/assessment-uploads/', create_assessment_upload, name='create_assessment_upload'),
+    path('api/assessment-uploads/<uuid:upload_id>/', assessment_upload_chunk, name='assessment_upload_chunk'),
+    
+    # LLM gateway monitoring
+    path('api/llm-stats/', llm_gateway_stats, name='llm_gateway_stats'),
+    path('api/jobs/<int:job_id>/', background_job_status, name='background_job_status'),
     
     # Session management API
     path('api/session-status/', session_status, name='session_status'),
     path('api/extend-session/', extend_session, name='extend_session'),
+    
+    # Uploaded media, permission checked (also in production, unlike static())
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", protected_media, name='protected_media'),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0] if settings.STATICFILES_DIRS else '')